@@ -0,0 +1,116 @@
+"""
+Activity log writes. By default an activity is staged on the caller's session so
+it commits in the same transaction as the change it describes. With
+ACTIVITY_BUFFER_SIZE > 0 activities are instead queued in memory once the
+mutation commits and written in bulk multi-row INSERTs, trading durability (a
+crash loses the unflushed buffer) for fewer round trips under heavy write load.
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Activity
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_buffer: list[dict] = []
+_buffer_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def record_activity(db: Session, deal_id: int, user_id: int, action: str, description: str) -> None:
+    """Record an activity alongside the caller's pending changes; the caller commits"""
+    if settings.ACTIVITY_BUFFER_SIZE <= 0:
+        db.add(Activity(deal_id=deal_id, user_id=user_id, action=action, description=description))
+        return
+
+    _buffer_after_commit(db, [{'deal_id': deal_id, 'user_id': user_id, 'action': action, 'description': description}])
+
+
+def record_activities(db: Session, rows: list[dict]) -> None:
+    """
+    Record many activities (dicts of deal_id, user_id, action, description) with one
+    multi-row INSERT in the caller's transaction, or buffer them in buffered mode
+    """
+    if not rows:
+        return
+    if settings.ACTIVITY_BUFFER_SIZE <= 0:
+        db.execute(insert(Activity), rows)
+        return
+
+    _buffer_after_commit(db, rows)
+
+
+def _buffer_after_commit(db: Session, rows: list[dict]) -> None:
+    """Hold rows on the session until its transaction commits, so rolled-back work is never logged"""
+    # Stamp now so ordering reflects when it happened, not when the buffer flushed
+    now = datetime.now(timezone.utc)
+    if 'pending_activities' not in db.info:
+        db.info['pending_activities'] = []
+        event.listen(db, "after_commit", _buffer_pending)
+        event.listen(db, "after_rollback", _discard_pending)
+    db.info['pending_activities'].extend({**row, 'created_at': now} for row in rows)
+
+
+def _discard_pending(session: Session) -> None:
+    session.info['pending_activities'] = []
+
+
+def _buffer_pending(session: Session) -> None:
+    rows = session.info['pending_activities']
+    if not rows:
+        return
+    session.info['pending_activities'] = []
+
+    with _buffer_lock:
+        _buffer.extend(rows)
+        full = len(_buffer) >= settings.ACTIVITY_BUFFER_SIZE
+    if full:
+        # Flush off the request thread so the response isn't held up by the INSERT
+        threading.Thread(target=flush_activities, daemon=True).start()
+    else:
+        _schedule_flush()
+
+
+def _schedule_flush() -> None:
+    global _flush_timer
+    with _buffer_lock:
+        if _flush_timer is not None:
+            return
+        _flush_timer = threading.Timer(settings.ACTIVITY_FLUSH_INTERVAL_SECONDS, flush_activities)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def flush_activities() -> int:
+    """Write every buffered activity in one multi-row INSERT; returns the number written"""
+    global _flush_timer
+    with _buffer_lock:
+        rows = _buffer[:]
+        _buffer.clear()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+    if not rows:
+        return 0
+
+    db = SessionLocal()
+    try:
+        db.execute(insert(Activity), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to flush %d buffered activities", len(rows))
+        return 0
+    finally:
+        db.close()
+    return len(rows)
+
+
+atexit.register(flush_activities)
@@ -0,0 +1,251 @@
+"""
+Pipeline analytics. Per-board, per-stage deal counts and check size totals live
+in board_stage_rollups and are adjusted in the same transaction as each deal
+mutation, so reading them is a fixed six-row lookup. Time-in-stage statistics
+are derived from deal_stage_transitions by a vectorized NumPy pass and cached
+per board for ANALYTICS_CACHE_TTL_SECONDS, or until a deal on the board changes
+stage or is deleted.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable, Optional
+import numpy as np
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import Board, BoardStageRollup, Deal, DealStage, DealStageTransition
+
+settings = get_settings()
+
+STAGES = list(DealStage)
+STAGE_INDEX = {stage: index for index, stage in enumerate(STAGES)}
+
+SECONDS_PER_DAY = 86400.0
+
+# board_id -> (expires_at, stats)
+_duration_cache: dict[int, tuple[float, dict]] = {}
+_duration_cache_lock = threading.Lock()
+
+
+def init_rollups(db: Session, board_id: int) -> None:
+    """Create the empty rollup rows for a new board"""
+    db.execute(insert(BoardStageRollup), [
+        {'board_id': board_id, 'stage': stage, 'deal_count': 0, 'check_size_total': 0, 'check_size_count': 0}
+        for stage in STAGES
+    ])
+
+
+def track_deal_changes(
+    db: Session,
+    board_id: int,
+    changes: Iterable[tuple[Optional[tuple], Optional[tuple]]]
+) -> None:
+    """
+    Apply (before, after) deal states to a board's rollups, where each state is
+    (stage, check_size) or None for a created or deleted deal. Runs in the
+    caller's transaction; the caller commits.
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0), 0])
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            stage, check_size = state
+            delta = deltas[stage]
+            delta[0] += sign
+            if check_size is not None:
+                delta[1] += sign * Decimal(str(check_size))
+                delta[2] += sign
+
+    for stage, (count, total, sized) in deltas.items():
+        if count == 0 and total == 0 and sized == 0:
+            continue
+        result = db.execute(
+            update(BoardStageRollup)
+            .where(BoardStageRollup.board_id == board_id, BoardStageRollup.stage == stage)
+            .values(
+                deal_count=BoardStageRollup.deal_count + count,
+                check_size_total=BoardStageRollup.check_size_total + total,
+                check_size_count=BoardStageRollup.check_size_count + sized
+            )
+        )
+        if result.rowcount == 0:
+            # No rollups for this board yet; rebuild them from the deals, this change included
+            recompute_rollups(db, board_id)
+            return
+
+
+def track_deal_change(db: Session, board_id: int, before: Optional[tuple], after: Optional[tuple]) -> None:
+    track_deal_changes(db, board_id, [(before, after)])
+
+
+def recompute_rollups(db: Session, board_id: int) -> None:
+    """Rebuild a board's rollups from its deals with vectorized per-stage sums"""
+    # Serialize rebuilds of one board: a concurrent one waits here, then reads and replaces
+    # the rows this one commits instead of inserting over them
+    db.execute(select(Board.id).where(Board.id == board_id).with_for_update())
+    db.flush()
+    rows = db.execute(select(Deal.stage, Deal.check_size).where(Deal.board_id == board_id)).all()
+
+    codes = np.fromiter((STAGE_INDEX[stage] for stage, _ in rows), dtype=np.int64, count=len(rows))
+    sizes = np.fromiter(
+        (np.nan if check_size is None else float(check_size) for _, check_size in rows),
+        dtype=np.float64,
+        count=len(rows)
+    )
+    sized = ~np.isnan(sizes)
+    counts = np.bincount(codes, minlength=len(STAGES))
+    totals = np.bincount(codes, weights=np.where(sized, sizes, 0.0), minlength=len(STAGES))
+    sized_counts = np.bincount(codes[sized], minlength=len(STAGES))
+
+    db.execute(delete(BoardStageRollup).where(BoardStageRollup.board_id == board_id))
+    db.execute(insert(BoardStageRollup), [
+        {
+            'board_id': board_id,
+            'stage': stage,
+            'deal_count': int(counts[index]),
+            'check_size_total': round(float(totals[index]), 2),
+            'check_size_count': int(sized_counts[index])
+        }
+        for index, stage in enumerate(STAGES)
+    ])
+
+
+def load_rollups(db: Session, board_ids: list[int]) -> dict[DealStage, dict]:
+    """Stage totals summed over the given boards"""
+    stages = {
+        stage: {'deal_count': 0, 'check_size_total': 0.0, 'check_size_count': 0}
+        for stage in STAGES
+    }
+    if not board_ids:
+        return stages
+
+    rows = db.query(
+        BoardStageRollup.stage,
+        BoardStageRollup.deal_count,
+        BoardStageRollup.check_size_total,
+        BoardStageRollup.check_size_count
+    ).filter(BoardStageRollup.board_id.in_(board_ids)).all()
+    for stage, deal_count, check_size_total, check_size_count in rows:
+        stages[stage]['deal_count'] += deal_count
+        stages[stage]['check_size_total'] += float(check_size_total)
+        stages[stage]['check_size_count'] += check_size_count
+    return stages
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive UTC datetimes
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def compute_stage_durations(db: Session, board_id: int) -> dict:
+    """
+    Days spent in each stage before leaving it, and days from creation in
+    Sourced to first reaching IC, over every stage transition on a board
+    """
+    deal_rows = db.query(Deal.id, Deal.created_at).filter(Deal.board_id == board_id).all()
+    deal_index = {deal_id: index for index, (deal_id, _) in enumerate(deal_rows)}
+    created = np.array([_timestamp(created_at) for _, created_at in deal_rows], dtype=np.float64)
+
+    change_rows = db.query(
+        DealStageTransition.deal_id,
+        DealStageTransition.from_stage,
+        DealStageTransition.to_stage,
+        DealStageTransition.created_at
+    ).filter(
+        DealStageTransition.board_id == board_id,
+        DealStageTransition.from_stage.isnot(None)
+    ).all()
+
+    deals = [deal_index[deal_id] for deal_id, _, _, _ in change_rows]
+    from_codes = [STAGE_INDEX[from_stage] for _, from_stage, _, _ in change_rows]
+    to_codes = [STAGE_INDEX[to_stage] for _, _, to_stage, _ in change_rows]
+    times = [_timestamp(created_at) for _, _, _, created_at in change_rows]
+
+    stats = {
+        'stages': {stage: {'median_days': None, 'avg_days': None, 'transitions': 0} for stage in STAGES},
+        'median_days_sourced_to_ic': None,
+        'computed_at': datetime.now(timezone.utc)
+    }
+    if not deals:
+        return stats
+
+    deals = np.array(deals, dtype=np.int64)
+    from_codes = np.array(from_codes, dtype=np.int64)
+    to_codes = np.array(to_codes, dtype=np.int64)
+    times = np.array(times, dtype=np.float64)
+
+    # Order each deal's changes in time; a stage was entered at the previous change, or at creation
+    order = np.lexsort((times, deals))
+    deals, from_codes, to_codes, times = deals[order], from_codes[order], to_codes[order], times[order]
+    first_of_deal = np.ones(len(deals), dtype=bool)
+    first_of_deal[1:] = deals[1:] != deals[:-1]
+    entered = np.where(first_of_deal, created[deals], np.roll(times, 1))
+    days_in_stage = np.maximum(times - entered, 0.0) / SECONDS_PER_DAY
+
+    for index, stage in enumerate(STAGES):
+        durations = days_in_stage[from_codes == index]
+        if len(durations):
+            stats['stages'][stage] = {
+                'median_days': round(float(np.median(durations)), 2),
+                'avg_days': round(float(durations.mean()), 2),
+                'transitions': int(len(durations))
+            }
+
+    # Deals created in Sourced, measured to their first move into IC
+    started_in_sourced = np.zeros(len(created), dtype=bool)
+    started_in_sourced[deals[first_of_deal]] = from_codes[first_of_deal] == STAGE_INDEX[DealStage.SOURCED]
+    into_ic = (to_codes == STAGE_INDEX[DealStage.IC]) & started_in_sourced[deals]
+    if into_ic.any():
+        ic_deals, first_ic = np.unique(deals[into_ic], return_index=True)
+        days_to_ic = (times[into_ic][first_ic] - created[ic_deals]) / SECONDS_PER_DAY
+        stats['median_days_sourced_to_ic'] = round(float(np.median(days_to_ic)), 2)
+
+    return stats
+
+
+def get_stage_durations(db: Session, board_id: int) -> dict:
+    """Cached compute_stage_durations"""
+    now = time.monotonic()
+    with _duration_cache_lock:
+        cached = _duration_cache.get(board_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    stats = compute_stage_durations(db, board_id)
+    if settings.ANALYTICS_CACHE_TTL_SECONDS > 0:
+        with _duration_cache_lock:
+            _duration_cache[board_id] = (now + settings.ANALYTICS_CACHE_TTL_SECONDS, stats)
+    return stats
+
+
+def invalidate_stage_durations(board_id: int) -> None:
+    """Drop a board's cached durations; call after committing a stage change or deletion"""
+    with _duration_cache_lock:
+        _duration_cache.pop(board_id, None)
+
+
+def build_analytics(rollups: dict, durations: Optional[dict]) -> dict:
+    stages = []
+    for stage in STAGES:
+        rollup = rollups[stage]
+        duration = durations['stages'][stage] if durations else {}
+        stages.append({
+            'stage': stage,
+            'deal_count': rollup['deal_count'],
+            'check_size_total': round(rollup['check_size_total'], 2),
+            'check_size_avg': round(rollup['check_size_total'] / rollup['check_size_count'], 2)
+            if rollup['check_size_count'] else None,
+            'median_days_in_stage': duration.get('median_days'),
+            'avg_days_in_stage': duration.get('avg_days'),
+        })
+    return {
+        'stages': stages,
+        'median_days_sourced_to_ic': durations['median_days_sourced_to_ic'] if durations else None,
+        'durations_computed_at': durations['computed_at'] if durations else None,
+    }
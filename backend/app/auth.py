@@ -1,5 +1,12 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import logging
+import threading
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -11,14 +18,60 @@ from app.models import User, UserRole
 
 settings = get_settings()
 security = HTTPBearer()
+logger = logging.getLogger(__name__)
 
+# bcrypt releases the GIL, so a small thread pool bounds hashing CPU; handlers await
+# its jobs, so no request thread waits on one. The semaphore caps running + queued jobs
+_password_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+# User columns handlers rely on; cached principals never carry the password hash
+PRINCIPAL_FIELDS = ("id", "email", "full_name", "role", "created_at", "updated_at")
 
+# The "scope" claim of tokens that open a board's change feed
+STREAM_TOKEN_SCOPE = "board-events"
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# sha256(token) -> (expires_at, principal fields), least recently used first
+_principal_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_principal_cache_lock = threading.Lock()
+
+# user_id -> time of the last profile change; embedded claims issued before it are ignored
+_principal_changed_at: dict[int, float] = {}
+
+
+async def _run_password_job(fn, *args):
+    """Run a bcrypt call on the password pool, or fail fast with 429 when it is saturated"""
+    if not _password_slots.acquire(blocking=False):
+        logger.warning("Password hashing pool saturated, rejecting request")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    future = _password_pool.submit(fn, *args)
+    # Freed when the job finishes, not when the caller stops waiting (e.g. on disconnect)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(bcrypt.checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+async def get_password_hash(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return (await _run_password_job(bcrypt.hashpw, password.encode('utf-8'), salt)).decode('utf-8')
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash was made with a different work factor than BCRYPT_ROUNDS"""
+    # bcrypt hashes look like $2b$12$<salt+hash>
+    return int(hashed_password.split('$')[2]) != settings.BCRYPT_ROUNDS
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -27,49 +80,153 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str):
     try:
-        print(f"🔍 Decoding token: {token[:20]}...")
-        print(f"🔑 Using secret: {settings.JWT_SECRET[:10]}...")
-        print(f"🔧 Using algorithm: {settings.JWT_ALGORITHM}")
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        print(f"✅ Token decoded successfully: {payload}")
-        return payload
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
     except JWTError as e:
-        print(f"❌ JWT decode error: {e}")
+        logger.debug("JWT decode failed: %s", e)
         return None
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def principal_claims(user: User) -> dict:
+    """Token claims describing the user, embedded only when JWT_EMBED_PRINCIPAL is on"""
+    if not settings.JWT_EMBED_PRINCIPAL:
+        return {}
+    return {
+        "usr": {
+            "email": user.email,
+            "full_name": user.full_name,
+            "role": user.role.value if user.role else None,
+            "created_at": user.created_at.isoformat(),
+            "updated_at": user.updated_at.isoformat()
+        }
+    }
+
+
+def _principal_from_claims(payload: dict) -> Optional[dict]:
+    claims = payload.get("usr")
+    if not claims:
+        return None
+    
+    # invalidate_principal only reaches this process; other workers rely on the max age
+    issued_at = payload.get("iat", 0)
+    if issued_at < time.time() - settings.JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS:
+        return None
+    
+    user_id = int(payload["sub"])
+    changed_at = _principal_changed_at.get(user_id)
+    if changed_at is not None and issued_at < changed_at:
+        return None
+    
+    return {
+        "id": user_id,
+        "email": claims["email"],
+        "full_name": claims["full_name"],
+        "role": UserRole(claims["role"]) if claims["role"] else None,
+        "created_at": datetime.fromisoformat(claims["created_at"]),
+        "updated_at": datetime.fromisoformat(claims["updated_at"])
+    }
+
+
+def _get_cached_principal(key: str) -> Optional[dict]:
+    with _principal_cache_lock:
+        entry = _principal_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del _principal_cache[key]
+            return None
+        _principal_cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_principal(key: str, principal: dict, expires_at: float) -> None:
+    if settings.PRINCIPAL_CACHE_TTL_SECONDS <= 0:
+        return
+    expires_at = min(time.time() + settings.PRINCIPAL_CACHE_TTL_SECONDS, expires_at)
+    with _principal_cache_lock:
+        _principal_cache[key] = (expires_at, principal)
+        _principal_cache.move_to_end(key)
+        while len(_principal_cache) > settings.PRINCIPAL_CACHE_SIZE:
+            _principal_cache.popitem(last=False)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Forget cached and embedded principals for a user after their profile changes"""
+    with _principal_cache_lock:
+        _principal_changed_at[user_id] = time.time()
+        stale = [key for key, (_, principal) in _principal_cache.items() if principal["id"] == user_id]
+        for key in stale:
+            del _principal_cache[key]
+
+
+def authenticate_token(token: str, db: Session) -> User:
+    """Resolve an access token to its user, raising 401 when it is invalid"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    payload = decode_token(token)
-    
-    if payload is None:
-        raise credentials_exception
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    principal = _get_cached_principal(key)
     
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
+    if principal is None:
+        payload = decode_token(token)
+        
+        if payload is None:
+            raise credentials_exception
+        
+        user_id: str = payload.get("sub")
+        # Scoped tokens, such as stream tokens, are not access tokens
+        if user_id is None or "scope" in payload:
+            raise credentials_exception
+        
+        principal = _principal_from_claims(payload)
+        expires_at = payload["exp"]
+        if principal is None:
+            user = db.query(User).filter(User.id == int(user_id)).first()
+            if user is None:
+                raise credentials_exception
+            principal = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        else:
+            # Embedded claims go stale at their max age even while cached
+            expires_at = min(expires_at, payload["iat"] + settings.JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS)
+        
+        _cache_principal(key, principal, expires_at)
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    
-    return user
+    # A fresh transient instance per request, so cached state is never shared or flushed
+    return User(**principal)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    return authenticate_token(credentials.credentials, db)
+
+
+def create_stream_token(user_id: int, board_id: int) -> str:
+    """A short-lived token that only opens one board's change feed"""
+    return create_access_token(
+        {"sub": str(user_id), "scope": STREAM_TOKEN_SCOPE, "board_id": board_id},
+        timedelta(seconds=settings.EVENT_STREAM_TOKEN_SECONDS)
+    )
+
+
+def verify_stream_token(token: str, board_id: int) -> None:
+    """Raise 401 unless token is an unexpired stream token for board_id"""
+    payload = decode_token(token)
+    if payload is None or payload.get("scope") != STREAM_TOKEN_SCOPE or payload.get("board_id") != board_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid stream token"
+        )
 
 
 def require_role(allowed_roles: list[UserRole]):
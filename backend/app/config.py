@@ -8,15 +8,83 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     
+    # Connection pool - "queue", "null" (no pooling, for serverless) or "pgbouncer" (behind a
+    # transaction-mode pooler such as Supabase's on port 6543); see app.db_pool
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = -1  # Replace connections older than this many seconds (-1 never)
+    DB_POOL_PRE_PING: bool = True  # Test each connection on checkout; always off in pgbouncer mode
+    
+    # Board and deal ids - "snowflake" (time-ordered) or "random" (legacy 8-digit). Each
+    # process leases a snowflake worker id from the database unless ID_WORKER_ID (0-31) is set,
+    # renews it every ID_WORKER_HEARTBEAT_SECONDS and loses it after ID_WORKER_LEASE_SECONDS
+    # without a renewal
+    ID_GENERATOR: str = "snowflake"
+    ID_WORKER_ID: int = -1
+    ID_WORKER_LEASE_SECONDS: int = 60
+    ID_WORKER_HEARTBEAT_SECONDS: float = 15.0
+    
     # JWT - Accept both naming conventions
     JWT_SECRET: str = "dev-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    # Embed the user's profile in access tokens so requests can skip the users lookup. The
+    # embedded profile is trusted for JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS after the token is
+    # issued, then the user is loaded again, so demotions and deletions reach every worker
+    JWT_EMBED_PRINCIPAL: bool = False
+    JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS: int = 300
+    
+    # Decoded principal cache for authenticated requests (TTL 0 disables)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    
+    # Password hashing - bcrypt work factor and the dedicated pool that runs it
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 16  # Waiting requests beyond this get a 429
+    
+    # Authorization - seconds a user's board roles stay cached (0 disables)
+    BOARD_ROLE_CACHE_TTL_SECONDS: int = 30
+    
+    # Activity log - buffer this many activities and bulk insert them (0 writes each
+    # one in its mutation's transaction); a crash loses whatever is still buffered
+    ACTIVITY_BUFFER_SIZE: int = 0
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    
+    # Analytics - seconds per-board time-in-stage statistics stay cached (0 disables);
+    # stage changes and deletions on a board drop its entry sooner
+    ANALYTICS_CACHE_TTL_SECONDS: int = 300
+    
+    # Board change feed (Server-Sent Events)
+    EVENTS_REDIS_URL: str = ""  # Share events across workers via Redis pub/sub; in-process when empty
+    EVENT_QUEUE_SIZE: int = 100  # Per-subscriber backlog before it is told to resync
+    SSE_KEEPALIVE_SECONDS: int = 15
+    EVENT_STREAM_TOKEN_SECONDS: int = 60  # Lifetime of the board-scoped token that opens a stream
     
     # Application
     ENVIRONMENT: str = "development"
     FRONTEND_URL: str = "http://localhost:5173"
     
+    # Metrics - Prometheus text format on /metrics; when METRICS_TOKEN is set, scrapers
+    # must send it as a bearer token, otherwise only admins may read it
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    
+    # Query profiler for development and staging - per-request SQL summary in X-Query-*
+    # headers and GET /debug/queries, warning on statements slower than SLOW_QUERY_MS and
+    # on one statement shape repeated QUERY_REPEAT_THRESHOLD+ times in a request (N+1)
+    QUERY_PROFILER_ENABLED: bool = False
+    SLOW_QUERY_MS: float = 100.0
+    QUERY_REPEAT_THRESHOLD: int = 5
+    QUERY_PROFILER_HISTORY: int = 100  # Request profiles kept for /debug/queries
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # Per-module overrides, e.g. "app.auth=DEBUG,sqlalchemy.engine=INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    
     # Optional Supabase fields
     SUPABASE_URL: str = ""
     SUPABASE_KEY: str = ""
@@ -35,3 +35,22 @@ ACTIVITY_ACTIONS = {
     "MEMO_CREATED": "created IC memo",
     "MEMO_UPDATED": "updated IC memo (v{version})"
 }
+
+# Pagination
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+
+# IC memo versions - a full snapshot is stored every N versions, deltas in between
+MEMO_SNAPSHOT_INTERVAL = 20
+
+# Bulk deal import/export
+BULK_IMPORT_BATCH_SIZE = 1000
+BULK_IMPORT_MAX_ERRORS = 100  # Stop collecting validation errors after this many
+BULK_IMPORT_SPOOL_BYTES = 8 * 1024 * 1024  # Uploads larger than this spill to disk
+DEAL_EXPORT_COLUMNS = ("id", "name", "company_url", "stage", "round", "check_size", "status", "owner_id", "created_at")
+
+# Full-text search
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_SNIPPET_LENGTH = 200
@@ -1,26 +1,39 @@
+from contextlib import nullcontext
+import anyio
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
+from app.db_pool import engine_options, instrument_pool, pool_capacity
 
 settings = get_settings()
 
-# Create async engine for Supabase Postgres
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
+# Create engine for Supabase Postgres, pooled according to DB_POOL_MODE
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings))
+instrument_pool(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# A request's dependencies and handler run as separate threadpool calls, and its session
+# keeps its connection in between. With more requests in flight than the pool has
+# connections, every worker thread could end up waiting for a connection held by a
+# request that is queued for a thread, so requests wait for a session slot instead.
+_capacity = pool_capacity(settings)
+_session_slots = anyio.Semaphore(_capacity) if _capacity else nullcontext()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+async def get_db():
+    """
+    Yield a synchronous session. Handlers and dependencies that use it must be
+    plain `def` so FastAPI runs them in its threadpool instead of on the event loop.
+    Long-lived responses such as event streams should open their own short session.
+    """
+    async with _session_slots:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
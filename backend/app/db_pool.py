@@ -0,0 +1,186 @@
+"""
+Connection pool configuration and health metrics.
+
+DB_POOL_MODE selects how connections are pooled:
+- "queue": a QueuePool of DB_POOL_SIZE connections plus DB_MAX_OVERFLOW extra under load.
+- "null": a fresh connection per checkout, closed on checkin. For serverless deployments,
+  where a frozen instance must not hold idle connections.
+- "pgbouncer": for a transaction-mode pooler such as Supabase's on port 6543. Keeps a
+  small LIFO pool, skips pre-ping (the pooler owns the server connections) and disables
+  driver-side prepared statements, which don't survive a server connection swap.
+
+PoolMetrics records checkout wait time, connections in use, overflow checkouts,
+timeouts and invalidations for GET /health/pool.
+"""
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from app.config import Settings
+
+POOL_MODES = ("queue", "null", "pgbouncer")
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """Counters and a checkout wait histogram, safe to update from any thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.checkouts = 0
+            self.in_use = 0
+            self.max_in_use = 0
+            self.connects = 0
+            self.overflow_checkouts = 0
+            self.timeouts = 0
+            self.invalidations = 0
+            self.wait_seconds_sum = 0.0
+            self.wait_buckets = [0] * len(POOL_WAIT_BUCKETS)
+            self.wait_count = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        with self.lock:
+            self.wait_seconds_sum += seconds
+            self.wait_count += 1
+            for index, bound in enumerate(POOL_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+
+    def increment(self, counter: str) -> None:
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def checked_out(self) -> None:
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def checked_in(self) -> None:
+        with self.lock:
+            self.in_use -= 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self.lock:
+            # Cumulative, like a Prometheus histogram; anything slower lands only in the count
+            cumulative, buckets = 0, {}
+            for bound, count in zip(POOL_WAIT_BUCKETS, self.wait_buckets):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            snapshot = {
+                'checkouts': self.checkouts,
+                'in_use': self.in_use,
+                'max_in_use': self.max_in_use,
+                'connects': self.connects,
+                'overflow_checkouts': self.overflow_checkouts,
+                'timeouts': self.timeouts,
+                'invalidations': self.invalidations,
+                'wait_seconds': {
+                    'count': self.wait_count,
+                    'sum': round(self.wait_seconds_sum, 6),
+                    'buckets': buckets,
+                },
+            }
+        if isinstance(pool, QueuePool):
+            snapshot['pool'] = {
+                'size': pool.size(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            }
+        return snapshot
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckout:
+    """Times how long each checkout waits for a connection (including connecting, when it has to)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment("timeouts")
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - started)
+        if isinstance(self, QueuePool) and self.checkedout() > self.size():
+            pool_metrics.increment("overflow_checkouts")
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def engine_options(settings: Settings) -> dict:
+    """create_engine() keyword arguments for the configured pool mode"""
+    if settings.DB_POOL_MODE not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}")
+
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # An in-memory database lives in one connection; keep SQLAlchemy's default pool for it
+        return {}
+
+    if settings.DB_POOL_MODE == "null":
+        return {'poolclass': InstrumentedNullPool}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_MODE == "pgbouncer":
+        # Reuse the most recent connection so the rest idle out at the pooler
+        options.update(pool_pre_ping=False, pool_use_lifo=True)
+        if url.get_driver_name() == "psycopg":
+            options['connect_args'] = {'prepare_threshold': None}
+    return options
+
+
+def pool_capacity(settings: Settings) -> Optional[int]:
+    """Most connections the configured pool hands out at once, or None when it is unbounded"""
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return None
+    if settings.DB_POOL_MODE == "null" or settings.DB_MAX_OVERFLOW < 0:
+        return None
+    return settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Count connections and checkouts on an engine's pool"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool_metrics.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.checked_out()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_metrics.checked_in()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.increment("invalidations")
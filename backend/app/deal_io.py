@@ -0,0 +1,218 @@
+"""
+Bulk deal import and streamed export for a board.
+
+Imports are validated row by row and inserted in batches of multi-row INSERTs
+(deals and their "created" activities) inside a single transaction; any invalid
+row rolls the whole import back. Exports read from a server-side cursor and are
+written out chunk by chunk, so neither direction holds the full set in memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import IO, Iterator
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.constants import (
+    BULK_IMPORT_BATCH_SIZE,
+    BULK_IMPORT_MAX_ERRORS,
+    DEAL_EXPORT_COLUMNS,
+    STREAM_BATCH_SIZE
+)
+from app.analytics import track_deal_changes
+from app.timeline import record_transitions
+from app.search import index_new_documents
+from app.ids import generate_id, get_id_generator
+from app.models import Activity, Deal, User
+from app.schemas import DealImportRow
+
+# Content-Type of an upload -> import format
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_import_rows(upload: IO[bytes], fmt: str) -> Iterator[tuple[int, object]]:
+    """
+    Yield (row number, raw row) pairs: dicts for CSV, undecoded lines for NDJSON, and
+    a ValueError for a CSV record the reader cannot parse
+    """
+    # Invalid UTF-8 is kept as lone surrogates for parse_import_row to reject row by row
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    if fmt == "csv":
+        number = 0
+        try:
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                # Blank cells mean "not provided" so model defaults apply
+                yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+        except csv.Error as exc:
+            # e.g. a field over csv.field_size_limit(); the reader can't resume, so this is the last row
+            yield number + 1, ValueError(f"Malformed CSV: {exc}")
+    else:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                yield number, line
+
+
+def _require_utf8(text: str) -> None:
+    try:
+        text.encode('utf-8')
+    except UnicodeEncodeError:
+        raise ValueError("Row is not valid UTF-8")
+
+
+def parse_import_row(raw) -> DealImportRow:
+    if isinstance(raw, ValueError):
+        raise raw
+    if isinstance(raw, str):
+        _require_utf8(raw)
+        raw = json.loads(raw)
+        if not isinstance(raw, dict):
+            raise ValueError("Expected a JSON object")
+    else:
+        for key, value in raw.items():
+            _require_utf8(key + value)
+    return DealImportRow.model_validate(raw)
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return str(exc)
+
+
+def _allocate_deal_ids(db: Session, count: int, used: set) -> list[int]:
+    """Draw ids from the configured generator, skipping any already taken unless it can't collide"""
+    if get_id_generator().collision_free:
+        return [generate_id() for _ in range(count)]
+    ids: set = set()
+    while len(ids) < count:
+        candidates = {generate_id() for _ in range(count - len(ids))} - used - ids
+        taken = set(db.scalars(select(Deal.id).where(Deal.id.in_(candidates))))
+        ids |= candidates - taken
+    used |= ids
+    return list(ids)
+
+
+def _insert_batch(db: Session, board_id: int, owner: User, rows: list[DealImportRow], used_ids: set) -> int:
+    deal_ids = _allocate_deal_ids(db, len(rows), used_ids)
+    db.execute(insert(Deal), [
+        {'id': deal_id, 'board_id': board_id, 'owner_id': owner.id, **row.model_dump()}
+        for deal_id, row in zip(deal_ids, rows)
+    ])
+    db.execute(insert(Activity), [
+        {
+            'deal_id': deal_id,
+            'user_id': owner.id,
+            'action': "created",
+            'description': f"{owner.full_name} imported deal '{row.name}'"
+        }
+        for deal_id, row in zip(deal_ids, rows)
+    ])
+    track_deal_changes(db, board_id, [(None, (row.stage, row.check_size)) for row in rows])
+    record_transitions(db, [
+        {'deal_id': deal_id, 'board_id': board_id, 'from_stage': None, 'to_stage': row.stage, 'user_id': owner.id}
+        for deal_id, row in zip(deal_ids, rows)
+    ])
+    index_new_documents(db, [
+        {
+            'kind': "deal",
+            'source_id': deal_id,
+            'deal_id': deal_id,
+            'board_id': board_id,
+            'title': row.name,
+            'body': row.company_url
+        }
+        for deal_id, row in zip(deal_ids, rows)
+    ])
+    return len(rows)
+
+
+def import_deals(db: Session, board_id: int, owner: User, upload: IO[bytes], fmt: str) -> dict:
+    """
+    Validate and insert every row of an upload in one transaction. Returns the
+    number imported, or the first BULK_IMPORT_MAX_ERRORS errors with nothing imported.
+    """
+    errors = []
+    batch = []
+    used_ids: set = set()
+    imported = 0
+
+    for number, raw in iter_import_rows(upload, fmt):
+        try:
+            row = parse_import_row(raw)
+        except ValueError as exc:  # Includes pydantic's ValidationError and JSON decode errors
+            errors.append({'row': number, 'message': _error_message(exc)})
+            if len(errors) >= BULK_IMPORT_MAX_ERRORS:
+                break
+            continue
+
+        # Once a row has failed nothing will be committed, so only keep validating
+        if errors:
+            continue
+        batch.append(row)
+        if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+            imported += _insert_batch(db, board_id, owner, batch, used_ids)
+            batch = []
+
+    if errors:
+        db.rollback()
+        return {'imported': 0, 'errors': errors}
+
+    if batch:
+        imported += _insert_batch(db, board_id, owner, batch, used_ids)
+    db.commit()
+    return {'imported': imported, 'errors': []}
+
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def export_deals(db: Session, board_id: int, fmt: str) -> Iterator[str]:
+    """Yield a board's deals as CSV or NDJSON text, one chunk per cursor batch"""
+    columns = [getattr(Deal, column) for column in DEAL_EXPORT_COLUMNS]
+    result = db.execute(
+        select(*columns)
+        .where(Deal.board_id == board_id)
+        .order_by(Deal.created_at, Deal.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(DEAL_EXPORT_COLUMNS)
+        for rows in result.partitions():
+            writer.writerows([_export_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for rows in result.partitions():
+        yield "".join(
+            json.dumps({column: _export_value(value) for column, value in zip(DEAL_EXPORT_COLUMNS, row)}) + "\n"
+            for row in rows
+        )
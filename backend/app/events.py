@@ -0,0 +1,142 @@
+"""
+Board change feed: mutation handlers publish compact events and Server-Sent
+Events subscribers receive them through an in-process broker, or through Redis
+pub/sub when EVENTS_REDIS_URL is set so every worker sees every event
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Sent instead of the backlog when a subscriber falls behind; clients should refetch
+RESYNC_EVENT = {"type": "resync"}
+
+
+def _offer(queue: asyncio.Queue, event: dict) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC_EVENT)
+
+
+class LocalEventBroker:
+    """Fans events out to the subscribers connected to this process"""
+
+    def __init__(self, queue_size: int):
+        self._queue_size = queue_size
+        self._subscribers: dict[int, set] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, board_id: int, event: dict) -> None:
+        self._deliver(board_id, event)
+
+    def _deliver(self, board_id: int, event: dict) -> None:
+        # Publishers run in the threadpool, so hand events to each subscriber's loop
+        with self._lock:
+            subscribers = list(self._subscribers.get(board_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                pass  # Loop already closed; the subscriber is going away
+
+    @asynccontextmanager
+    async def subscribe(self, board_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[board_id].add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers[board_id].discard(entry)
+                if not self._subscribers[board_id]:
+                    del self._subscribers[board_id]
+
+
+class RedisEventBroker(LocalEventBroker):
+    """
+    Publishes through Redis (or any server speaking its pub/sub protocol); one
+    pattern subscription per process relays messages to local subscribers.
+    """
+
+    CHANNEL_PREFIX = "board-events:"
+
+    def __init__(self, url: str, queue_size: int):
+        super().__init__(queue_size)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENTS_REDIS_URL is set but the 'redis' package is not installed")
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._relay_task: Optional[asyncio.Task] = None
+        self._relay_lock = asyncio.Lock()
+
+    def publish(self, board_id: int, event: dict) -> None:
+        self._client.publish(f"{self.CHANNEL_PREFIX}{board_id}", json.dumps(event))
+
+    async def _relay(self, pubsub) -> None:
+        async for message in pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            channel = message["channel"].decode("utf-8")
+            board_id = int(channel[len(self.CHANNEL_PREFIX):])
+            self._deliver(board_id, json.loads(message["data"]))
+
+    @asynccontextmanager
+    async def subscribe(self, board_id: int) -> AsyncIterator[asyncio.Queue]:
+        # Subscribers arriving while the relay is still connecting must wait for it, not start another
+        async with self._relay_lock:
+            if self._relay_task is None or self._relay_task.done():
+                import redis.asyncio
+                pubsub = redis.asyncio.from_url(self._url).pubsub()
+                await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                self._relay_task = asyncio.create_task(self._relay(pubsub))
+        async with super().subscribe(board_id) as queue:
+            yield queue
+
+
+_broker: Optional[LocalEventBroker] = None
+
+
+def get_broker() -> LocalEventBroker:
+    global _broker
+    if _broker is None:
+        if settings.EVENTS_REDIS_URL:
+            _broker = RedisEventBroker(settings.EVENTS_REDIS_URL, settings.EVENT_QUEUE_SIZE)
+        else:
+            _broker = LocalEventBroker(settings.EVENT_QUEUE_SIZE)
+    return _broker
+
+
+def publish_board_event(board_id: int, event_type: str, **data) -> None:
+    """Publish a change event after a commit; delivery failures never fail the request"""
+    event = {"type": event_type, "board_id": board_id, **data}
+    try:
+        get_broker().publish(board_id, event)
+    except Exception:
+        logger.warning("Failed to publish %s event for board %s", event_type, board_id, exc_info=True)
+
+
+async def stream_board_events(board_id: int) -> AsyncIterator[str]:
+    """Server-Sent Events for one board, with comment keepalives while idle"""
+    async with get_broker().subscribe(board_id) as queue:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,232 @@
+"""
+Primary key generation for boards and deals, selected by ID_GENERATOR.
+
+"snowflake" (the default) issues time-ordered integers laid out as
+
+    | 41 bits: milliseconds since ID_EPOCH_MS | 5 bits: worker | 7 bits: sequence |
+
+New rows land on the right-hand edge of the primary key B-tree instead of a
+random leaf, and ids are unique as long as live processes hold distinct worker
+ids. The layout stops at 53 bits, not Snowflake's 63, so every id survives a
+round trip through a JavaScript number; 41 bits of milliseconds last until 2093.
+Ids start above 10^14 and so never collide with legacy 8-digit ids.
+
+Unless ID_WORKER_ID is set, each process leases the lowest free worker id from
+the id_workers table at startup (or on first use, and again after a fork), so
+workers started from one configuration still get distinct ids. A background
+thread renews the lease every ID_WORKER_HEARTBEAT_SECONDS; a lease that goes
+ID_WORKER_LEASE_SECONDS without renewal, such as a crashed process's, is free
+for the next process to claim. Leases are released on shutdown.
+
+"random" is the legacy scheme: a random 8-digit integer, unique only by luck.
+"""
+import atexit
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 5
+SEQUENCE_BITS = 7
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def _claim_worker_id(token: str) -> int:
+    """Lease the lowest worker id without a live lease, on its own connection"""
+    # Imported here because app.models takes its column defaults from this module
+    from app.database import engine
+    from app.models import IdWorker
+
+    for _ in range(MAX_WORKER_ID + 1):
+        now = datetime.now(timezone.utc)
+        try:
+            with engine.begin() as conn:
+                conn.execute(delete(IdWorker).where(
+                    IdWorker.heartbeat_at < now - timedelta(seconds=settings.ID_WORKER_LEASE_SECONDS)
+                ))
+                leased = set(conn.execute(select(IdWorker.id)).scalars())
+                free = [worker_id for worker_id in range(MAX_WORKER_ID + 1) if worker_id not in leased]
+                if not free:
+                    raise RuntimeError(
+                        f"All {MAX_WORKER_ID + 1} snowflake worker ids are leased; "
+                        "stop a process, wait for a stale lease to expire or set ID_WORKER_ID"
+                    )
+                conn.execute(insert(IdWorker).values(id=free[0], lease_token=token, heartbeat_at=now))
+            return free[0]
+        except IntegrityError:
+            # Another process claimed the same id first; look again
+            continue
+    raise RuntimeError("Could not lease a snowflake worker id")
+
+
+def _renew_lease(worker_id: int, token: str) -> bool:
+    """Push the lease's expiry back; False if it expired and another process took the id"""
+    from app.database import engine
+    from app.models import IdWorker
+
+    with engine.begin() as conn:
+        renewed = conn.execute(
+            update(IdWorker)
+            .where(IdWorker.id == worker_id, IdWorker.lease_token == token)
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        ).rowcount
+    return renewed == 1
+
+
+def _release_lease(worker_id: int, token: str) -> None:
+    from app.database import engine
+    from app.models import IdWorker
+
+    with engine.begin() as conn:
+        conn.execute(delete(IdWorker).where(IdWorker.id == worker_id, IdWorker.lease_token == token))
+
+
+class SnowflakeIdGenerator:
+    """Time-ordered ids, monotonic within the process"""
+    collision_free = True
+
+    def __init__(self, worker_id: Optional[int] = None):
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"Worker id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.lease_token = None
+        self.last_ms = 0
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def _lease(self) -> None:
+        # Called with the lock held
+        token = secrets.token_hex(16)
+        self.worker_id, self.lease_token = _claim_worker_id(token), token
+        self.stopped = threading.Event()
+        threading.Thread(
+            target=self._heartbeat, args=(self.worker_id, self.lease_token, self.stopped),
+            name="id-worker-heartbeat", daemon=True
+        ).start()
+
+    def _heartbeat(self, worker_id: int, token: str, stopped: threading.Event) -> None:
+        while not stopped.wait(settings.ID_WORKER_HEARTBEAT_SECONDS):
+            try:
+                renewed = _renew_lease(worker_id, token)
+            except SQLAlchemyError:
+                logger.exception("Could not renew snowflake worker id %d", worker_id)
+                continue
+            if not renewed:
+                logger.error("Lost the lease on snowflake worker id %d; leasing a new one", worker_id)
+                with self.lock:
+                    if self.lease_token == token:
+                        # Here rather than on the next id, which may be inside a write transaction
+                        self.worker_id = self.lease_token = None
+                        try:
+                            self._lease()
+                        except (RuntimeError, SQLAlchemyError):
+                            logger.exception("Could not lease a new snowflake worker id")
+                return
+
+    def reserve(self) -> None:
+        with self.lock:
+            if self.worker_id is None:
+                self._lease()
+
+    def release(self) -> None:
+        with self.lock:
+            if self.lease_token is None:
+                return
+            self.stopped.set()
+            try:
+                _release_lease(self.worker_id, self.lease_token)
+            except SQLAlchemyError:
+                logger.warning("Could not release snowflake worker id %d; it expires on its own", self.worker_id)
+            self.worker_id = self.lease_token = None
+
+    def __call__(self) -> int:
+        with self.lock:
+            if self.worker_id is None:
+                self._lease()
+            now = int(time.time() * 1000) - ID_EPOCH_MS
+            if now > self.last_ms:
+                self.last_ms = now
+                self.sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from the
+                # last id, borrowing the next millisecond when the sequence runs out
+                self.sequence += 1
+                if self.sequence > MAX_SEQUENCE:
+                    self.last_ms += 1
+                    self.sequence = 0
+            return (self.last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self.sequence
+
+
+class RandomIdGenerator:
+    """Legacy random 8-digit ids; callers must check for collisions themselves"""
+    collision_free = False
+
+    def __init__(self, worker_id: Optional[int] = None):
+        pass
+
+    def reserve(self) -> None:
+        pass
+
+    def release(self) -> None:
+        pass
+
+    def __call__(self) -> int:
+        return random.randint(10000000, 99999999)
+
+
+ID_GENERATORS = {
+    "snowflake": SnowflakeIdGenerator,
+    "random": RandomIdGenerator,
+}
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_id_generator():
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            worker_id = settings.ID_WORKER_ID if settings.ID_WORKER_ID >= 0 else None
+            _generator = ID_GENERATORS[settings.ID_GENERATOR](worker_id)
+        return _generator
+
+
+def reserve_worker_id() -> None:
+    """Lease the worker id up front, before any request holds a write transaction"""
+    get_id_generator().reserve()
+
+
+def release_worker_id() -> None:
+    """Give the leased worker id back so the next process can claim it"""
+    if _generator is not None:
+        _generator.release()
+
+
+def generate_id() -> int:
+    """Primary key for a new board or deal"""
+    return get_id_generator()()
+
+
+def _reset_after_fork() -> None:
+    # A forked worker must not keep issuing ids under its parent's worker id
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(release_worker_id)
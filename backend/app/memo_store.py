@@ -0,0 +1,164 @@
+"""
+Delta-encoded IC memo version storage.
+
+Every MEMO_SNAPSHOT_INTERVAL versions a row keeps the full text of each section
+(is_snapshot); the rows in between leave the section columns empty and store
+line-level diffs of only the sections that changed in `delta`. Any version is
+rebuilt from the nearest snapshot at or below it, so reconstruction reads at
+most MEMO_SNAPSHOT_INTERVAL rows.
+"""
+from difflib import SequenceMatcher, unified_diff
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.constants import MEMO_SNAPSHOT_INTERVAL
+from app.models import MemoVersion, User
+
+MEMO_SECTIONS = ("summary", "market", "product", "traction", "risks", "open_questions")
+
+EMPTY_SECTIONS = {section: "" for section in MEMO_SECTIONS}
+
+
+def diff_section(old: str, new: str) -> list:
+    """Line-level edit script turning old into new: [[start, end, replacement], ...]"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, "".join(new_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_section_diff(old: str, ops: list) -> str:
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    position = 0
+    for start, end, replacement in ops:
+        parts.extend(old_lines[position:start])
+        parts.append(replacement)
+        position = end
+    parts.extend(old_lines[position:])
+    return "".join(parts)
+
+
+def build_memo_version(
+    memo_id: int,
+    version_num: int,
+    previous: Optional[dict],
+    sections: dict,
+    author_id: Optional[int] = None
+) -> MemoVersion:
+    """Create the row for a new version, as a snapshot or as a delta against previous"""
+    changed = [
+        section for section in MEMO_SECTIONS
+        if sections[section] != (previous or EMPTY_SECTIONS)[section]
+    ]
+
+    if previous is None or (version_num - 1) % MEMO_SNAPSHOT_INTERVAL == 0:
+        return MemoVersion(
+            memo_id=memo_id,
+            version=version_num,
+            author_id=author_id,
+            changed_sections=changed,
+            is_snapshot=True,
+            **sections
+        )
+
+    return MemoVersion(
+        memo_id=memo_id,
+        version=version_num,
+        author_id=author_id,
+        changed_sections=changed,
+        is_snapshot=False,
+        delta={section: diff_section(previous[section], sections[section]) for section in changed},
+        **{section: None for section in MEMO_SECTIONS}
+    )
+
+
+def diff_versions(old: dict, new: dict) -> dict:
+    """Unified diff text for each section that differs between two materialized versions"""
+    diffs = {}
+    for section in MEMO_SECTIONS:
+        if old[section] == new[section]:
+            continue
+        lines = unified_diff(
+            old[section].splitlines(keepends=True),
+            new[section].splitlines(keepends=True),
+            fromfile=f"v{old['version']}/{section}",
+            tofile=f"v{new['version']}/{section}"
+        )
+        # Keep the output line-oriented even when a section lacks a trailing newline
+        diffs[section] = "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+    return diffs
+
+
+def materialize_versions(rows: list[MemoVersion]) -> list[dict]:
+    """
+    Rebuild full section text for consecutive version rows in ascending order.
+    The first row must be a snapshot.
+    """
+    versions = []
+    sections = None
+    for row in rows:
+        if row.is_snapshot:
+            sections = {section: getattr(row, section) or "" for section in MEMO_SECTIONS}
+        else:
+            sections = {
+                section: apply_section_diff(sections[section], row.delta[section])
+                if section in row.delta else sections[section]
+                for section in MEMO_SECTIONS
+            }
+        versions.append({
+            'id': row.id,
+            'version': row.version,
+            'created_at': row.created_at,
+            **sections
+        })
+    return versions
+
+
+def load_memo_version(db: Session, memo_id: int, version_num: int) -> Optional[dict]:
+    """Reconstruct one version from its nearest snapshot in a single query"""
+    snapshot_version = db.query(func.max(MemoVersion.version)).filter(
+        MemoVersion.memo_id == memo_id,
+        MemoVersion.is_snapshot.is_(True),
+        MemoVersion.version <= version_num
+    ).scalar_subquery()
+
+    rows = db.query(MemoVersion).filter(
+        MemoVersion.memo_id == memo_id,
+        MemoVersion.version >= snapshot_version,
+        MemoVersion.version <= version_num
+    ).order_by(MemoVersion.version).all()
+
+    if not rows or rows[-1].version != version_num:
+        return None
+    return materialize_versions(rows)[-1]
+
+
+def list_version_summaries(db: Session, memo_id: int) -> list[dict]:
+    """Version metadata, newest first, without reading any section text"""
+    rows = db.query(
+        MemoVersion.version,
+        MemoVersion.author_id,
+        User.full_name,
+        MemoVersion.changed_sections,
+        MemoVersion.created_at
+    ).outerjoin(
+        User, User.id == MemoVersion.author_id
+    ).filter(
+        MemoVersion.memo_id == memo_id
+    ).order_by(MemoVersion.version.desc()).all()
+
+    return [
+        {
+            'version': version,
+            'author_id': author_id,
+            'author_name': author_name,
+            'changed_sections': changed_sections,
+            'created_at': created_at
+        }
+        for version, author_id, author_name, changed_sections, created_at in rows
+    ]
@@ -0,0 +1,216 @@
+"""
+Prometheus-style request metrics, served on /metrics in the text exposition format.
+
+MetricsMiddleware records, per route template and router module:
+- request counts by status
+- latency histograms
+- response size histograms
+- the number of SQL statements and total time spent in them during the request
+
+Statements are counted through SQLAlchemy cursor events into a per-request
+context variable. The work per request is a few dict updates under one lock.
+Connection pool metrics from app.db_pool are rendered alongside.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.db_pool import POOL_WAIT_BUCKETS, pool_metrics
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# [statements, seconds] for the request being handled
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series: dict[tuple, float] = {} if labels else {(): 0}
+
+    def inc(self, values: tuple = (), amount: float = 1) -> None:
+        # Callers hold _lock
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for values, total in self.series.items():
+            label_text = _labels(self.labels, values)
+            lines.append(f"{self.name}{{{label_text}}} {total}" if label_text else f"{self.name} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: tuple, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self.series: dict[tuple, list] = {}  # label values -> per-bucket counts + [sum, count]
+
+    def observe(self, values: tuple, amount: float) -> None:
+        # Callers hold _lock
+        series = self.series.get(values)
+        if series is None:
+            series = self.series[values] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if amount <= bound:
+                series[index] += 1
+                break
+        series[-2] += amount
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, series in self.series.items():
+            label_text = _labels(self.labels, values)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+ROUTE_LABELS = ("method", "route", "router")
+
+requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ROUTE_LABELS + ("status",)
+)
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to handle a request, including streaming the body",
+    LATENCY_BUCKETS, ROUTE_LABELS
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Response body size", SIZE_BUCKETS, ROUTE_LABELS
+)
+request_queries = Histogram(
+    "db_queries_per_request", "SQL statements executed while handling a request", QUERY_COUNT_BUCKETS, ROUTE_LABELS
+)
+request_query_duration = Histogram(
+    "db_query_duration_seconds_per_request", "Time spent in SQL statements while handling a request",
+    LATENCY_BUCKETS, ROUTE_LABELS
+)
+queries_total = Counter("db_queries_total", "SQL statements executed, in or out of requests")
+query_seconds_total = Counter("db_query_seconds_total", "Time spent in SQL statements, in or out of requests")
+
+REQUEST_METRICS = (requests_total, request_duration, response_size, request_queries, request_query_duration)
+
+
+def instrument_queries(engine: Engine) -> None:
+    """Time every statement on the engine and charge it to the current request, if any"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _request_queries.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        with _lock:
+            queries_total.inc()
+            query_seconds_total.inc(amount=elapsed)
+
+
+def _route_labels(scope) -> tuple:
+    route = scope.get("route")
+    if route is None:
+        # Unmatched paths share one series so scanners can't blow up cardinality
+        return scope["method"], "unmatched", ""
+    return scope["method"], route.path, route.endpoint.__module__.rsplit(".", 1)[-1]
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request, response size and per-request SQL metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_queries.set(stats)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _request_queries.reset(token)
+            elapsed = time.perf_counter() - started
+            labels = _route_labels(scope)
+            with _lock:
+                requests_total.inc(labels + (status_code,))
+                request_duration.observe(labels, elapsed)
+                response_size.observe(labels, size)
+                request_queries.observe(labels, stats[0])
+                request_query_duration.observe(labels, stats[1])
+
+
+def _render_pool(pool) -> list[str]:
+    snapshot = pool_metrics.snapshot(pool)
+    lines = []
+    for name, key, kind, documentation in (
+        ("db_pool_checkouts_total", "checkouts", "counter", "Connections checked out of the pool"),
+        ("db_pool_connects_total", "connects", "counter", "New database connections opened"),
+        ("db_pool_overflow_checkouts_total", "overflow_checkouts", "counter", "Checkouts served beyond the pool size"),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that gave up waiting for a connection"),
+        ("db_pool_invalidations_total", "invalidations", "counter", "Connections discarded as broken"),
+        ("db_pool_in_use", "in_use", "gauge", "Connections currently checked out"),
+        ("db_pool_max_in_use", "max_in_use", "gauge", "Most connections checked out at once since startup"),
+    ):
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {snapshot[key]}"]
+
+    wait = snapshot['wait_seconds']
+    name = "db_pool_checkout_wait_seconds"
+    lines += [f"# HELP {name} Time spent waiting for a pooled connection", f"# TYPE {name} histogram"]
+    for bound in POOL_WAIT_BUCKETS:
+        lines.append(f'{name}_bucket{{le="{bound}"}} {wait["buckets"][str(bound)]}')
+    lines += [f'{name}_bucket{{le="+Inf"}} {wait["count"]}', f"{name}_sum {wait['sum']}", f"{name}_count {wait['count']}"]
+    return lines
+
+
+def render_metrics(pool=None) -> str:
+    """Every metric in the Prometheus text exposition format"""
+    with _lock:
+        lines = []
+        for metric in REQUEST_METRICS + (queries_total, query_seconds_total):
+            lines += metric.render()
+    lines += _render_pool(pool)
+    return "\n".join(lines) + "\n"
@@ -1,14 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Numeric, Table, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Text, Enum, Numeric, Table, Boolean, Index, JSON, UniqueConstraint, literal_column, true
+from sqlalchemy.dialects import postgresql  # Registers the typed to_tsvector() used by search_vector
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.ids import generate_id
 import enum
-import random
-
-
-def generate_random_id():
-    """Generate a random 8-digit number for IDs"""
-    return random.randint(10000000, 99999999)
 
 
 class UserRole(str, enum.Enum):
@@ -36,10 +32,11 @@ class DealStatus(str, enum.Enum):
 board_members = Table(
     'board_members',
     Base.metadata,
-    Column('board_id', Integer, ForeignKey('boards.id', ondelete='CASCADE'), primary_key=True),
+    Column('board_id', BigInteger, ForeignKey('boards.id', ondelete='CASCADE'), primary_key=True),
     Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
     Column('role', Enum(UserRole), nullable=True),  # Board-specific role
-    Column('joined_at', DateTime(timezone=True), server_default=func.now())
+    Column('joined_at', DateTime(timezone=True), server_default=func.now()),
+    Index('ix_board_members_user_id', 'user_id')
 )
 
 
@@ -63,10 +60,20 @@ class User(Base):
     boards = relationship("Board", secondary=board_members, back_populates="members")
 
 
+class IdWorker(Base):
+    """A snowflake worker id leased by a live process (see app.ids); the id is the worker id"""
+    __tablename__ = "id_workers"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    lease_token = Column(String(32), nullable=False)
+    registered_at = Column(DateTime(timezone=True), server_default=func.now())
+    heartbeat_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class Board(Base):
     __tablename__ = "boards"
     
-    id = Column(Integer, primary_key=True, index=True, default=generate_random_id)
+    id = Column(BigInteger, primary_key=True, index=True, default=generate_id)
     name = Column(String, nullable=False)
     description = Column(Text)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -78,17 +85,29 @@ class Board(Base):
     creator = relationship("User", back_populates="created_boards", foreign_keys=[created_by])
     members = relationship("User", secondary=board_members, back_populates="boards")
     deals = relationship("Deal", back_populates="board", cascade="all, delete-orphan")
+    stage_rollups = relationship("BoardStageRollup", cascade="all, delete-orphan")
+
+
+class BoardStageRollup(Base):
+    """Running per-stage deal count and check size totals for a board"""
+    __tablename__ = "board_stage_rollups"
+    
+    board_id = Column(BigInteger, ForeignKey("boards.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(Enum(DealStage), primary_key=True)
+    deal_count = Column(Integer, nullable=False, default=0)
+    check_size_total = Column(Numeric(18, 2), nullable=False, default=0)
+    check_size_count = Column(Integer, nullable=False, default=0)  # Deals with a check size, for averages
 
 
 
 class Deal(Base):
     __tablename__ = "deals"
     
-    id = Column(Integer, primary_key=True, index=True, default=generate_random_id)
+    id = Column(BigInteger, primary_key=True, index=True, default=generate_id)
     name = Column(String, nullable=False)
     company_url = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    board_id = Column(Integer, ForeignKey("boards.id"), nullable=False)
+    board_id = Column(BigInteger, ForeignKey("boards.id"), nullable=False)
     stage = Column(Enum(DealStage), nullable=False, default=DealStage.SOURCED)
     round = Column(String)  # e.g., "Seed", "Series A"
     check_size = Column(Numeric(15, 2))  # Investment amount
@@ -104,13 +123,38 @@ class Deal(Base):
     ic_memo = relationship("ICMemo", back_populates="deal", uselist=False, cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="deal", cascade="all, delete-orphan")
     votes = relationship("Vote", back_populates="deal", cascade="all, delete-orphan")
+    stage_transitions = relationship("DealStageTransition", cascade="all, delete-orphan")
+    search_documents = relationship("SearchDocument", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index('ix_deals_board_id_created_at', board_id, created_at, id),
+    )
+
+
+class DealStageTransition(Base):
+    """A deal entering a stage; from_stage is NULL for the stage it was created in"""
+    __tablename__ = "deal_stage_transitions"
+    
+    id = Column(Integer, primary_key=True)
+    deal_id = Column(BigInteger, ForeignKey("deals.id", ondelete="CASCADE"), nullable=False)
+    board_id = Column(BigInteger, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
+    from_stage = Column(Enum(DealStage))
+    to_stage = Column(Enum(DealStage), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('ix_deal_stage_transitions_deal_id_created_at', deal_id, created_at),
+        Index('ix_deal_stage_transitions_board_id_created_at', board_id, created_at, id),
+        Index('ix_deal_stage_transitions_board_id_to_stage_created_at', board_id, to_stage, created_at),
+    )
 
 
 class Activity(Base):
     __tablename__ = "activities"
     
     id = Column(Integer, primary_key=True, index=True)
-    deal_id = Column(Integer, ForeignKey("deals.id"), nullable=False)
+    deal_id = Column(BigInteger, ForeignKey("deals.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     action = Column(String, nullable=False)  # e.g., "moved from Screen to Diligence"
     description = Column(Text)
@@ -119,13 +163,17 @@ class Activity(Base):
     # Relationships
     deal = relationship("Deal", back_populates="activities")
     user = relationship("User", back_populates="activities")
+    
+    __table_args__ = (
+        Index('ix_activities_deal_id_created_at', deal_id, created_at.desc(), id.desc()),
+    )
 
 
 class ICMemo(Base):
     __tablename__ = "ic_memos"
     
     id = Column(Integer, primary_key=True, index=True)
-    deal_id = Column(Integer, ForeignKey("deals.id"), nullable=False, unique=True)
+    deal_id = Column(BigInteger, ForeignKey("deals.id"), nullable=False, unique=True)
     current_version = Column(Integer, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -141,6 +189,13 @@ class MemoVersion(Base):
     id = Column(Integer, primary_key=True, index=True)
     memo_id = Column(Integer, ForeignKey("ic_memos.id"), nullable=False)
     version = Column(Integer, nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL", name="memo_versions_author_id_fkey"))
+    changed_sections = Column(JSON)  # Section names edited in this version; NULL if unknown
+    
+    # Snapshot rows hold every section in full; delta rows leave the sections
+    # NULL and store line diffs of the changed sections (see app.memo_store)
+    is_snapshot = Column(Boolean, nullable=False, default=True, server_default=true())
+    delta = Column(JSON)
     
     # Fixed sections
     summary = Column(Text, default="")
@@ -154,13 +209,17 @@ class MemoVersion(Base):
     
     # Relationships
     memo = relationship("ICMemo", back_populates="versions")
+    
+    __table_args__ = (
+        Index('ix_memo_versions_memo_id_version', memo_id, version, unique=True),
+    )
 
 
 class Comment(Base):
     __tablename__ = "comments"
     
     id = Column(Integer, primary_key=True, index=True)
-    deal_id = Column(Integer, ForeignKey("deals.id"), nullable=False)
+    deal_id = Column(BigInteger, ForeignKey("deals.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -169,13 +228,17 @@ class Comment(Base):
     # Relationships
     deal = relationship("Deal", back_populates="comments")
     user = relationship("User", back_populates="comments")
+    
+    __table_args__ = (
+        Index('ix_comments_deal_id_created_at', deal_id, created_at.desc(), id.desc()),
+    )
 
 
 class Vote(Base):
     __tablename__ = "votes"
     
     id = Column(Integer, primary_key=True, index=True)
-    deal_id = Column(Integer, ForeignKey("deals.id"), nullable=False)
+    deal_id = Column(BigInteger, ForeignKey("deals.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     vote = Column(String, nullable=False)  # "approve" or "decline"
     comment = Column(Text)
@@ -184,3 +247,40 @@ class Vote(Base):
     # Relationships
     deal = relationship("Deal", back_populates="votes")
     user = relationship("User", back_populates="votes")
+    
+    __table_args__ = (
+        Index('ix_votes_deal_id_user_id', deal_id, user_id, unique=True),
+    )
+
+
+def search_vector(title, body):
+    """
+    English tsvector over a search document's title and body, built from literals
+    only so queries match the GIN expression index
+    """
+    return func.to_tsvector(
+        literal_column("'english'::regconfig"),
+        func.coalesce(title, literal_column("''")).op("||")(literal_column("' '")).op("||")(
+            func.coalesce(body, literal_column("''"))
+        )
+    )
+
+
+class SearchDocument(Base):
+    """Searchable text for a deal, a comment or the current IC memo, scoped by board"""
+    __tablename__ = "search_documents"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # "deal", "comment" or "memo"
+    source_id = Column(BigInteger, nullable=False)  # Id of the deal, comment or memo
+    deal_id = Column(BigInteger, ForeignKey("deals.id", ondelete="CASCADE"), nullable=False)
+    board_id = Column(BigInteger, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String)
+    body = Column(Text)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('kind', 'source_id', name='uq_search_documents_kind_source_id'),
+        # Full-text search runs in Postgres; SQLite uses the in-process index in app.search
+        Index('ix_search_documents_search_vector', search_vector(title, body), postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
@@ -0,0 +1,150 @@
+"""
+Keyset pagination and NDJSON streaming for list endpoints
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from fastapi import HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import DateTime, Row, and_, func, literal, or_
+from sqlalchemy.orm import Query as SAQuery
+from app.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_BATCH_SIZE
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# SQLite keeps timestamps as text: server defaults store "YYYY-MM-DD HH:MM:SS" while
+# bound datetimes carry microseconds, so raw comparisons disagree with time order
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def encode_cursor(value, row_id: int) -> str:
+    """Encode a (sort value, id) position as an opaque URL-safe cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+
+def decode_cursor(cursor: str, column) -> tuple:
+    """Decode a cursor produced by encode_cursor, parsing the value as the sort column's type"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if value is not None:
+            python_type = column.type.python_type
+            value = python_type.fromisoformat(value) if python_type is datetime else python_type(value)
+        return value, int(row_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+class PageParams:
+    """Query parameters shared by paginated list endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} response header"),
+        format: str = Query("json", pattern="^(json|ndjson)$", description="Use ndjson to stream every row")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.format = format
+
+
+def keyset(
+    query: SAQuery,
+    model,
+    cursor: Optional[str],
+    descending: bool = True,
+    column=None,
+    nullable: bool = False
+) -> SAQuery:
+    """
+    Order a query by (column, id), created_at by default, and resume it after the
+    cursor position. Rows where a nullable column is NULL sort last in either direction.
+    On SQLite, timestamps are ordered and compared in one normalized text form.
+    """
+    if column is None:
+        column = model.created_at
+    sqlite_timestamp = isinstance(column.type, DateTime) and query.session.get_bind().dialect.name == "sqlite"
+    key = func.strftime(SQLITE_TIMESTAMP_FORMAT, column) if sqlite_timestamp else column
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, column)
+        after_id = model.id < row_id if descending else model.id > row_id
+        if value is None:
+            query = query.filter(column.is_(None), after_id)
+        else:
+            if sqlite_timestamp:
+                value = func.strftime(SQLITE_TIMESTAMP_FORMAT, literal(value, column.type))
+            position = or_(
+                key < value if descending else key > value,
+                and_(key == value, after_id)
+            )
+            query = query.filter(or_(position, column.is_(None)) if nullable else position)
+
+    order = (key.desc(), model.id.desc()) if descending else (key.asc(), model.id.asc())
+    if nullable:
+        order = (column.is_(None),) + order
+    return query.order_by(*order)
+
+
+def _sparse_row(row, schema, fields: list[str]) -> dict:
+    # Column projections come back as Rows; full entities go through the schema
+    data = row._asdict() if isinstance(row, Row) else schema.model_validate(row).model_dump()
+    return jsonable_encoder({field: data[field] for field in fields})
+
+
+def paginate(
+    query: SAQuery,
+    model,
+    schema,
+    page: PageParams,
+    response: Response,
+    descending: bool = True,
+    column=None,
+    nullable: bool = False,
+    fields: Optional[list[str]] = None
+):
+    """
+    Return one page of rows, setting the next cursor header when more remain.
+    In ndjson mode every remaining row is streamed from a server-side cursor instead.
+    With fields, rows are reduced to those keys and returned without response model validation.
+    """
+    query = keyset(query, model, page.cursor, descending, column, nullable)
+    sort_key = (column if column is not None else model.created_at).key
+
+    if page.format == "ndjson":
+        def generate():
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                if fields:
+                    yield json.dumps(_sparse_row(row, schema, fields)) + "\n"
+                else:
+                    yield schema.model_validate(row).model_dump_json() + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(page.limit + 1).all()
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_key), last.id)
+
+    if fields:
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return JSONResponse([_sparse_row(row, schema, fields) for row in rows], headers=headers)
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
@@ -0,0 +1,87 @@
+"""
+Board authorization: each user's board -> role map is loaded once and checked in memory
+"""
+import threading
+import time
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.auth import get_current_user
+from app.config import get_settings
+from app.database import get_db
+from app.models import Board, User, UserRole, board_members
+
+settings = get_settings()
+
+# user_id -> (expires_at, {board_id: role}); short-lived so other workers' changes show up quickly
+_role_cache: dict[int, tuple[float, dict[int, Optional[UserRole]]]] = {}
+_role_cache_lock = threading.Lock()
+
+
+def load_board_roles(user_id: int, db: Session) -> dict[int, Optional[UserRole]]:
+    """Get every board the user belongs to mapped to their role on it (None if no role)"""
+    now = time.monotonic()
+    with _role_cache_lock:
+        cached = _role_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    rows = db.query(board_members.c.board_id, board_members.c.role).filter(
+        board_members.c.user_id == user_id
+    ).all()
+    roles = {board_id: role for board_id, role in rows}
+
+    if settings.BOARD_ROLE_CACHE_TTL_SECONDS > 0:
+        with _role_cache_lock:
+            _role_cache[user_id] = (now + settings.BOARD_ROLE_CACHE_TTL_SECONDS, roles)
+    return roles
+
+
+def invalidate_board_roles(user_id: Optional[int] = None) -> None:
+    """Drop cached roles for one user, or for everyone when user_id is None"""
+    with _role_cache_lock:
+        if user_id is None:
+            _role_cache.clear()
+        else:
+            _role_cache.pop(user_id, None)
+
+
+class BoardPermissions:
+    """The current user's board roles for the duration of one request"""
+
+    def __init__(self, user: User, roles: dict[int, Optional[UserRole]]):
+        self.user = user
+        self.roles = roles
+
+    @property
+    def board_ids(self) -> list[int]:
+        return list(self.roles)
+
+    def role(self, board_id: int) -> Optional[UserRole]:
+        return self.roles.get(board_id)
+
+    def can_access(self, board: Board) -> bool:
+        return board.created_by == self.user.id or board.id in self.roles
+
+    def require_access(self, board: Board) -> None:
+        if not self.can_access(board):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have access to this board"
+            )
+
+    def require_role(self, board_id: int, allowed_roles: list[UserRole], detail: str) -> UserRole:
+        role = self.roles.get(board_id)
+        if role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail
+            )
+        return role
+
+
+def get_board_permissions(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> BoardPermissions:
+    return BoardPermissions(current_user, load_board_roles(current_user.id, db))
@@ -0,0 +1,81 @@
+"""
+Pytest plugin holding tests to a SQL query budget.
+
+Enable it with `pytest -p app.pytest_plugin` (or `pytest_plugins = ["app.pytest_plugin"]`
+in a conftest). Every statement the app's engine runs during a test is counted,
+including those from requests handled on TestClient's worker thread.
+
+- @pytest.mark.query_budget(n) fails the test if it issues more than n statements.
+- --query-budget=N applies the same limit to every test without a marker.
+- --fail-on-n-plus-one fails tests that repeat one statement shape
+  QUERY_REPEAT_THRESHOLD or more times.
+- The query_counter fixture yields the test's QueryCollector for finer assertions.
+"""
+import pytest
+from app.config import get_settings
+from app.query_profiler import QueryCollector, instrument_profiler
+
+settings = get_settings()
+
+_instrumented = False
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query budget")
+    group.addoption(
+        "--query-budget", type=int, default=None,
+        help="fail tests that issue more SQL statements than this"
+    )
+    group.addoption(
+        "--fail-on-n-plus-one", action="store_true", default=False,
+        help="fail tests that repeat a statement shape QUERY_REPEAT_THRESHOLD or more times"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(n): fail the test if it issues more than n SQL statements")
+
+
+def _instrument_engine() -> None:
+    global _instrumented
+    if _instrumented or settings.QUERY_PROFILER_ENABLED:
+        # main.py instruments the engine itself when the profiler is on
+        return
+    from app.database import engine
+    instrument_profiler(engine)
+    _instrumented = True
+
+
+@pytest.fixture
+def query_counter():
+    """The SQL statements issued during the test"""
+    _instrument_engine()
+    with QueryCollector() as collector:
+        yield collector
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    budget = marker.args[0] if marker is not None else item.config.getoption("query_budget")
+    fail_on_repeats = item.config.getoption("fail_on_n_plus_one")
+    if budget is None and not fail_on_repeats:
+        return (yield)
+
+    _instrument_engine()
+    with QueryCollector() as collector:
+        # Raises if the test itself failed, which takes precedence over the budget
+        result = yield
+
+    if budget is not None and collector.count > budget:
+        statements = "\n".join(f"  {shape}" for _, shape, _ in collector.statements)
+        pytest.fail(
+            f"{item.nodeid} issued {collector.count} SQL statements, over its budget of {budget}:\n{statements}",
+            pytrace=False
+        )
+    if fail_on_repeats:
+        repeated = collector.repeated(settings.QUERY_REPEAT_THRESHOLD)
+        if repeated:
+            lines = "\n".join(f"  {repeat['count']}x {repeat['statement']}" for repeat in repeated)
+            pytest.fail(f"{item.nodeid} repeated statements (likely N+1):\n{lines}", pytrace=False)
+    return result
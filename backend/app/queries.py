@@ -0,0 +1,28 @@
+"""
+Shared query builders with declared eager-loading strategies per response schema
+"""
+from sqlalchemy.orm import Session, Query, joinedload
+from app.models import Deal, Activity, Comment, Vote
+from app.schemas import (
+    DealResponse,
+    ActivityResponse,
+    CommentResponse,
+    VoteResponse,
+)
+
+
+# Each response schema maps to the model it serializes and the loader options
+# needed so that nested fields (owner, user) are fetched with
+# the parent rows instead of lazy-loading one row at a time during serialization.
+RESPONSE_LOADERS = {
+    DealResponse: (Deal, (joinedload(Deal.owner),)),
+    ActivityResponse: (Activity, (joinedload(Activity.user),)),
+    CommentResponse: (Comment, (joinedload(Comment.user),)),
+    VoteResponse: (Vote, (joinedload(Vote.user),)),
+}
+
+
+def query_for(db: Session, schema) -> Query:
+    """Build a query for the model behind a response schema with its loaders applied"""
+    model, loaders = RESPONSE_LOADERS[schema]
+    return db.query(model).options(*loaders)
@@ -0,0 +1,202 @@
+"""
+Opt-in SQL profiler for development and staging (QUERY_PROFILER_ENABLED).
+
+Every statement a request issues is recorded with its duration and a normalized
+shape: literals and bound parameters are replaced with ?, and expanded IN lists
+collapse to one placeholder. A shape seen QUERY_REPEAT_THRESHOLD or more times
+in one request is flagged as a likely N+1 (a lazy relationship loaded per row).
+Statements slower than SLOW_QUERY_MS are flagged too. The summary goes in
+X-Query-* response headers and, with the statements, in the history served by
+GET /debug/queries.
+
+QueryCollector records every statement on the engine from any thread while it is
+active; app.pytest_plugin uses it to hold tests to a query budget.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import get_settings
+from app.logging_config import request_id_var
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+QUERY_WARNINGS_HEADER = "X-Query-Warnings"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|(?<![:\w]):[A-Za-z_]\w*|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """A statement with its values abstracted away, so repeats of one query compare equal"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryCollector:
+    """The statements executed while it is active, with their shapes and durations"""
+
+    def __init__(self):
+        self.statements: list[tuple[str, str, float]] = []  # (statement, shape, seconds)
+        self.lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self.lock:
+            self.statements.append((statement, statement_shape(statement), seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, _, seconds in self.statements)
+
+    def repeated(self, threshold: int) -> list[dict]:
+        """Shapes issued at least threshold times, most frequent first"""
+        counts = Counter(shape for _, shape, _ in self.statements)
+        return [
+            {'statement': shape, 'count': count}
+            for shape, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    def slow(self, threshold_ms: float) -> list[dict]:
+        return [
+            {'statement': statement, 'ms': round(seconds * 1000, 2)}
+            for statement, _, seconds in self.statements
+            if seconds * 1000 >= threshold_ms
+        ]
+
+    def summary(self, repeat_threshold: int, slow_ms: float) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_seconds * 1000, 2),
+            'repeated': self.repeated(repeat_threshold),
+            'slow': self.slow(slow_ms),
+        }
+
+    def __enter__(self) -> "QueryCollector":
+        with _collectors_lock:
+            _collectors.append(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with _collectors_lock:
+            _collectors.remove(self)
+
+
+# The current request's collector, and collectors watching every thread
+_request_collector: ContextVar[Optional[QueryCollector]] = ContextVar("request_collector", default=None)
+_collectors: list[QueryCollector] = []
+_collectors_lock = threading.Lock()
+
+_history: deque = deque(maxlen=settings.QUERY_PROFILER_HISTORY)
+
+
+def instrument_profiler(engine: Engine) -> None:
+    """Feed each statement on the engine to the current request's collector and any active ones"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["profiler_started"].pop()
+        collector = _request_collector.get()
+        if collector is not None:
+            collector.record(statement, elapsed)
+        if _collectors:
+            with _collectors_lock:
+                active = list(_collectors)
+            for collector in active:
+                collector.record(statement, elapsed)
+
+
+def query_history() -> list[dict]:
+    """Profiles of the most recent requests, newest first"""
+    return list(reversed(_history))
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware that profiles each request's SQL, summarizes it in response
+    headers (statements issued before the response starts) and logs N+1 and slow-query warnings
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        collector = QueryCollector()
+        status_code = 500
+
+        async def send_with_summary(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                repeated = collector.repeated(settings.QUERY_REPEAT_THRESHOLD)
+                slow = collector.slow(settings.SLOW_QUERY_MS)
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode("latin-1"), str(collector.count).encode("latin-1")))
+                headers.append((
+                    QUERY_TIME_HEADER.lower().encode("latin-1"),
+                    f"{collector.total_seconds * 1000:.2f}".encode("latin-1")
+                ))
+                if repeated or slow:
+                    warnings = f"n+1={len(repeated)}; slow={len(slow)}"
+                    headers.append((QUERY_WARNINGS_HEADER.lower().encode("latin-1"), warnings.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        token = _request_collector.set(collector)
+        try:
+            await self.app(scope, receive, send_with_summary)
+        finally:
+            _request_collector.reset(token)
+            self._finish(scope, status_code, collector)
+
+    @staticmethod
+    def _finish(scope, status_code: int, collector: QueryCollector) -> None:
+        summary = collector.summary(settings.QUERY_REPEAT_THRESHOLD, settings.SLOW_QUERY_MS)
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        for repeat in summary['repeated']:
+            logger.warning(
+                "Possible N+1: %s %s ran the same statement %d times: %s",
+                scope["method"], path, repeat['count'], repeat['statement']
+            )
+        for slow in summary['slow']:
+            logger.warning("Slow query (%.1f ms) in %s %s: %s", slow['ms'], scope["method"], path, slow['statement'])
+
+        _history.append({
+            'request_id': request_id_var.get(),
+            'method': scope["method"],
+            'path': scope["path"],
+            'route': path,
+            'status': status_code,
+            **summary,
+            'statements': [
+                {'statement': statement, 'ms': round(seconds * 1000, 2)}
+                for statement, _, seconds in collector.statements
+            ],
+        })
@@ -1,3 +1,3 @@
-from . import auth, deals, memos, interactions, boards
+from . import auth, deals, memos, interactions, boards, search
 
-__all__ = ['auth', 'deals', 'memos', 'interactions', 'boards']
+__all__ = ['auth', 'deals', 'memos', 'interactions', 'boards', 'search']
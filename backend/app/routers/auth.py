@@ -1,25 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.models import User, UserRole
 from app.schemas import UserCreate, UserUpdate, UserResponse, LoginRequest, Token, SignupRequest
 from app.auth import (
     get_password_hash,
     verify_password,
+    password_needs_rehash,
     create_access_token,
+    principal_claims,
+    invalidate_principal,
     get_current_user,
     get_admin_user
 )
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Handlers that hash passwords are async so they await bcrypt on its own pool without
+# holding a threadpool thread; their database work still runs in the threadpool
+
+
+def _find_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
 
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-def signup(signup_data: SignupRequest, db: Session = Depends(get_db)):
+async def signup(signup_data: SignupRequest, db: Session = Depends(get_db)):
     """Public signup endpoint for new users"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == signup_data.email).first()
+    existing_user = await run_in_threadpool(_find_user_by_email, db, signup_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +45,7 @@ def signup(signup_data: SignupRequest, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(signup_data.password)
+    hashed_password = await get_password_hash(signup_data.password)
     new_user = User(
         email=signup_data.email,
         hashed_password=hashed_password,
@@ -35,12 +53,10 @@ def signup(signup_data: SignupRequest, db: Session = Depends(get_db)):
         role=UserRole.ANALYST  # Default role for new signups
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save_user, db, new_user)
     
     # Generate access token
-    access_token = create_access_token(data={"sub": str(new_user.id)})
+    access_token = create_access_token(data={"sub": str(new_user.id), **principal_claims(new_user)})
     
     return {
         "access_token": access_token,
@@ -50,10 +66,10 @@ def signup(signup_data: SignupRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user (public endpoint for demo - in production, restrict to admin)"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_find_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +77,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -69,26 +85,27 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+    return await run_in_threadpool(_save_user, db, new_user)
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """Login with email and password"""
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await run_in_threadpool(_find_user_by_email, db, login_data.email)
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await verify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    # Transparently upgrade the stored hash when BCRYPT_ROUNDS has changed
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash(login_data.password)
+        await run_in_threadpool(_save_user, db, user)
+    
+    access_token = create_access_token(data={"sub": str(user.id), **principal_claims(user)})
     
     return {
         "access_token": access_token,
@@ -114,21 +131,21 @@ def list_users(
 
 
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user_data: UserCreate,
     current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Create a new user (Admin only)"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_find_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -136,21 +153,10 @@ def create_user(
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+    return await run_in_threadpool(_save_user, db, new_user)
 
 
-@router.put("/users/{user_id}", response_model=UserResponse)
-def update_user(
-    user_id: int,
-    user_data: UserUpdate,
-    current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
-):
-    """Update a user (Admin only)"""
+def _update_user(db: Session, user_id: int, user_data: UserUpdate, hashed_password: Optional[str]) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -178,15 +184,32 @@ def update_user(
     if user_data.role is not None:
         user.role = user_data.role
     
-    if user_data.password is not None:
-        user.hashed_password = get_password_hash(user_data.password)
+    if hashed_password is not None:
+        user.hashed_password = hashed_password
     
     db.commit()
     db.refresh(user)
+    invalidate_principal(user_id)
     
     return user
 
 
+@router.put("/users/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Update a user (Admin only)"""
+    # Hash first, so the lookup and update below run in one threadpool call
+    hashed_password = None
+    if user_data.password is not None:
+        hashed_password = await get_password_hash(user_data.password)
+    
+    return await run_in_threadpool(_update_user, db, user_id, user_data, hashed_password)
+
+
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
     user_id: int,
@@ -210,5 +233,6 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     
     return None
@@ -1,83 +1,217 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, func, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime, timezone
+import hashlib
+import tempfile
+from app.config import get_settings
 from app.database import get_db
-from app.models import Board, User, UserRole, board_members
-from app.schemas import BoardCreate, BoardResponse, BoardUpdate, BoardMemberResponse
-from app.auth import get_current_user
-from app.constants import DEFAULT_BOARD_NAME
+from app.models import Board, User, UserRole, Deal, DealStage, DealStageTransition, Comment, Vote, ICMemo, board_members
+from app.schemas import (
+    BoardCreate,
+    BoardResponse,
+    BoardUpdate,
+    BoardMemberResponse,
+    BoardSnapshotResponse,
+    DealImportResponse,
+    DealMoveRequest,
+    PipelineAnalyticsResponse,
+    FunnelResponse,
+    StageTransitionResponse,
+    StreamToken,
+    DealResponse
+)
+from app.auth import create_stream_token, get_current_user, verify_stream_token
+from app.permissions import BoardPermissions, get_board_permissions, invalidate_board_roles
+from app.events import publish_board_event, stream_board_events
+from app.constants import BULK_IMPORT_SPOOL_BYTES, DEFAULT_BOARD_NAME
+from app.activity import record_activities
+from app.timeline import record_transitions
+from app.analytics import build_analytics, get_stage_durations, init_rollups, invalidate_stage_durations, load_rollups, recompute_rollups, track_deal_changes
+from app.deal_io import EXPORT_MEDIA_TYPES, IMPORT_FORMATS, export_deals, import_deals
+from app.queries import query_for
+from app.pagination import PageParams, paginate
 
+settings = get_settings()
 router = APIRouter(prefix="/boards", tags=["boards"])
 
 
-def build_board_response(board: Board, db: Session) -> dict:
-    """Build board response with proper member roles"""
-    # Get all roles for this board
-    role_query = db.query(
-        board_members.c.user_id,
-        board_members.c.role
+def query_board_rows(db: Session, *criteria) -> list:
+    """Fetch boards joined to their members and board roles, one row per member"""
+    return db.query(
+        Board,
+        board_members.c.role,
+        User.id,
+        User.email,
+        User.full_name
+    ).outerjoin(
+        board_members, board_members.c.board_id == Board.id
+    ).outerjoin(
+        User, User.id == board_members.c.user_id
     ).filter(
-        board_members.c.board_id == board.id
+        *criteria
+    ).order_by(
+        Board.created_at, Board.id, board_members.c.joined_at
     ).all()
+
+
+def build_board_responses(rows: list) -> list[dict]:
+    """Assemble board responses in memory from query_board_rows results"""
+    responses = {}
+    for board, board_role, member_id, email, full_name in rows:
+        data = responses.get(board.id)
+        if data is None:
+            data = responses[board.id] = {
+                'id': board.id,
+                'name': board.name,
+                'description': board.description,
+                'created_by': board.created_by,
+                'is_default': board.is_default,
+                'created_at': board.created_at,
+                'updated_at': board.updated_at,
+                'members': []
+            }
+        if member_id is not None:
+            data['members'].append({
+                'id': member_id,
+                'email': email,
+                'full_name': full_name,
+                'board_role': board_role
+            })
+    
+    return list(responses.values())
+
+
+def build_board_response(board: Board, db: Session) -> dict:
+    """Build board response with proper member roles"""
+    return build_board_responses(query_board_rows(db, Board.id == board.id))[0]
+
+
+def board_snapshot_etag(board_id: int, db: Session) -> Optional[str]:
+    """
+    Strong ETag for a board snapshot, computed in one round trip from the latest
+    timestamps and row counts of everything the snapshot contains.
+    Returns None when the board does not exist.
+    """
+    deal_ids = select(Deal.id).where(Deal.board_id == board_id)
+    member_ids = select(board_members.c.user_id).where(board_members.c.board_id == board_id)
+    parts = [
+        select(Board.updated_at).where(Board.id == board_id),
+        select(func.count()).select_from(board_members).where(board_members.c.board_id == board_id),
+        select(func.max(board_members.c.joined_at)).where(board_members.c.board_id == board_id),
+        select(func.max(User.updated_at)).where(User.id.in_(member_ids)),
+        select(func.count(Deal.id)).where(Deal.board_id == board_id),
+        select(func.max(Deal.updated_at)).where(Deal.board_id == board_id),
+        select(func.count(Comment.id)).where(Comment.deal_id.in_(deal_ids)),
+        select(func.max(Comment.updated_at)).where(Comment.deal_id.in_(deal_ids)),
+        select(func.count(Vote.id)).where(Vote.deal_id.in_(deal_ids)),
+        # Vote changes only rewrite the vote value, so track the approve count too
+        select(func.count(Vote.id)).where(Vote.deal_id.in_(deal_ids), Vote.vote == "approve"),
+        select(func.max(Vote.created_at)).where(Vote.deal_id.in_(deal_ids)),
+        select(func.sum(ICMemo.current_version)).where(ICMemo.deal_id.in_(deal_ids)),
+    ]
+    row = db.execute(select(*[part.scalar_subquery() for part in parts])).one()
+    
+    if row[0] is None:
+        return None
+    return '"' + hashlib.sha1(repr(tuple(row)).encode('utf-8')).hexdigest() + '"'
+
+
+def build_board_snapshot(board: Board, db: Session) -> dict:
+    """Build a whole Kanban board from a fixed number of aggregate queries"""
+    deals = query_for(db, DealResponse).filter(
+        Deal.board_id == board.id
+    ).order_by(Deal.created_at, Deal.id).all()
+    
+    comment_counts = dict(
+        db.query(Comment.deal_id, func.count(Comment.id))
+        .join(Deal, Deal.id == Comment.deal_id)
+        .filter(Deal.board_id == board.id)
+        .group_by(Comment.deal_id)
+        .all()
+    )
+    
+    vote_tallies = defaultdict(dict)
+    vote_rows = (
+        db.query(Vote.deal_id, Vote.vote, func.count(Vote.id))
+        .join(Deal, Deal.id == Vote.deal_id)
+        .filter(Deal.board_id == board.id)
+        .group_by(Vote.deal_id, Vote.vote)
+        .all()
+    )
+    for deal_id, vote, count in vote_rows:
+        vote_tallies[deal_id][vote] = count
+    
+    memo_versions = dict(
+        db.query(ICMemo.deal_id, ICMemo.current_version)
+        .join(Deal, Deal.id == ICMemo.deal_id)
+        .filter(Deal.board_id == board.id)
+        .all()
+    )
     
-    role_map = {user_id: role for user_id, role in role_query}
-    print(f"\n🔧 Building response for board {board.id} - Role map: {role_map}")
-    
-    # Manually build member list with correct roles
-    members_data = []
-    for member in board.members:
-        board_role = role_map.get(member.id)
-        print(f"  👤 User {member.id} ({member.full_name}): board_role = {board_role}")
-        members_data.append({
-            'id': member.id,
-            'email': member.email,
-            'full_name': member.full_name,
-            'board_role': board_role
-        })
+    deals_by_stage = {stage.value: [] for stage in DealStage}
+    for deal in deals:
+        # Read by BoardSnapshotDeal alongside the mapped columns
+        deal.comment_count = comment_counts.get(deal.id, 0)
+        deal.vote_tally = vote_tallies.get(deal.id, {})
+        deal.memo_version = memo_versions.get(deal.id)
+        deals_by_stage[deal.stage.value].append(deal)
     
     return {
-        'id': board.id,
-        'name': board.name,
-        'description': board.description,
-        'created_by': board.created_by,
-        'is_default': board.is_default,
-        'created_at': board.created_at,
-        'updated_at': board.updated_at,
-        'members': members_data
+        'board': build_board_response(board, db),
+        'deals_by_stage': deals_by_stage
     }
 
 
-def get_user_board_role(user_id: int, board_id: int, db: Session) -> UserRole:
-    """Get a user's role for a specific board"""
-    stmt = db.query(board_members.c.role).filter(
+def is_board_member(board_id: int, user_id: int, db: Session) -> bool:
+    """Check membership with a keyed lookup instead of loading board.members"""
+    return db.query(board_members.c.user_id).filter(
         board_members.c.board_id == board_id,
         board_members.c.user_id == user_id
-    ).first()
-    return stmt[0] if stmt else None
+    ).first() is not None
 
 
 @router.get("/", response_model=List[BoardResponse])
-async def list_boards(
+def list_boards(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all boards the current user has access to"""
     # Users see boards they created or are members of
-    boards = db.query(Board).filter(
-        (Board.created_by == current_user.id) | 
-        (Board.members.any(User.id == current_user.id))
-    ).all()
+    member_board_ids = select(board_members.c.board_id).where(board_members.c.user_id == current_user.id)
+    rows = query_board_rows(
+        db,
+        (Board.created_by == current_user.id) | Board.id.in_(member_board_ids)
+    )
     
     # Build responses with proper board roles
-    board_responses = [build_board_response(board, db) for board in boards]
-    
-    return board_responses
+    return build_board_responses(rows)
+
+
+@router.get("/analytics", response_model=PipelineAnalyticsResponse)
+def get_pipeline_analytics(
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Stage counts and check size totals summed across every accessible board"""
+    board_ids = [
+        board_id for (board_id,) in db.query(Board.id).filter(
+            (Board.created_by == current_user.id) | Board.id.in_(permissions.board_ids)
+        )
+    ]
+    return {'board_ids': board_ids, **build_analytics(load_rollups(db, board_ids), None)}
 
 
 @router.get("/{board_id}", response_model=BoardResponse)
-async def get_board(
+def get_board(
     board_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Get a specific board by ID"""
@@ -87,23 +221,323 @@ async def get_board(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check if user has access to this board
-    has_access = (
-        board.created_by == current_user.id or 
-        current_user in board.members
+    permissions.require_access(board)
+    
+    # Build response with board roles
+    return build_board_response(board, db)
+
+
+@router.get("/{board_id}/snapshot", response_model=BoardSnapshotResponse)
+def get_board_snapshot(
+    board_id: int,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Get a board with its members and all deals grouped by stage in one response"""
+    etag = board_snapshot_etag(board_id, db)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    board = db.query(Board).filter(Board.id == board_id).first()
+    permissions.require_access(board)
+    
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    response.headers.update(cache_headers)
+    return build_board_snapshot(board, db)
+
+
+@router.get("/{board_id}/analytics", response_model=PipelineAnalyticsResponse)
+def get_board_analytics(
+    board_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Per-stage deal counts, check sizes and time-in-stage statistics for a board"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_access(board)
+    
+    return {
+        'board_ids': [board_id],
+        **build_analytics(load_rollups(db, [board_id]), get_stage_durations(db, board_id))
+    }
+
+
+@router.post("/{board_id}/analytics:recompute", response_model=PipelineAnalyticsResponse)
+def recompute_board_analytics(
+    board_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Rebuild a board's analytics from its deals and activities (Board admin)"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_role(board_id, [UserRole.ADMIN], "Only board admins can recompute analytics")
+    
+    recompute_rollups(db, board_id)
+    db.commit()
+    invalidate_stage_durations(board_id)
+    
+    return {
+        'board_ids': [board_id],
+        **build_analytics(load_rollups(db, [board_id]), get_stage_durations(db, board_id))
+    }
+
+
+@router.get("/{board_id}/timeline", response_model=List[StageTransitionResponse])
+def get_board_timeline(
+    board_id: int,
+    response: Response,
+    since: Optional[datetime] = Query(None, description="Only transitions at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only transitions before this time"),
+    stage: Optional[DealStage] = Query(None, description="Only transitions into this stage"),
+    page: PageParams = Depends(),
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Stage transitions on a board in time order, page by page"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_access(board)
+    
+    query = db.query(DealStageTransition).filter(DealStageTransition.board_id == board_id)
+    if stage is not None:
+        query = query.filter(DealStageTransition.to_stage == stage)
+    if since is not None:
+        query = query.filter(DealStageTransition.created_at >= since)
+    if until is not None:
+        query = query.filter(DealStageTransition.created_at < until)
+    
+    return paginate(query, DealStageTransition, StageTransitionResponse, page, response, descending=False)
+
+
+@router.get("/{board_id}/funnel", response_model=FunnelResponse)
+def get_board_funnel(
+    board_id: int,
+    since: Optional[datetime] = Query(None, description="Count stage entries at or after this time"),
+    until: Optional[datetime] = Query(None, description="Count stage entries before this time"),
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Number of distinct deals that entered each stage within a time window"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_access(board)
+    
+    query = db.query(
+        DealStageTransition.to_stage,
+        func.count(func.distinct(DealStageTransition.deal_id))
+    ).filter(DealStageTransition.board_id == board_id)
+    if since is not None:
+        query = query.filter(DealStageTransition.created_at >= since)
+    if until is not None:
+        query = query.filter(DealStageTransition.created_at < until)
+    entered = dict(query.group_by(DealStageTransition.to_stage).all())
+    
+    return {
+        'board_id': board_id,
+        'since': since,
+        'until': until,
+        'stages': [{'stage': stage, 'deals_entered': entered.get(stage, 0)} for stage in DealStage]
+    }
+
+
+@router.post("/{board_id}/events/token", response_model=StreamToken)
+def create_board_stream_token(
+    board_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Issue a short-lived token that opens this board's change feed"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_access(board)
+    return {"token": create_stream_token(current_user.id, board.id), "expires_in": settings.EVENT_STREAM_TOKEN_SECONDS}
+
+
+def authorize_board_stream(
+    board_id: int,
+    token: str = Query(..., description="Stream token from POST /boards/{board_id}/events/token")
+) -> int:
+    # Access was checked when the token was issued, so the stream never touches the database
+    verify_stream_token(token, board_id)
+    return board_id
+
+
+@router.get("/{board_id}/events")
+async def stream_board_changes(board_id: int = Depends(authorize_board_stream)):
+    """Stream deal, comment, vote and memo changes on a board as Server-Sent Events"""
+    return StreamingResponse(
+        stream_board_events(board_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+@router.patch("/{board_id}/deals:move", response_model=List[DealResponse])
+def move_board_deals(
+    board_id: int,
+    move_data: DealMoveRequest,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Change the stage and/or status of many deals on a board in one transaction (Admin or Analyst board role required)"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_role(board_id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can update deals")
     
-    if not has_access:
+    # Later entries win when a deal is listed more than once
+    moves = {move.deal_id: move for move in move_data.moves}
+    current = {
+        deal_id: (name, stage, deal_status, check_size)
+        for deal_id, name, stage, deal_status, check_size in db.query(
+            Deal.id, Deal.name, Deal.stage, Deal.status, Deal.check_size
+        ).filter(Deal.board_id == board_id, Deal.id.in_(moves))
+    }
+    missing = [deal_id for deal_id in moves if deal_id not in current]
+    if missing:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have access to this board"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deals not found on this board: {', '.join(str(deal_id) for deal_id in missing)}"
         )
     
-    # Build response with board roles
-    return build_board_response(board, db)
+    now = datetime.now(timezone.utc)
+    updates = []
+    activities = []
+    transitions = []
+    stage_changes = []
+    for deal_id, move in moves.items():
+        name, old_stage, old_status, check_size = current[deal_id]
+        new_stage = move.stage or old_stage
+        new_status = move.status or old_status
+        if new_stage == old_stage and new_status == old_status:
+            continue
+        updates.append({'id': deal_id, 'stage': new_stage, 'status': new_status, 'updated_at': now})
+        if new_stage != old_stage:
+            stage_changes.append(((old_stage, check_size), (new_stage, check_size)))
+            transitions.append({
+                'deal_id': deal_id,
+                'board_id': board_id,
+                'from_stage': old_stage,
+                'to_stage': new_stage,
+                'user_id': current_user.id
+            })
+            activities.append({
+                'deal_id': deal_id,
+                'user_id': current_user.id,
+                'action': "stage_change",
+                'description': f"{current_user.full_name} moved '{name}' from {old_stage.value} to {new_stage.value}"
+            })
+    
+    if updates:
+        # One executemany UPDATE by primary key and one multi-row activity INSERT
+        db.execute(update(Deal), updates)
+        record_activities(db, activities)
+        track_deal_changes(db, board_id, stage_changes)
+        record_transitions(db, transitions)
+        db.commit()
+        if transitions:
+            invalidate_stage_durations(board_id)
+        publish_board_event(board_id, "deals.moved", moves=[
+            {'deal_id': row['id'], 'stage': row['stage'].value, 'status': row['status'].value}
+            for row in updates
+        ])
+    
+    return query_for(db, DealResponse).filter(Deal.id.in_(moves)).all()
+
+
+def authorize_deal_import(
+    board_id: int,
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+) -> int:
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_role(board.id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can import deals")
+    return board.id
+
+
+@router.post("/{board_id}/deals:bulk", response_model=DealImportResponse, status_code=status.HTTP_201_CREATED)
+async def import_board_deals(
+    request: Request,
+    response: Response,
+    board_id: int = Depends(authorize_deal_import),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Import deals from a CSV or NDJSON request body; any invalid row rejects the whole import"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = IMPORT_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    # Spool the upload as it arrives (spilling to disk past the limit), then parse and insert off the event loop
+    with tempfile.SpooledTemporaryFile(max_size=BULK_IMPORT_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        result = await run_in_threadpool(import_deals, db, board_id, current_user, upload, fmt)
+    
+    if result['errors']:
+        response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    else:
+        publish_board_event(board_id, "deals.imported", count=result['imported'])
+    return result
+
+
+@router.get("/{board_id}/deals:export")
+def export_board_deals(
+    board_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Stream every deal on a board as CSV or NDJSON"""
+    board = db.query(Board).filter(Board.id == board_id).first()
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    permissions.require_access(board)
+    
+    return StreamingResponse(
+        export_deals(db, board_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="board-{board_id}-deals.{format}"'}
+    )
 
 
 @router.post("/", response_model=BoardResponse)
-async def create_board(
+def create_board(
     board_data: BoardCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -118,8 +552,7 @@ async def create_board(
     )
     
     db.add(new_board)
-    db.commit()
-    db.refresh(new_board)
+    db.flush()
     
     # Add creator as admin member of this board
     from app.models import board_members, UserRole
@@ -129,18 +562,21 @@ async def create_board(
         role=UserRole.ADMIN
     )
     db.execute(stmt)
+    init_rollups(db, new_board.id)
     db.commit()
     db.refresh(new_board)
+    invalidate_board_roles(current_user.id)
     
     # Build response with board roles
     return build_board_response(new_board, db)
 
 
 @router.put("/{board_id}", response_model=BoardResponse)
-async def update_board(
+def update_board(
     board_id: int,
     board_data: BoardUpdate,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Update a board (only board admin can update)"""
@@ -150,12 +586,7 @@ async def update_board(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check if user has admin role for this board
-    user_board_role = get_user_board_role(current_user.id, board_id, db)
-    if user_board_role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins can update this board"
-        )
+    permissions.require_role(board_id, [UserRole.ADMIN], "Only board admins can update this board")
     
     # Update fields
     if board_data.name is not None:
@@ -171,9 +602,10 @@ async def update_board(
 
 
 @router.delete("/{board_id}")
-async def delete_board(
+def delete_board(
     board_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Delete a board (only board admin can delete)"""
@@ -183,25 +615,24 @@ async def delete_board(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check if user has admin role for this board
-    user_board_role = get_user_board_role(current_user.id, board_id, db)
-    if user_board_role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins can delete this board"
-        )
+    permissions.require_role(board_id, [UserRole.ADMIN], "Only board admins can delete this board")
     
     db.delete(board)
     db.commit()
     
+    # Membership rows are removed with the board, so every member's cached roles are stale
+    invalidate_board_roles()
+    
     return {"message": "Board deleted successfully"}
 
 
 @router.post("/{board_id}/members/{user_id}")
-async def add_board_member(
+def add_board_member(
     board_id: int,
     user_id: int,
     role: UserRole = None,  # Optional board-specific role
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Add a member to a board with optional role (only board admin)"""
@@ -211,19 +642,14 @@ async def add_board_member(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check if user has admin role for this board
-    user_board_role = get_user_board_role(current_user.id, board_id, db)
-    if user_board_role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins can add members"
-        )
+    permissions.require_role(board_id, [UserRole.ADMIN], "Only board admins can add members")
     
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if user is already a member
-    if user in board.members:
+    if is_board_member(board_id, user_id, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is already a member of this board"
@@ -238,15 +664,17 @@ async def add_board_member(
     )
     db.execute(stmt)
     db.commit()
+    invalidate_board_roles(user_id)
     
     return {"message": f"User {user.full_name} added to board successfully"}
 
 
 @router.delete("/{board_id}/members/{user_id}")
-async def remove_board_member(
+def remove_board_member(
     board_id: int,
     user_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Remove a member from a board (only board admin)"""
@@ -256,12 +684,7 @@ async def remove_board_member(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check if user has admin role for this board
-    user_board_role = get_user_board_role(current_user.id, board_id, db)
-    if user_board_role != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins can remove members"
-        )
+    permissions.require_role(board_id, [UserRole.ADMIN], "Only board admins can remove members")
     
     # Prevent removing the creator
     if user_id == board.created_by:
@@ -274,13 +697,17 @@ async def remove_board_member(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if user not in board.members:
+    if not is_board_member(board_id, user_id, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is not a member of this board"
         )
     
-    board.members.remove(user)
+    db.execute(board_members.delete().where(
+        board_members.c.board_id == board_id,
+        board_members.c.user_id == user_id
+    ))
     db.commit()
+    invalidate_board_roles(user_id)
     
     return {"message": f"User {user.full_name} removed from board successfully"}
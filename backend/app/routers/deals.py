@@ -1,31 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
 from app.database import get_db
-from app.models import Deal, User, Activity, UserRole, DealStage, DealStatus, Board, board_members
-from app.schemas import DealCreate, DealUpdate, DealResponse, ActivityResponse
+from app.models import Deal, User, Activity, UserRole, DealStage, DealStatus, Board, DealStageTransition
+from app.schemas import DealCreate, DealUpdate, DealResponse, ActivityResponse, StageTransitionResponse
 from app.auth import get_current_user
+from app.permissions import BoardPermissions, get_board_permissions
+from app.queries import query_for
+from app.pagination import PageParams, paginate
+from app.events import publish_board_event
+from app.activity import record_activity
+from app.analytics import invalidate_stage_durations, track_deal_change
+from app.timeline import record_transition
+from app.search import index_document, forget_deal
 
 router = APIRouter(prefix="/deals", tags=["Deals"])
 
 
-def get_user_board_role(user_id: int, board_id: int, db: Session) -> UserRole:
-    """Get a user's role for a specific board"""
-    stmt = db.query(board_members.c.role).filter(
-        board_members.c.board_id == board_id,
-        board_members.c.user_id == user_id
-    ).first()
-    return stmt[0] if stmt else None
+# sort key -> (column, nullable)
+DEAL_SORT_KEYS = {
+    "created_at": (Deal.created_at, False),
+    "updated_at": (Deal.updated_at, False),
+    "name": (Deal.name, False),
+    "check_size": (Deal.check_size, True),
+}
+
+DEAL_FIELDS = list(DealResponse.model_fields)
+
+
+class DealListParams:
+    """Filters, sort order and sparse fieldset for listing deals"""
+
+    def __init__(
+        self,
+        stage: Optional[List[DealStage]] = Query(None, description="Only deals in these stages"),
+        status: Optional[List[DealStatus]] = Query(None, description="Only deals with these statuses"),
+        owner_id: Optional[List[int]] = Query(None, description="Only deals owned by these users"),
+        round: Optional[List[str]] = Query(None, description="Only deals in these rounds"),
+        min_check_size: Optional[float] = Query(None, ge=0),
+        max_check_size: Optional[float] = Query(None, ge=0),
+        created_after: Optional[datetime] = Query(None),
+        created_before: Optional[datetime] = Query(None),
+        updated_after: Optional[datetime] = Query(None),
+        updated_before: Optional[datetime] = Query(None),
+        sort: str = Query(
+            "created_at",
+            pattern=f"^-?({'|'.join(DEAL_SORT_KEYS)})$",
+            description="Sort key, prefixed with - for descending"
+        ),
+        fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,name,stage")
+    ):
+        self.stage = stage
+        self.status = status
+        self.owner_id = owner_id
+        self.round = round
+        self.min_check_size = min_check_size
+        self.max_check_size = max_check_size
+        self.created_after = created_after
+        self.created_before = created_before
+        self.updated_after = updated_after
+        self.updated_before = updated_before
+        self.descending = sort.startswith("-")
+        self.sort_column, self.sort_nullable = DEAL_SORT_KEYS[sort.lstrip("-")]
+        self.fields = self._parse_fields(fields)
+
+    @staticmethod
+    def _parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+        if fields is None:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - set(DEAL_FIELDS)
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "No fields requested"
+            )
+        return [field for field in DEAL_FIELDS if field in requested]
+
+    def apply(self, query):
+        if self.stage:
+            query = query.filter(Deal.stage.in_(self.stage))
+        if self.status:
+            query = query.filter(Deal.status.in_(self.status))
+        if self.owner_id:
+            query = query.filter(Deal.owner_id.in_(self.owner_id))
+        if self.round:
+            query = query.filter(Deal.round.in_(self.round))
+        if self.min_check_size is not None:
+            query = query.filter(Deal.check_size >= self.min_check_size)
+        if self.max_check_size is not None:
+            query = query.filter(Deal.check_size <= self.max_check_size)
+        if self.created_after is not None:
+            query = query.filter(Deal.created_at >= self.created_after)
+        if self.created_before is not None:
+            query = query.filter(Deal.created_at < self.created_before)
+        if self.updated_after is not None:
+            query = query.filter(Deal.updated_at >= self.updated_after)
+        if self.updated_before is not None:
+            query = query.filter(Deal.updated_at < self.updated_before)
+        return query
+
+    def base_query(self, db: Session):
+        """The full entity with its owner, or just the requested columns when owner isn't among them"""
+        if self.fields is None or "owner" in self.fields:
+            return query_for(db, DealResponse)
+        # id and the sort column are always selected so the next cursor can be built
+        columns = dict.fromkeys(["id", self.sort_column.key, *self.fields])
+        return db.query(*(getattr(Deal, column) for column in columns))
 
 
 @router.get("", response_model=List[DealResponse])
 def list_deals(
+    response: Response,
     board_id: Optional[int] = Query(None, description="Filter deals by board ID"),
+    params: DealListParams = Depends(),
+    page: PageParams = Depends(),
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
-    """List all deals, optionally filtered by board"""
-    query = db.query(Deal)
+    """List deals page by page, filtered and sorted in the database"""
+    query = params.apply(params.base_query(db))
     
     if board_id:
         # Check if user has access to this board
@@ -33,30 +129,28 @@ def list_deals(
         if not board:
             raise HTTPException(status_code=404, detail="Board not found")
         
-        has_access = (
-            board.created_by == current_user.id or 
-            current_user in board.members
-        )
-        
-        if not has_access:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have access to this board"
-            )
+        permissions.require_access(board)
         
         query = query.filter(Deal.board_id == board_id)
     else:
         # If no board_id specified, show deals from all accessible boards
-        accessible_boards = db.query(Board).filter(
+        accessible_board_ids = db.query(Board.id).filter(
             (Board.created_by == current_user.id) | 
-            (Board.members.any(User.id == current_user.id))
-        ).all()
-        
-        board_ids = [board.id for board in accessible_boards]
-        query = query.filter(Deal.board_id.in_(board_ids))
+            (Board.id.in_(permissions.board_ids))
+        )
+        query = query.filter(Deal.board_id.in_(accessible_board_ids))
     
-    deals = query.all()
-    return deals
+    return paginate(
+        query,
+        Deal,
+        DealResponse,
+        page,
+        response,
+        descending=params.descending,
+        column=params.sort_column,
+        nullable=params.sort_nullable,
+        fields=params.fields
+    )
 
 
 @router.get("/{deal_id}", response_model=DealResponse)
@@ -66,7 +160,7 @@ def get_deal(
     db: Session = Depends(get_db)
 ):
     """Get a specific deal"""
-    deal = db.query(Deal).filter(Deal.id == deal_id).first()
+    deal = query_for(db, DealResponse).filter(Deal.id == deal_id).first()
     if not deal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,6 +173,7 @@ def get_deal(
 def create_deal(
     deal_data: DealCreate,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Create a new deal (Admin or Analyst board role required)"""
@@ -88,12 +183,7 @@ def create_deal(
         raise HTTPException(status_code=404, detail="Board not found")
     
     # Check user's board role - only ADMIN or ANALYST can create deals
-    user_board_role = get_user_board_role(current_user.id, deal_data.board_id, db)
-    if user_board_role not in [UserRole.ADMIN, UserRole.ANALYST]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins and analysts can create deals"
-        )
+    permissions.require_role(deal_data.board_id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can create deals")
     
     new_deal = Deal(
         name=deal_data.name,
@@ -107,18 +197,16 @@ def create_deal(
     )
     
     db.add(new_deal)
+    db.flush()
+    
+    record_activity(db, new_deal.id, current_user.id, "created", f"{current_user.full_name} created deal '{new_deal.name}'")
+    track_deal_change(db, new_deal.board_id, None, (new_deal.stage, new_deal.check_size))
+    record_transition(db, new_deal.id, new_deal.board_id, None, new_deal.stage, current_user.id)
+    index_document(db, "deal", new_deal.id, new_deal.id, new_deal.board_id, new_deal.name, new_deal.company_url)
     db.commit()
     db.refresh(new_deal)
     
-    # Create activity
-    activity = Activity(
-        deal_id=new_deal.id,
-        user_id=current_user.id,
-        action="created",
-        description=f"{current_user.full_name} created deal '{new_deal.name}'"
-    )
-    db.add(activity)
-    db.commit()
+    publish_board_event(new_deal.board_id, "deal.created", deal_id=new_deal.id, stage=new_deal.stage.value)
     
     return new_deal
 
@@ -128,6 +216,7 @@ def update_deal(
     deal_id: int,
     deal_data: DealUpdate,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Update a deal (Admin or Analyst board role required)"""
@@ -139,15 +228,12 @@ def update_deal(
         )
     
     # Check user's board role - only ADMIN or ANALYST can update deals
-    user_board_role = get_user_board_role(current_user.id, deal.board_id, db)
-    if user_board_role not in [UserRole.ADMIN, UserRole.ANALYST]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins and analysts can update deals"
-        )
+    permissions.require_role(deal.board_id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can update deals")
     
     # Track stage change
     old_stage = deal.stage
+    old_check_size = deal.check_size
+    old_text = (deal.name, deal.company_url)
     
     # Update fields
     if deal_data.name is not None:
@@ -163,19 +249,32 @@ def update_deal(
     if deal_data.status is not None:
         deal.status = deal_data.status
     
+    # Record the stage change in the same transaction as the update
+    stage_changed = deal_data.stage is not None and deal_data.stage != old_stage
+    if stage_changed:
+        record_activity(
+            db,
+            deal.id,
+            current_user.id,
+            "stage_change",
+            f"{current_user.full_name} moved '{deal.name}' from {old_stage.value} to {deal.stage.value}"
+        )
+        record_transition(db, deal.id, deal.board_id, old_stage, deal.stage, current_user.id)
+    
+    if stage_changed or deal.check_size != old_check_size:
+        track_deal_change(db, deal.board_id, (old_stage, old_check_size), (deal.stage, deal.check_size))
+    
+    if (deal.name, deal.company_url) != old_text:
+        index_document(db, "deal", deal.id, deal.id, deal.board_id, deal.name, deal.company_url)
+    
     db.commit()
     db.refresh(deal)
     
-    # Create activity if stage changed
-    if deal_data.stage and deal_data.stage != old_stage:
-        activity = Activity(
-            deal_id=deal.id,
-            user_id=current_user.id,
-            action="stage_change",
-            description=f"{current_user.full_name} moved '{deal.name}' from {old_stage.value} to {deal.stage.value}"
-        )
-        db.add(activity)
-        db.commit()
+    if stage_changed:
+        invalidate_stage_durations(deal.board_id)
+        publish_board_event(deal.board_id, "deal.moved", deal_id=deal.id, from_stage=old_stage.value, to_stage=deal.stage.value)
+    else:
+        publish_board_event(deal.board_id, "deal.updated", deal_id=deal.id)
     
     return deal
 
@@ -184,6 +283,7 @@ def update_deal(
 def delete_deal(
     deal_id: int,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Delete a deal (Admin or Analyst board role required)"""
@@ -195,15 +295,16 @@ def delete_deal(
         )
     
     # Check user's board role - only ADMIN or ANALYST can delete deals
-    user_board_role = get_user_board_role(current_user.id, deal.board_id, db)
-    if user_board_role not in [UserRole.ADMIN, UserRole.ANALYST]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins and analysts can delete deals"
-        )
+    permissions.require_role(deal.board_id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can delete deals")
     
+    board_id = deal.board_id
+    track_deal_change(db, board_id, (deal.stage, deal.check_size), None)
+    forget_deal(db, deal_id)
     db.delete(deal)
     db.commit()
+    invalidate_stage_durations(board_id)
+    
+    publish_board_event(board_id, "deal.deleted", deal_id=deal_id)
     
     return None
 
@@ -211,10 +312,12 @@ def delete_deal(
 @router.get("/{deal_id}/activities", response_model=List[ActivityResponse])
 def get_deal_activities(
     deal_id: int,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all activities for a deal"""
+    """Get activities for a deal, newest first"""
     deal = db.query(Deal).filter(Deal.id == deal_id).first()
     if not deal:
         raise HTTPException(
@@ -222,5 +325,28 @@ def get_deal_activities(
             detail="Deal not found"
         )
     
-    activities = db.query(Activity).filter(Activity.deal_id == deal_id).order_by(Activity.created_at.desc()).all()
-    return activities
+    query = query_for(db, ActivityResponse).filter(Activity.deal_id == deal_id)
+    return paginate(query, Activity, ActivityResponse, page, response)
+
+
+@router.get("/{deal_id}/timeline", response_model=List[StageTransitionResponse])
+def get_deal_timeline(
+    deal_id: int,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Get every stage a deal has entered, oldest first"""
+    deal = db.query(Deal).filter(Deal.id == deal_id).first()
+    if not deal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal not found"
+        )
+    
+    board = db.query(Board).filter(Board.id == deal.board_id).first()
+    permissions.require_access(board)
+    
+    return db.query(DealStageTransition).filter(
+        DealStageTransition.deal_id == deal_id
+    ).order_by(DealStageTransition.created_at, DealStageTransition.id).all()
@@ -1,23 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.models import Deal, Comment, Vote, User, Activity, UserRole, board_members
+from app.models import Deal, Comment, Vote, User, UserRole
 from app.schemas import CommentCreate, CommentResponse, VoteCreate, VoteResponse
 from app.auth import get_current_user
+from app.permissions import BoardPermissions, get_board_permissions
+from app.events import publish_board_event
+from app.activity import record_activity
+from app.search import index_document
+from app.queries import query_for
+from app.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/deals", tags=["Comments & Votes"])
 
 
-def get_user_board_role(user_id: int, board_id: int, db: Session) -> UserRole:
-    """Get a user's role for a specific board"""
-    stmt = db.query(board_members.c.role).filter(
-        board_members.c.board_id == board_id,
-        board_members.c.user_id == user_id
-    ).first()
-    return stmt[0] if stmt else None
-
-
 # Comments
 @router.post("/{deal_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
 def create_comment(
@@ -41,18 +38,14 @@ def create_comment(
     )
     
     db.add(new_comment)
+    db.flush()
+    
+    index_document(db, "comment", new_comment.id, deal_id, deal.board_id, None, new_comment.content)
+    record_activity(db, deal_id, current_user.id, "commented", f"{current_user.full_name} commented on '{deal.name}'")
     db.commit()
     db.refresh(new_comment)
     
-    # Create activity
-    activity = Activity(
-        deal_id=deal_id,
-        user_id=current_user.id,
-        action="commented",
-        description=f"{current_user.full_name} commented on '{deal.name}'"
-    )
-    db.add(activity)
-    db.commit()
+    publish_board_event(deal.board_id, "comment.added", deal_id=deal_id, comment_id=new_comment.id)
     
     return new_comment
 
@@ -60,10 +53,12 @@ def create_comment(
 @router.get("/{deal_id}/comments", response_model=List[CommentResponse])
 def get_comments(
     deal_id: int,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all comments for a deal"""
+    """Get comments for a deal, newest first"""
     deal = db.query(Deal).filter(Deal.id == deal_id).first()
     if not deal:
         raise HTTPException(
@@ -71,11 +66,9 @@ def get_comments(
             detail="Deal not found"
         )
     
-    comments = db.query(Comment).filter(
-        Comment.deal_id == deal_id
-    ).order_by(Comment.created_at.desc()).all()
+    query = query_for(db, CommentResponse).filter(Comment.deal_id == deal_id)
     
-    return comments
+    return paginate(query, Comment, CommentResponse, page, response)
 
 
 # Votes
@@ -84,6 +77,7 @@ def create_vote(
     deal_id: int,
     vote_data: VoteCreate,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Create or update a vote (Admin or Partner board role can vote)"""
@@ -95,12 +89,7 @@ def create_vote(
         )
     
     # Check user's board role - ADMIN and PARTNER can vote
-    user_board_role = get_user_board_role(current_user.id, deal.board_id, db)
-    if user_board_role not in [UserRole.PARTNER, UserRole.ADMIN]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins and partners can vote"
-        )
+    permissions.require_role(deal.board_id, [UserRole.PARTNER, UserRole.ADMIN], "Only board admins and partners can vote")
     
     # Check if user already voted
     existing_vote = db.query(Vote).filter(
@@ -112,8 +101,6 @@ def create_vote(
         # Update existing vote
         existing_vote.vote = vote_data.vote
         existing_vote.comment = vote_data.comment
-        db.commit()
-        db.refresh(existing_vote)
         vote = existing_vote
     else:
         # Create new vote
@@ -124,18 +111,12 @@ def create_vote(
             comment=vote_data.comment
         )
         db.add(vote)
-        db.commit()
-        db.refresh(vote)
     
-    # Create activity
-    activity = Activity(
-        deal_id=deal_id,
-        user_id=current_user.id,
-        action="voted",
-        description=f"{current_user.full_name} voted to {vote_data.vote} '{deal.name}'"
-    )
-    db.add(activity)
+    record_activity(db, deal_id, current_user.id, "voted", f"{current_user.full_name} voted to {vote_data.vote} '{deal.name}'")
     db.commit()
+    db.refresh(vote)
+    
+    publish_board_event(deal.board_id, "vote.cast", deal_id=deal_id, vote_id=vote.id)
     
     return vote
 
@@ -143,10 +124,12 @@ def create_vote(
 @router.get("/{deal_id}/votes", response_model=List[VoteResponse])
 def get_votes(
     deal_id: int,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all votes for a deal"""
+    """Get votes for a deal, newest first"""
     deal = db.query(Deal).filter(Deal.id == deal_id).first()
     if not deal:
         raise HTTPException(
@@ -154,6 +137,6 @@ def get_votes(
             detail="Deal not found"
         )
     
-    votes = db.query(Vote).filter(Vote.deal_id == deal_id).all()
+    query = query_for(db, VoteResponse).filter(Vote.deal_id == deal_id)
     
-    return votes
+    return paginate(query, Vote, VoteResponse, page, response)
@@ -1,21 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.models import Deal, ICMemo, MemoVersion, User, Activity, UserRole, board_members
-from app.schemas import ICMemoResponse, MemoUpdate, MemoVersionResponse
+from app.models import Board, Deal, ICMemo, User, UserRole
+from app.schemas import ICMemoResponse, MemoUpdate, MemoVersionResponse, MemoVersionSummary, MemoDiffResponse
 from app.auth import get_current_user
+from app.permissions import BoardPermissions, get_board_permissions
+from app.events import publish_board_event
+from app.activity import record_activity
+from app.search import index_document, memo_search_body
+from app.memo_store import (
+    MEMO_SECTIONS,
+    EMPTY_SECTIONS,
+    build_memo_version,
+    diff_versions,
+    list_version_summaries,
+    load_memo_version
+)
 
 router = APIRouter(prefix="/memos", tags=["IC Memos"])
 
 
-def get_user_board_role(user_id: int, board_id: int, db: Session) -> UserRole:
-    """Get a user's role for a specific board"""
-    stmt = db.query(board_members.c.role).filter(
-        board_members.c.board_id == board_id,
-        board_members.c.user_id == user_id
-    ).first()
-    return stmt[0] if stmt else None
+def build_memo_response(memo: ICMemo, db: Session, current: Optional[dict] = None) -> dict:
+    """Build memo response with the current version in full and the history as summaries"""
+    if current is None:
+        current = load_memo_version(db, memo.id, memo.current_version)
+    
+    return {
+        'id': memo.id,
+        'deal_id': memo.deal_id,
+        'current_version': memo.current_version,
+        'created_at': memo.created_at,
+        'updated_at': memo.updated_at,
+        'current': current,
+        'versions': list_version_summaries(db, memo.id)
+    }
+
+
+def get_memo_or_404(deal_id: int, db: Session) -> ICMemo:
+    deal = db.query(Deal).filter(Deal.id == deal_id).first()
+    if not deal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deal not found"
+        )
+    
+    memo = db.query(ICMemo).filter(ICMemo.deal_id == deal_id).first()
+    if not memo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Memo not found"
+        )
+    return memo
 
 
 @router.get("/deal/{deal_id}", response_model=ICMemoResponse)
@@ -38,25 +74,15 @@ def get_memo(
     if not memo:
         memo = ICMemo(deal_id=deal_id, current_version=1)
         db.add(memo)
-        db.commit()
-        db.refresh(memo)
+        db.flush()
         
         # Create initial version
-        version = MemoVersion(
-            memo_id=memo.id,
-            version=1,
-            summary="",
-            market="",
-            product="",
-            traction="",
-            risks="",
-            open_questions=""
-        )
+        version = build_memo_version(memo.id, 1, None, EMPTY_SECTIONS, author_id=current_user.id)
         db.add(version)
         db.commit()
         db.refresh(memo)
     
-    return memo
+    return build_memo_response(memo, db)
 
 
 @router.put("/deal/{deal_id}", response_model=ICMemoResponse)
@@ -64,6 +90,7 @@ def update_memo(
     deal_id: int,
     memo_data: MemoUpdate,
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """Update IC memo - creates a new version (Admin or Analyst board role required)"""
@@ -75,12 +102,7 @@ def update_memo(
         )
     
     # Check user's board role - only ADMIN or ANALYST can update memos
-    user_board_role = get_user_board_role(current_user.id, deal.board_id, db)
-    if user_board_role not in [UserRole.ADMIN, UserRole.ANALYST]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only board admins and analysts can update IC memos"
-        )
+    permissions.require_role(deal.board_id, [UserRole.ADMIN, UserRole.ANALYST], "Only board admins and analysts can update IC memos")
     
     memo = db.query(ICMemo).filter(ICMemo.deal_id == deal_id).first()
     
@@ -88,82 +110,81 @@ def update_memo(
     if not memo:
         memo = ICMemo(deal_id=deal_id, current_version=0)
         db.add(memo)
-        db.commit()
-        db.refresh(memo)
+        db.flush()
     
     # Get current version data
-    current_version = db.query(MemoVersion).filter(
-        MemoVersion.memo_id == memo.id,
-        MemoVersion.version == memo.current_version
-    ).first()
-    
-    # Prepare new version data
+    current_sections = load_memo_version(db, memo.id, memo.current_version)
+    
+    # Prepare new version data, keeping sections that were not sent
+    base_sections = current_sections or EMPTY_SECTIONS
+    new_sections = {
+        section: getattr(memo_data, section) if getattr(memo_data, section) is not None else base_sections[section]
+        for section in MEMO_SECTIONS
+    }
     new_version_num = memo.current_version + 1
-    new_version = MemoVersion(
-        memo_id=memo.id,
-        version=new_version_num,
-        summary=memo_data.summary if memo_data.summary is not None else (current_version.summary if current_version else ""),
-        market=memo_data.market if memo_data.market is not None else (current_version.market if current_version else ""),
-        product=memo_data.product if memo_data.product is not None else (current_version.product if current_version else ""),
-        traction=memo_data.traction if memo_data.traction is not None else (current_version.traction if current_version else ""),
-        risks=memo_data.risks if memo_data.risks is not None else (current_version.risks if current_version else ""),
-        open_questions=memo_data.open_questions if memo_data.open_questions is not None else (current_version.open_questions if current_version else "")
+    new_version = build_memo_version(
+        memo.id,
+        new_version_num,
+        current_sections,
+        new_sections,
+        author_id=current_user.id
     )
     
     db.add(new_version)
     memo.current_version = new_version_num
+    index_document(db, "memo", memo.id, deal_id, deal.board_id, None, memo_search_body(new_sections))
+    record_activity(db, deal_id, current_user.id, "memo_updated", f"{current_user.full_name} updated IC memo (version {new_version_num})")
     db.commit()
     db.refresh(memo)
     
-    # Create activity
-    activity = Activity(
-        deal_id=deal_id,
-        user_id=current_user.id,
-        action="memo_updated",
-        description=f"{current_user.full_name} updated IC memo (version {new_version_num})"
-    )
-    db.add(activity)
-    db.commit()
+    publish_board_event(deal.board_id, "memo.version", deal_id=deal_id, version=new_version_num)
     
-    return memo
+    current = {'id': new_version.id, 'version': new_version_num, 'created_at': new_version.created_at, **new_sections}
+    return build_memo_response(memo, db, current)
 
 
-@router.get("/deal/{deal_id}/versions", response_model=List[MemoVersionResponse])
+@router.get("/deal/{deal_id}/versions", response_model=List[MemoVersionSummary])
 def get_memo_versions(
     deal_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all versions of a memo"""
-    deal = db.query(Deal).filter(Deal.id == deal_id).first()
-    if not deal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Deal not found"
-        )
+    """Get the version history of a memo: number, author, timestamp and changed sections"""
+    memo = get_memo_or_404(deal_id, db)
+    return list_version_summaries(db, memo.id)
+
+
+@router.get("/deal/{deal_id}/version/{version_num}", response_model=MemoVersionResponse)
+def get_memo_version(
+    deal_id: int,
+    version_num: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a specific version of a memo"""
+    memo = get_memo_or_404(deal_id, db)
     
-    memo = db.query(ICMemo).filter(ICMemo.deal_id == deal_id).first()
-    if not memo:
+    version = load_memo_version(db, memo.id, version_num)
+    
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memo not found"
+            detail="Version not found"
         )
     
-    versions = db.query(MemoVersion).filter(
-        MemoVersion.memo_id == memo.id
-    ).order_by(MemoVersion.version.desc()).all()
-    
-    return versions
+    return version
 
 
-@router.get("/deal/{deal_id}/version/{version_num}", response_model=MemoVersionResponse)
-def get_memo_version(
+@router.get("/deal/{deal_id}/diff", response_model=MemoDiffResponse)
+def get_memo_diff(
     deal_id: int,
-    version_num: int,
+    from_version: int = Query(..., alias="from", ge=1),
+    to_version: int = Query(..., alias="to", ge=1),
     current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
-    """Get a specific version of a memo"""
+    """Get a section-level unified diff between two versions of a memo"""
     deal = db.query(Deal).filter(Deal.id == deal_id).first()
     if not deal:
         raise HTTPException(
@@ -171,22 +192,21 @@ def get_memo_version(
             detail="Deal not found"
         )
     
-    memo = db.query(ICMemo).filter(ICMemo.deal_id == deal_id).first()
-    if not memo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memo not found"
-        )
+    board = db.query(Board).filter(Board.id == deal.board_id).first()
+    permissions.require_access(board)
     
-    version = db.query(MemoVersion).filter(
-        MemoVersion.memo_id == memo.id,
-        MemoVersion.version == version_num
-    ).first()
+    memo = get_memo_or_404(deal_id, db)
     
-    if not version:
+    old = load_memo_version(db, memo.id, from_version)
+    new = load_memo_version(db, memo.id, to_version)
+    if not old or not new:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Version not found"
         )
     
-    return version
+    return {
+        'from_version': from_version,
+        'to_version': to_version,
+        'sections': diff_versions(old, new)
+    }
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Board, User
+from app.schemas import SearchResponse
+from app.auth import get_current_user
+from app.permissions import BoardPermissions, get_board_permissions
+from app.constants import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from app.search import search_documents
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """Ranked full-text search over deals, comments and IC memos on accessible boards"""
+    board_ids = [
+        board_id for (board_id,) in db.query(Board.id).filter(
+            (Board.created_by == current_user.id) | Board.id.in_(permissions.board_ids)
+        )
+    ]
+    results, has_more = search_documents(db, q, board_ids, limit, offset)
+    
+    return {
+        'query': q,
+        'results': results,
+        'next_offset': offset + limit if has_more else None
+    }
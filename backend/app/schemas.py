@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, model_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, condecimal, model_validator
+from typing import Optional, List, Dict
 from datetime import datetime
 from app.models import UserRole, DealStage, DealStatus
 
@@ -87,6 +87,11 @@ class Token(BaseModel):
     user: UserResponse
 
 
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int  # Seconds
+
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -122,6 +127,37 @@ class DealUpdate(BaseModel):
     status: Optional[DealStatus] = None
 
 
+class DealMove(BaseModel):
+    deal_id: int
+    stage: Optional[DealStage] = None
+    status: Optional[DealStatus] = None
+
+
+class DealMoveRequest(BaseModel):
+    moves: List[DealMove] = Field(..., min_length=1, max_length=500)
+
+
+class DealImportRow(BaseModel):
+    """One row of a bulk deal import; the board comes from the URL"""
+    name: str = Field(..., min_length=1)
+    company_url: Optional[str] = None
+    stage: DealStage = DealStage.SOURCED
+    round: Optional[str] = None
+    # Fits the deals.check_size NUMERIC(15, 2) column, so no row can abort the batch insert
+    check_size: Optional[condecimal(max_digits=15, decimal_places=2)] = None
+    status: DealStatus = DealStatus.ACTIVE
+
+
+class DealImportError(BaseModel):
+    row: int
+    message: str
+
+
+class DealImportResponse(BaseModel):
+    imported: int
+    errors: List[DealImportError] = []
+
+
 class DealResponse(DealBase):
     id: int
     owner_id: int
@@ -164,6 +200,17 @@ class MemoVersionResponse(BaseModel):
         from_attributes = True
 
 
+class MemoVersionSummary(BaseModel):
+    version: int
+    author_id: Optional[int] = None
+    author_name: Optional[str] = None
+    changed_sections: Optional[List[str]] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class MemoUpdate(BaseModel):
     summary: Optional[str] = None
     market: Optional[str] = None
@@ -179,12 +226,19 @@ class ICMemoResponse(BaseModel):
     current_version: int
     created_at: datetime
     updated_at: datetime
-    versions: List[MemoVersionResponse]
+    current: MemoVersionResponse
+    versions: List[MemoVersionSummary]
     
     class Config:
         from_attributes = True
 
 
+class MemoDiffResponse(BaseModel):
+    from_version: int
+    to_version: int
+    sections: Dict[str, str]  # Unified diff of each section that differs
+
+
 # Comment Schemas
 class CommentCreate(BaseModel):
     content: str
@@ -220,3 +274,82 @@ class VoteResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# Board Snapshot Schemas
+class VoteTally(BaseModel):
+    approve: int = 0
+    decline: int = 0
+
+
+class BoardSnapshotDeal(DealResponse):
+    comment_count: int = 0
+    vote_tally: VoteTally = VoteTally()
+    memo_version: Optional[int] = None  # None until an IC memo exists
+    
+    class Config:
+        from_attributes = True
+
+
+class BoardSnapshotResponse(BaseModel):
+    board: BoardResponse
+    deals_by_stage: Dict[str, List[BoardSnapshotDeal]]  # Keyed by DealStage value
+
+
+# Analytics Schemas
+class StageTransitionResponse(BaseModel):
+    id: int
+    deal_id: int
+    board_id: int
+    from_stage: Optional[DealStage] = None
+    to_stage: DealStage
+    user_id: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class FunnelStage(BaseModel):
+    stage: DealStage
+    deals_entered: int
+
+
+class FunnelResponse(BaseModel):
+    board_id: int
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    stages: List[FunnelStage]
+
+
+class StageAnalytics(BaseModel):
+    stage: DealStage
+    deal_count: int
+    check_size_total: float
+    check_size_avg: Optional[float] = None
+    median_days_in_stage: Optional[float] = None
+    avg_days_in_stage: Optional[float] = None
+
+
+class PipelineAnalyticsResponse(BaseModel):
+    board_ids: List[int]
+    stages: List[StageAnalytics]
+    median_days_sourced_to_ic: Optional[float] = None
+    durations_computed_at: Optional[datetime] = None
+
+
+# Search Schemas
+class SearchResult(BaseModel):
+    kind: str  # "deal", "comment" or "memo"
+    source_id: int
+    deal_id: int
+    board_id: int
+    deal_name: str
+    snippet: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    next_offset: Optional[int] = None  # None on the last page
@@ -0,0 +1,241 @@
+"""
+Full-text search over deal names and URLs, comments and current IC memo text.
+
+Each searchable item has a row in search_documents, kept current by the mutation
+handlers in the same transaction as the change. On Postgres, queries run against
+a GIN expression index with websearch_to_tsquery and ts_rank_cd. Other databases
+(SQLite test runs) use an in-process inverted index with BM25 ranking, loaded
+from search_documents on first use and updated as transactions commit.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import event, func, insert, literal_column, tuple_, update
+from sqlalchemy.orm import Session
+from app.constants import SEARCH_SNIPPET_LENGTH
+from app.memo_store import MEMO_SECTIONS
+from app.models import Deal, SearchDocument, search_vector
+
+_TOKEN = re.compile(r"\w+")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def memo_search_body(sections: dict) -> str:
+    return "\n\n".join(sections[section] for section in MEMO_SECTIONS if sections[section])
+
+
+class InvertedIndex:
+    """Term -> {document key: term frequency} postings with per-document metadata"""
+
+    def __init__(self):
+        self.postings: dict[str, dict[tuple, int]] = defaultdict(dict)
+        self.documents: dict[tuple, tuple[int, int, list[str]]] = {}  # key -> (deal_id, board_id, terms)
+        self.total_length = 0
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def load(self, db: Session) -> None:
+        with self.lock:
+            if self.loaded:
+                return
+            rows = db.query(
+                SearchDocument.kind,
+                SearchDocument.source_id,
+                SearchDocument.deal_id,
+                SearchDocument.board_id,
+                SearchDocument.title,
+                SearchDocument.body
+            ).yield_per(1000)
+            for kind, source_id, deal_id, board_id, title, body in rows:
+                self.put((kind, source_id), deal_id, board_id, title, body)
+            self.loaded = True
+
+    def put(self, key: tuple, deal_id: int, board_id: int, title: Optional[str], body: Optional[str]) -> None:
+        with self.lock:
+            self.remove(key)
+            terms = tokenize(title) + tokenize(body)
+            for term in terms:
+                self.postings[term][key] = self.postings[term].get(key, 0) + 1
+            self.documents[key] = (deal_id, board_id, terms)
+            self.total_length += len(terms)
+
+    def remove(self, key: tuple) -> None:
+        with self.lock:
+            document = self.documents.pop(key, None)
+            if document is None:
+                return
+            for term in set(document[2]):
+                postings = self.postings[term]
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[term]
+            self.total_length -= len(document[2])
+
+    def remove_deal(self, deal_id: int) -> None:
+        with self.lock:
+            for key in [key for key, document in self.documents.items() if document[0] == deal_id]:
+                self.remove(key)
+
+    def search(self, query: str, board_ids: set, top: int) -> list[tuple[tuple, float]]:
+        """The best `top` documents containing every query term on the given boards, by BM25 score"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self.lock:
+            postings = [self.postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            count = len(self.documents)
+            average_length = (self.total_length / count) or 1
+            # Intersect starting from the rarest term
+            postings.sort(key=len)
+            weighted = [
+                (term_postings, math.log(1 + (count - len(term_postings) + 0.5) / (len(term_postings) + 0.5)))
+                for term_postings in postings
+            ]
+            documents = self.documents
+            others = postings[1:]
+            scored = []
+            for key, frequency in postings[0].items():
+                document = documents[key]
+                if document[1] not in board_ids:
+                    continue
+                if others and not all(key in other for other in others):
+                    continue
+                norm = _K1 * (1 - _B + _B * len(document[2]) / average_length)
+                score = weighted[0][1] * frequency * (_K1 + 1) / (frequency + norm)
+                for term_postings, idf in weighted[1:]:
+                    frequency = term_postings[key]
+                    score += idf * frequency * (_K1 + 1) / (frequency + norm)
+                scored.append((score, key))
+        return [(key, score) for score, key in heapq.nlargest(top, scored)]
+
+
+_local_index = InvertedIndex()
+
+
+def _uses_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _after_commit(db: Session, change: tuple) -> None:
+    """Apply a change to the in-process index once the session's transaction commits"""
+    if _uses_postgres(db):
+        return
+    if 'pending_search_changes' not in db.info:
+        db.info['pending_search_changes'] = []
+        event.listen(db, "after_commit", _apply_pending)
+        event.listen(db, "after_rollback", _discard_pending)
+    db.info['pending_search_changes'].append(change)
+
+
+def _discard_pending(session: Session) -> None:
+    session.info['pending_search_changes'] = []
+
+
+def _apply_pending(session: Session) -> None:
+    changes = session.info['pending_search_changes']
+    session.info['pending_search_changes'] = []
+    # Until the first search loads it, the index has nothing to update
+    if not _local_index.loaded:
+        return
+    for action, *args in changes:
+        if action == "put":
+            _local_index.put(*args)
+        else:
+            _local_index.remove_deal(*args)
+
+
+def index_document(
+    db: Session,
+    kind: str,
+    source_id: int,
+    deal_id: int,
+    board_id: int,
+    title: Optional[str],
+    body: Optional[str]
+) -> None:
+    """Insert or replace the search document for a deal, comment or memo; the caller commits"""
+    values = {'deal_id': deal_id, 'board_id': board_id, 'title': title, 'body': body}
+    result = db.execute(
+        update(SearchDocument)
+        .where(SearchDocument.kind == kind, SearchDocument.source_id == source_id)
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(SearchDocument).values(kind=kind, source_id=source_id, **values))
+    _after_commit(db, ("put", (kind, source_id), deal_id, board_id, title, body))
+
+
+def index_new_documents(db: Session, rows: list[dict]) -> None:
+    """Insert documents known not to exist yet with one multi-row INSERT"""
+    if not rows:
+        return
+    db.execute(insert(SearchDocument), rows)
+    for row in rows:
+        _after_commit(db, (
+            "put", (row['kind'], row['source_id']), row['deal_id'], row['board_id'], row['title'], row['body']
+        ))
+
+
+def forget_deal(db: Session, deal_id: int) -> None:
+    """Drop a deleted deal's documents from the in-process index (the database cascades)"""
+    _after_commit(db, ("remove_deal", deal_id))
+
+
+def _snippet(title: Optional[str], body: Optional[str]) -> str:
+    text = body or title or ""
+    return text if len(text) <= SEARCH_SNIPPET_LENGTH else text[:SEARCH_SNIPPET_LENGTH].rstrip() + "…"
+
+
+def search_documents(db: Session, query: str, board_ids: list[int], limit: int, offset: int) -> tuple[list[dict], bool]:
+    """Ranked matches on the given boards and whether more follow this page"""
+    if not board_ids or not query.strip():
+        return [], False
+
+    columns = (SearchDocument, Deal.name)
+    if _uses_postgres(db):
+        tsquery = func.websearch_to_tsquery(literal_column("'english'::regconfig"), query)
+        vector = search_vector(SearchDocument.title, SearchDocument.body)
+        rank = func.ts_rank_cd(vector, tsquery)
+        rows = db.query(*columns, rank).join(
+            Deal, Deal.id == SearchDocument.deal_id
+        ).filter(
+            SearchDocument.board_id.in_(board_ids),
+            vector.op("@@")(tsquery)
+        ).order_by(rank.desc(), SearchDocument.id).offset(offset).limit(limit + 1).all()
+    else:
+        _local_index.load(db)
+        ranked = _local_index.search(query, set(board_ids), offset + limit + 1)[offset:]
+        scores = dict(ranked)
+        found = {}
+        if ranked:
+            for document, deal_name in db.query(*columns).join(
+                Deal, Deal.id == SearchDocument.deal_id
+            ).filter(tuple_(SearchDocument.kind, SearchDocument.source_id).in_(list(scores))):
+                found[(document.kind, document.source_id)] = (document, deal_name)
+        rows = [(*found[key], score) for key, score in ranked if key in found]
+
+    has_more = len(rows) > limit
+    return [
+        {
+            'kind': document.kind,
+            'source_id': document.source_id,
+            'deal_id': document.deal_id,
+            'board_id': document.board_id,
+            'deal_name': deal_name,
+            'snippet': _snippet(document.title, document.body),
+            'score': round(float(score), 4)
+        }
+        for document, deal_name, score in rows[:limit]
+    ], has_more
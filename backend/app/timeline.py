@@ -0,0 +1,49 @@
+"""
+Structured deal stage history. Every stage a deal enters is written to
+deal_stage_transitions in the same transaction as the change, so timelines and
+funnels are index range scans rather than scans of activity text.
+"""
+import re
+from typing import Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import DealStage, DealStageTransition
+
+STAGE_BY_VALUE = {stage.value: stage for stage in DealStage}
+
+# Tail of stage_change activity descriptions: "... from Screen to Diligence"
+_STAGE_CHANGE = re.compile(r" from (\w+) to (\w+)$")
+
+
+def parse_stage_change(description: Optional[str]) -> Optional[tuple[DealStage, DealStage]]:
+    """(from, to) stages named in a stage_change activity description, if it has them"""
+    match = _STAGE_CHANGE.search(description or "")
+    if not match or match.group(1) not in STAGE_BY_VALUE or match.group(2) not in STAGE_BY_VALUE:
+        return None
+    return STAGE_BY_VALUE[match.group(1)], STAGE_BY_VALUE[match.group(2)]
+
+
+def record_transitions(db: Session, rows: list[dict]) -> None:
+    """
+    Insert transitions (dicts of deal_id, board_id, from_stage, to_stage, user_id)
+    with one multi-row INSERT in the caller's transaction
+    """
+    if rows:
+        db.execute(insert(DealStageTransition), rows)
+
+
+def record_transition(
+    db: Session,
+    deal_id: int,
+    board_id: int,
+    from_stage: Optional[DealStage],
+    to_stage: DealStage,
+    user_id: Optional[int]
+) -> None:
+    record_transitions(db, [{
+        'deal_id': deal_id,
+        'board_id': board_id,
+        'from_stage': from_stage,
+        'to_stage': to_stage,
+        'user_id': user_id
+    }])
@@ -0,0 +1,190 @@
+"""
+Board listing latency under concurrency, with blocking work on and off the event loop.
+
+Seeds boards with seed_db, then fires --concurrency GET /boards/ requests at once
+(each as a different seeded user) alongside --logins password logins, for
+--rounds rounds, in two modes:
+
+    event-loop   async def handlers that call the synchronous Session and bcrypt
+                 directly, as the board handlers and auth dependency did before
+                 they moved to the threadpool
+    threadpool   the app's own routes: the board handlers are plain def and run
+                 in FastAPI's threadpool, and logins await bcrypt on the password
+                 hashing pool without holding a threadpool thread
+
+Requests go through httpx's ASGI transport, so the middleware, routing and
+database path are measured without a network in between. A local SQLite file
+answers in microseconds, which hides what a blocked loop costs, so every SQL
+statement waits --query-delay-ms first to stand in for a database round trip.
+Reports p50/p95/p99 latency of the board listings and of the logins per mode,
+counted from when each round's requests arrive together.
+
+    python -m benchmarks.board_concurrency --concurrency 200 --logins 20
+    python -m benchmarks.board_concurrency --database-url postgresql://... --query-delay-ms 0
+
+Defaults to a throwaway SQLite file; an explicit --database-url gets new
+boards added to it.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import numpy as np
+
+# mode -> (board listing path, login path)
+MODES = {
+    "event-loop": ("/benchmark/boards-on-loop", "/benchmark/login-on-loop"),
+    "threadpool": ("/boards/", "/auth/login"),
+}
+
+
+def add_event_loop_routes(app) -> None:
+    """Register async def copies of the board listing and login that block the event loop"""
+    import bcrypt
+    from fastapi import Depends, HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy.orm import Session
+    from app.auth import authenticate_token, create_access_token, security
+    from app.database import get_db
+    from app.models import User
+    from app.routers.boards import list_boards
+    from app.schemas import LoginRequest
+
+    async def current_user_on_loop(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
+    ) -> User:
+        return authenticate_token(credentials.credentials, db)
+
+    @app.get("/benchmark/boards-on-loop", include_in_schema=False)
+    async def boards_on_loop(current_user: User = Depends(current_user_on_loop), db: Session = Depends(get_db)):
+        return list_boards(current_user, db)
+
+    @app.post("/benchmark/login-on-loop", include_in_schema=False)
+    async def login_on_loop(login_data: LoginRequest, db: Session = Depends(get_db)):
+        user = db.query(User).filter(User.email == login_data.email).first()
+        password = login_data.password.encode('utf-8')
+        if not user or not bcrypt.checkpw(password, user.hashed_password.encode('utf-8')):
+            raise HTTPException(status_code=401, detail="Incorrect email or password")
+        return {"access_token": create_access_token({"sub": str(user.id)})}
+
+
+def add_query_delay(engine, seconds: float) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(seconds)
+
+
+def _percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    return tuple(float(value) for value in np.percentile(np.array(latencies) * 1000, [50, 95, 99]))
+
+
+async def run_mode(app, tokens: list[str], args, boards_path: str, login_path: str) -> dict:
+    import httpx
+    from seed_db import SEED_USER_PASSWORD, seed_user_email
+
+    listings, logins = [], []
+    rng = random.Random(0)
+
+    async def timed(latencies: list, request, started: float) -> None:
+        response = await request
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for _ in range(args.rounds):
+            # Every request in a round arrives at once, so latency counts from the round's
+            # start: a request stuck behind a blocked loop has not even begun until it frees
+            started = time.perf_counter()
+            requests = [
+                timed(listings, client.get(boards_path, headers={"Authorization": f"Bearer {tokens[index % len(tokens)]}"}), started)
+                for index in range(args.concurrency)
+            ] + [
+                timed(logins, client.post(login_path, json={
+                    'email': seed_user_email(index % len(tokens)),
+                    'password': SEED_USER_PASSWORD
+                }), started)
+                for index in range(args.logins)
+            ]
+            # Interleave the logins with the listings, the same way in both modes
+            rng.shuffle(requests)
+            await asyncio.gather(*requests)
+    return {'listings': _percentiles(listings), 'logins': _percentiles(logins) if logins else None}
+
+
+def run(args) -> None:
+    # The app reads DATABASE_URL when it is first imported, so import it only now
+    from sqlalchemy import select
+    from app.auth import create_access_token
+    from app.database import SessionLocal, engine
+    from app.models import User
+    from seed_db import seed, seed_user_email
+    from main import app
+
+    seed(
+        boards=args.boards,
+        deals=args.deals,
+        comments=0,
+        votes=0,
+        memo_versions=1,
+        users=args.users,
+        seed_value=0
+    )
+    with SessionLocal() as db:
+        emails = [seed_user_email(index) for index in range(args.users)]
+        user_ids = db.scalars(select(User.id).where(User.email.in_(emails))).all()
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in user_ids]
+    add_event_loop_routes(app)
+    if args.query_delay_ms:
+        add_query_delay(engine, args.query_delay_ms / 1000)
+
+    print(
+        f"{args.concurrency} concurrent board listings and {args.logins} logins x {args.rounds} rounds, "
+        f"{args.query_delay_ms}ms per SQL statement"
+    )
+    print(f"{'mode':<12} {'list p50':>9} {'list p95':>9} {'list p99':>9} {'login p50':>10} {'login p99':>10}")
+    for mode, (boards_path, login_path) in MODES.items():
+        result = asyncio.run(run_mode(app, tokens, args, boards_path, login_path))
+        p50, p95, p99 = result['listings']
+        login = result['logins'] or (float("nan"),) * 3
+        print(f"{mode:<12} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {login[0]:>10.1f} {login[2]:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200, help="Board listings in flight at once")
+    parser.add_argument("--logins", type=int, default=20, help="Logins sent alongside each round of listings")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--boards", type=int, default=10)
+    parser.add_argument("--deals", type=int, default=20, help="Deals per board")
+    parser.add_argument("--users", type=int, default=20, help="Seeded users, each a member of every board")
+    parser.add_argument("--query-delay-ms", type=float, default=2.0, help="Simulated round trip before each SQL statement")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    # Per-request access logs would drown out the report
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    try:
+        run(args)
+    finally:
+        if scratch:
+            # Hand back the snowflake worker id while its table still exists
+            from app.ids import release_worker_id
+            release_worker_id()
+            os.remove(scratch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Insert throughput and primary key index size for each id scheme.
+
+Inserts the same number of rows into a scratch table per scheme in multi-row
+batches, then reports rows/second and the size and fill of the primary key
+index. Random keys split pages all over the B-tree and leave them half full;
+time-ordered keys append to the right-hand edge.
+
+    python -m benchmarks.id_generation --rows 200000
+    python -m benchmarks.id_generation --database-url postgresql://...
+
+Defaults to a throwaway SQLite file; scratch tables are dropped afterwards.
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, create_engine, insert, text
+from app.ids import ID_GENERATORS
+
+
+def index_stats(conn, table: Table) -> dict:
+    """Primary key index size in bytes and the fraction of its pages in use"""
+    if conn.dialect.name == "postgresql":
+        index = conn.execute(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:table AS regclass) AND indisprimary"),
+            {'table': table.name}
+        ).scalar_one()
+        size = conn.execute(text("SELECT pg_relation_size(CAST(:index AS regclass))"), {'index': index}).scalar_one()
+        try:
+            density = conn.execute(
+                text("SELECT avg_leaf_density FROM pgstatindex(:index)"), {'index': index}
+            ).scalar_one() / 100
+        except Exception:  # pgstattuple extension not installed
+            conn.rollback()
+            density = None
+        return {'index_bytes': size, 'fill': density}
+
+    # SQLite keeps a non-INTEGER primary key in a separate automatic index
+    row = conn.execute(
+        text("SELECT SUM(pgsize), SUM(unused) FROM dbstat WHERE name = :index"),
+        {'index': f"sqlite_autoindex_{table.name}_1"}
+    ).one()
+    return {'index_bytes': row[0], 'fill': 1 - row[1] / row[0]}
+
+
+def run(engine, scheme: str, rows: int, batch_size: int) -> dict:
+    metadata = MetaData()
+    table = Table(
+        f"bench_ids_{scheme}",
+        metadata,
+        Column('id', BigInteger, primary_key=True, autoincrement=False),
+        Column('name', String, nullable=False),
+    )
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    generate = ID_GENERATORS[scheme](0)
+    seen: set = set()
+    collisions = 0
+    elapsed = 0.0
+    try:
+        with engine.connect() as conn:
+            for start in range(0, rows, batch_size):
+                batch = []
+                while len(batch) < min(batch_size, rows - start):
+                    row_id = generate()
+                    if row_id in seen:
+                        # Without this check the random scheme's INSERT would fail
+                        collisions += 1
+                        continue
+                    seen.add(row_id)
+                    batch.append({'id': row_id, 'name': f"deal {row_id}"})
+
+                began = time.perf_counter()
+                conn.execute(insert(table), batch)
+                conn.commit()
+                elapsed += time.perf_counter() - began
+
+            stats = index_stats(conn, table)
+    finally:
+        metadata.drop_all(engine)
+
+    return {'scheme': scheme, 'rows_per_second': rows / elapsed, 'collisions': collisions, **stats}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        url, scratch = args.database_url, None
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite:///{scratch}"
+
+    engine = create_engine(url)
+    try:
+        print(f"{'scheme':<10} {'rows/s':>10} {'collisions':>10} {'pk index':>10} {'fill':>6}")
+        for scheme in ID_GENERATORS:
+            result = run(engine, scheme, args.rows, args.batch_size)
+            fill = f"{result['fill']:.0%}" if result['fill'] is not None else "n/a"
+            print(
+                f"{result['scheme']:<10} {result['rows_per_second']:>10,.0f} {result['collisions']:>10,} "
+                f"{result['index_bytes'] / 1024 / 1024:>8.1f}MB {fill:>6}"
+            )
+    finally:
+        engine.dispose()
+        if scratch:
+            os.remove(scratch)
+
+
+if __name__ == "__main__":
+    main()
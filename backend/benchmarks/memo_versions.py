@@ -0,0 +1,179 @@
+"""
+Storage size and reconstruction latency of IC memo versions, full snapshots vs deltas.
+
+Writes the same --versions edits of one memo once per snapshot interval. Each
+edit rewrites, inserts or deletes a few lines of one section, as a save from
+the editor does. Interval 1 stores every version as a full snapshot (the
+layout before delta encoding); larger intervals store a snapshot every N
+versions and line diffs of the changed sections in between (app.memo_store).
+Reports the bytes of section text and deltas stored, the table's on-disk size,
+and the latency of rebuilding sampled versions with load_memo_version. Every
+sampled version is checked against the text that was saved.
+
+    python -m benchmarks.memo_versions --versions 1000
+    python -m benchmarks.memo_versions --intervals 1,10,20,50 --database-url postgresql://...
+
+Defaults to a throwaway SQLite file; an explicit --database-url gets a
+benchmark board, deal and memos added to it.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+import numpy as np
+
+
+def generate_edits(versions: int, lines: int, seed: int) -> list[dict]:
+    """Full section text of every version, each one a small edit of one section of the last"""
+    from app.memo_store import MEMO_SECTIONS
+
+    rng = random.Random(seed)
+
+    def line() -> str:
+        return " ".join(f"word{rng.randint(1, 5000)}" for _ in range(rng.randint(6, 16))) + "\n"
+
+    sections = {section: [line() for _ in range(lines)] for section in MEMO_SECTIONS}
+    history = [{section: "".join(text) for section, text in sections.items()}]
+    for _ in range(versions - 1):
+        text = sections[rng.choice(MEMO_SECTIONS)]
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(text) + 1)
+            action = rng.random()
+            if action < 0.6 and position < len(text):
+                text[position] = line()
+            elif action < 0.8 or len(text) < 2:
+                text.insert(position, line())
+            elif position < len(text):
+                del text[position]
+        history.append({section: "".join(text) for section, text in sections.items()})
+    return history
+
+
+def table_bytes(db) -> int:
+    from sqlalchemy import text
+
+    if db.get_bind().dialect.name == "postgresql":
+        return db.execute(text("SELECT pg_total_relation_size('memo_versions')")).scalar_one()
+    return db.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = 'memo_versions'")).scalar_one() or 0
+
+
+def run_interval(db, deal_id: int, history: list[dict], interval: int, samples: int, seed: int) -> dict:
+    from app import memo_store
+    from app.memo_store import MEMO_SECTIONS, build_memo_version, load_memo_version
+    from app.models import ICMemo, MemoVersion
+
+    memo_store.MEMO_SNAPSHOT_INTERVAL = interval
+    memo = ICMemo(deal_id=deal_id, current_version=len(history))
+    db.add(memo)
+    db.flush()
+
+    size_before = table_bytes(db)
+    payload = 0
+    previous = None
+    for number, sections in enumerate(history, start=1):
+        row = build_memo_version(memo.id, number, previous, sections)
+        db.add(row)
+        payload += sum(len((getattr(row, section) or "").encode('utf-8')) for section in MEMO_SECTIONS)
+        if row.delta:
+            payload += len(json.dumps(row.delta).encode('utf-8'))
+        previous = sections
+    db.commit()
+    size = table_bytes(db) - size_before
+
+    rng = random.Random(seed)
+    latencies = []
+    for number in (rng.randint(1, len(history)) for _ in range(samples)):
+        started = time.perf_counter()
+        version = load_memo_version(db, memo.id, number)
+        latencies.append(time.perf_counter() - started)
+        db.expunge_all()
+        assert {section: version[section] for section in MEMO_SECTIONS} == history[number - 1], number
+
+    rows = db.query(MemoVersion).filter(MemoVersion.memo_id == memo.id).count()
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        'interval': interval,
+        'rows': rows,
+        'payload_bytes': payload,
+        'table_bytes': size,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+
+
+def run(args) -> None:
+    # The app reads DATABASE_URL when it is first imported, so import it only now
+    from app.database import Base, SessionLocal, engine
+    from app.ids import reserve_worker_id
+    from app.models import Board, Deal, User, UserRole
+
+    Base.metadata.create_all(engine)
+    # Lease the id worker before the session below holds SQLite's write lock
+    reserve_worker_id()
+    history = generate_edits(args.versions, args.lines, args.seed)
+    full_text = sum(len(text.encode('utf-8')) for sections in history for text in sections.values())
+    print(f"{args.versions} versions, {len(history[-1])} sections of ~{args.lines} lines; {full_text / 1e6:.1f}MB as full snapshots")
+    print(f"{'interval':>8} {'rows':>6} {'payload':>10} {'table':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    with SessionLocal() as db:
+        owner = User(
+            email=f"memo-benchmark-{uuid.uuid4().hex[:8]}@example.com",
+            full_name="Memo Benchmark",
+            hashed_password="unused",
+            role=UserRole.ANALYST
+        )
+        db.add(owner)
+        db.flush()
+        board = Board(name="Memo benchmark", created_by=owner.id)
+        db.add(board)
+        db.flush()
+        owner_id, board_id = owner.id, board.id
+        for interval in args.intervals:
+            # One deal per interval, since a deal has a single memo
+            deal = Deal(name=f"Memo benchmark, interval {interval}", owner_id=owner_id, board_id=board_id)
+            db.add(deal)
+            db.flush()
+            result = run_interval(db, deal.id, history, interval, args.samples, args.seed)
+            print(
+                f"{result['interval']:>8} {result['rows']:>6} {result['payload_bytes'] / 1e6:>8.2f}MB "
+                f"{result['table_bytes'] / 1e6:>8.2f}MB {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--versions", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=40, help="Lines per section in the first version")
+    parser.add_argument(
+        "--intervals", type=lambda value: [int(part) for part in value.split(",")], default=[1, 10, 20, 50],
+        help="Comma-separated snapshot intervals; 1 stores every version in full"
+    )
+    parser.add_argument("--samples", type=int, default=200, help="Versions rebuilt per interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    try:
+        run(args)
+    finally:
+        if scratch:
+            # Hand back the snowflake worker id while its table still exists
+            from app.ids import release_worker_id
+            release_worker_id()
+            os.remove(scratch)
+
+
+if __name__ == "__main__":
+    main()
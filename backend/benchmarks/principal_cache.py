@@ -0,0 +1,142 @@
+"""
+Cost of authenticating a request with and without the principal cache.
+
+Creates --users users on a scratch database, then sends --requests GET /auth/me
+calls through the app, spread evenly across the users' tokens, once per mode:
+
+    lookup          every request loads the user (PRINCIPAL_CACHE_TTL_SECONDS=0)
+    cache           decoded principals are cached per token
+    embedded        the profile travels in the token (JWT_EMBED_PRINCIPAL), no cache
+    embedded+cache  both
+
+and reports SQL statements per request and p50/p95/p99 latency. /auth/me does no
+work of its own, so the difference between modes is the authentication cost.
+
+    python -m benchmarks.principal_cache --users 100 --requests 5000
+    python -m benchmarks.principal_cache --database-url postgresql://...
+
+Defaults to a throwaway SQLite file; an explicit --database-url gets the
+benchmark users added to it.
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+import numpy as np
+
+# mode -> (cache TTL seconds, embed the principal in tokens)
+MODES = {
+    "lookup": (0, False),
+    "cache": (60, False),
+    "embedded": (0, True),
+    "embedded+cache": (60, True),
+}
+
+
+def create_tokens(count: int) -> dict[bool, list[str]]:
+    """Plain and principal-embedding access tokens for `count` new users"""
+    from app import auth
+    from app.database import SessionLocal
+    from app.models import User, UserRole
+
+    run_id = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        users = [
+            User(
+                email=f"principal-{run_id}-{index}@example.com",
+                full_name=f"Benchmark User {index}",
+                hashed_password="unused",
+                role=UserRole.ANALYST
+            )
+            for index in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+
+        tokens = {}
+        for embed in (False, True):
+            auth.settings.JWT_EMBED_PRINCIPAL = embed
+            tokens[embed] = [
+                auth.create_access_token({"sub": str(user.id), **auth.principal_claims(user)})
+                for user in users
+            ]
+    return tokens
+
+
+def run_mode(client, tokens: list[str], requests: int, cache_ttl: int, embed: bool) -> dict:
+    from app import auth
+    from app.query_profiler import QueryCollector
+
+    auth.settings.PRINCIPAL_CACHE_TTL_SECONDS = cache_ttl
+    auth.settings.JWT_EMBED_PRINCIPAL = embed
+    auth._principal_cache.clear()
+
+    latencies = []
+    with QueryCollector() as collector:
+        for index in range(requests):
+            headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+            started = time.perf_counter()
+            response = client.get("/auth/me", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        'queries_per_request': collector.count / requests,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+
+
+def run(args) -> None:
+    # The app reads its settings when it is first imported, so import it only now
+    from fastapi.testclient import TestClient
+    from app.database import Base, engine
+    from app.query_profiler import instrument_profiler
+    from main import app
+
+    Base.metadata.create_all(engine)
+    # main() turns the profiler off, so count statements on the engine directly
+    instrument_profiler(engine)
+    tokens = create_tokens(args.users)
+
+    print(f"{args.requests} requests across {args.users} users")
+    print(f"{'mode':<16} {'queries/req':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    with TestClient(app) as client:
+        for mode, (cache_ttl, embed) in MODES.items():
+            result = run_mode(client, tokens[embed], args.requests, cache_ttl, embed)
+            print(
+                f"{mode:<16} {result['queries_per_request']:>12.2f} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per mode")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    # Per-request access logs would drown out the report
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Its middleware would add per-request overhead to every mode
+    os.environ["QUERY_PROFILER_ENABLED"] = "false"
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    try:
+        run(args)
+    finally:
+        if scratch:
+            os.remove(scratch)
+
+
+if __name__ == "__main__":
+    main()
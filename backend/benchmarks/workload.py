@@ -0,0 +1,292 @@
+"""
+Scripted user workload against a seeded database, driven in-process through the ASGI app.
+
+Seeds boards with seed_db, then runs --users virtual users concurrently. Each
+logs in as a generated user and repeats the session the frontend produces: list
+boards, open a board (every page of its deals), open a deal's detail page, then
+act according to its board role - drag deals to another stage (admins and
+analysts), comment (everyone), vote (admins and partners) and edit the IC memo
+(admins and analysts). Requests go through httpx's ASGI transport, so the full
+middleware, routing, serialization and database path is measured without a
+network in between.
+
+Reports throughput and p50/p95/p99 latency per endpoint. Results can be saved
+as a baseline in benchmarks/baselines/ and later runs compared against it:
+
+    python -m benchmarks.workload --save-baseline sqlite-small
+    python -m benchmarks.workload --baseline sqlite-small
+    python -m benchmarks.workload --database-url postgresql://... --deals 2000
+
+A comparison exits with status 1 when an endpoint's p50 or p95 grew by more than
+--max-regression. Baselines only compare runs on the same machine with the same
+options. Defaults to a throwaway SQLite file; an explicit --database-url gets new
+boards added to it (--reset drops every table first).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import numpy as np
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Latency changes smaller than this are noise, whatever the ratio
+NOISE_FLOOR_MS = 1.0
+
+STAGES = ("Sourced", "Screen", "Diligence", "IC", "Invested", "Passed")
+MEMO_SECTIONS = ("summary", "market", "product", "traction", "risks", "open_questions")
+
+
+class Recorder:
+    """Latencies and failures per endpoint (method and route template)"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.enabled = False
+
+    async def call(self, client, endpoint: str, path: str, **kwargs):
+        method = endpoint.split(" ", 1)[0]
+        started = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        if self.enabled:
+            self.latencies[endpoint].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[endpoint] += 1
+        return response
+
+
+async def _open_board(recorder: Recorder, client, board_id: int) -> list[dict]:
+    """Every deal on the board, page by page as the frontend fetches them"""
+    deals = []
+    params = {'board_id': board_id}
+    while True:
+        response = await recorder.call(client, "GET /deals", "/deals", params=params)
+        deals += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return deals
+        params = {'board_id': board_id, 'cursor': cursor}
+
+
+async def virtual_user(recorder: Recorder, app, index: int, iterations: int, seed: int) -> None:
+    import httpx
+    from app.models import UserRole
+    from seed_db import SEED_USER_PASSWORD, seed_user_email, seed_user_role
+
+    rng = random.Random(seed * 1000 + index)
+    role = seed_user_role(index)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        response = await recorder.call(client, "POST /auth/login", "/auth/login", json={
+            'email': seed_user_email(index),
+            'password': SEED_USER_PASSWORD
+        })
+        response.raise_for_status()
+        client.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+
+        for _ in range(iterations):
+            boards = (await recorder.call(client, "GET /boards/", "/boards/")).json()
+            board_id = rng.choice(boards)['id']
+            deals = await _open_board(recorder, client, board_id)
+            deal_id = rng.choice(deals)['id']
+
+            await recorder.call(client, "GET /boards/{board_id}", f"/boards/{board_id}")
+            await recorder.call(client, "GET /deals/{deal_id}", f"/deals/{deal_id}")
+            await recorder.call(client, "GET /deals/{deal_id}/activities", f"/deals/{deal_id}/activities")
+            await recorder.call(client, "GET /deals/{deal_id}/comments", f"/deals/{deal_id}/comments")
+            await recorder.call(client, "GET /deals/{deal_id}/votes", f"/deals/{deal_id}/votes")
+            await recorder.call(client, "GET /memos/deal/{deal_id}", f"/memos/deal/{deal_id}")
+
+            if role in (UserRole.ADMIN, UserRole.ANALYST):
+                moves = [
+                    {'deal_id': deal['id'], 'stage': rng.choice(STAGES)}
+                    for deal in rng.sample(deals, min(len(deals), rng.randint(1, 3)))
+                ]
+                await recorder.call(
+                    client, "PATCH /boards/{board_id}/deals:move", f"/boards/{board_id}/deals:move",
+                    json={'moves': moves}
+                )
+            await recorder.call(
+                client, "POST /deals/{deal_id}/comments", f"/deals/{deal_id}/comments",
+                json={'content': f"Load test comment {rng.randint(1, 10 ** 6)}"}
+            )
+            if role in (UserRole.ADMIN, UserRole.PARTNER):
+                await recorder.call(
+                    client, "POST /deals/{deal_id}/votes", f"/deals/{deal_id}/votes",
+                    json={'vote': rng.choice(("approve", "decline"))}
+                )
+            if role in (UserRole.ADMIN, UserRole.ANALYST):
+                section = rng.choice(MEMO_SECTIONS)
+                await recorder.call(
+                    client, "PUT /memos/deal/{deal_id}", f"/memos/deal/{deal_id}",
+                    json={section: f"Updated during load test {rng.randint(1, 10 ** 6)}"}
+                )
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        endpoints[endpoint] = {
+            'requests': len(latencies),
+            'errors': recorder.errors.get(endpoint, 0),
+            'throughput': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+        }
+    requests = sum(result['requests'] for result in endpoints.values())
+    return {'requests': requests, 'seconds': round(elapsed, 2), 'throughput': round(requests / elapsed, 2), 'endpoints': endpoints}
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Endpoints whose p50 or p95 regressed beyond max_regression (as a fraction) and the noise floor"""
+    regressions = []
+    for endpoint, result in current['endpoints'].items():
+        before = baseline['endpoints'].get(endpoint)
+        if before is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] - before[key] > max(before[key] * max_regression, NOISE_FLOOR_MS):
+                regressions.append(endpoint)
+                break
+    return regressions
+
+
+def _change(now: float, before: float) -> str:
+    return f"{(now - before) / before:+.0%}" if before else "n/a"
+
+
+def print_report(results: dict, baseline: dict = None, regressions: tuple = ()) -> None:
+    header = f"{'endpoint':<38} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'p50 vs base':>12} {'p95 vs base':>12}"
+    print(header)
+    for endpoint, result in results['endpoints'].items():
+        line = (
+            f"{endpoint:<38} {result['requests']:>6} {result['errors']:>4} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+        )
+        before = (baseline or {}).get('endpoints', {}).get(endpoint)
+        if before:
+            line += f" {_change(result['p50_ms'], before['p50_ms']):>12} {_change(result['p95_ms'], before['p95_ms']):>12}"
+        if endpoint in regressions:
+            line += "  REGRESSED"
+        print(line)
+    print(f"{results['requests']} requests in {results['seconds']}s: {results['throughput']} req/s")
+    if baseline:
+        print(f"Baseline: {baseline['throughput']} req/s ({_change(results['throughput'], baseline['throughput'])})")
+
+
+def run(args) -> dict:
+    # The app reads DATABASE_URL when it is first imported, so import it only now
+    from seed_db import seed
+    from main import app
+
+    board_ids = seed(
+        boards=args.boards,
+        deals=args.deals,
+        comments=args.comments,
+        votes=args.votes,
+        memo_versions=args.memo_versions,
+        users=max(args.users, 3),
+        seed_value=args.seed,
+        reset=args.reset
+    )
+    print(f"Seeded {len(board_ids)} boards x {args.deals} deals; running {args.users} users x {args.iterations} iterations")
+
+    recorder = Recorder()
+
+    async def workload(iterations: int) -> None:
+        await asyncio.gather(*(
+            virtual_user(recorder, app, index, iterations, args.seed)
+            for index in range(args.users)
+        ))
+
+    if args.warmup:
+        asyncio.run(workload(args.warmup))
+    recorder.enabled = True
+    started = time.perf_counter()
+    asyncio.run(workload(args.iterations))
+    return summarize(recorder, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boards", type=int, default=2)
+    parser.add_argument("--deals", type=int, default=300, help="Deals per board")
+    parser.add_argument("--comments", type=int, default=3, help="Comments per deal")
+    parser.add_argument("--votes", type=int, default=2, help="Votes per deal")
+    parser.add_argument("--memo-versions", type=int, default=3, help="IC memo versions per deal")
+    parser.add_argument("--users", type=int, default=6, help="Concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=20, help="Sessions per virtual user")
+    parser.add_argument("--warmup", type=int, default=1, help="Unrecorded sessions per virtual user first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="Drop every table in --database-url first")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Write the results to baselines/NAME.json")
+    parser.add_argument("--baseline", metavar="NAME", help="Compare against baselines/NAME.json")
+    parser.add_argument("--max-regression", type=float, default=0.5, help="Allowed p50/p95 growth, as a fraction")
+    args = parser.parse_args()
+
+    # Per-request access logs would drown out the report
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    try:
+        results = run(args)
+    finally:
+        if scratch:
+            # Hand back the snowflake worker id while its table still exists
+            from app.ids import release_worker_id
+            release_worker_id()
+            os.remove(scratch)
+
+    from sqlalchemy.engine import make_url
+    results['options'] = {
+        'database': make_url(os.environ["DATABASE_URL"]).get_backend_name(),
+        'python': platform.python_version(),
+        **{key: getattr(args, key) for key in (
+            "boards", "deals", "comments", "votes", "memo_versions", "users", "iterations", "warmup", "seed"
+        )},
+    }
+
+    baseline = None
+    regressions = []
+    if args.baseline:
+        with open(os.path.join(BASELINE_DIR, f"{args.baseline}.json")) as file:
+            baseline = json.load(file)
+        if baseline['options'] != results['options']:
+            print(f"Warning: baseline {args.baseline} was recorded with different options: {baseline['options']}")
+        regressions = compare(results, baseline, args.max_regression)
+
+    print_report(results, baseline, regressions)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Saved baseline to {path}")
+
+    if regressions:
+        print(f"{len(regressions)} endpoints regressed more than {args.max_regression:.0%} against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
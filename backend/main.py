@@ -1,14 +1,46 @@
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
 from app.config import get_settings
-from app.routers import auth, deals, memos, interactions, boards
+from app.logging_config import configure_logging, RequestIdMiddleware, REQUEST_ID_HEADER
+from app.pagination import NEXT_CURSOR_HEADER
+from app.ids import release_worker_id, reserve_worker_id
+from app.auth import authenticate_token, get_admin_user
+from app.database import engine, get_db
+from app.db_pool import pool_metrics
+from app.metrics import MetricsMiddleware, instrument_queries, render_metrics
+from app.query_profiler import (
+    QUERY_COUNT_HEADER,
+    QUERY_TIME_HEADER,
+    QUERY_WARNINGS_HEADER,
+    QueryProfilerMiddleware,
+    instrument_profiler,
+    query_history
+)
+from app.routers import auth, deals, memos, interactions, boards, search
 
 settings = get_settings()
+configure_logging(settings)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lease the worker id before any request holds a write transaction; fails if none is free
+    reserve_worker_id()
+    yield
+    release_worker_id()
+
 
 app = FastAPI(
     title="Investment Management API",
     description="Deal pipeline management system for investment teams",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,7 +50,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QUERY_WARNINGS_HEADER],
 )
+if settings.QUERY_PROFILER_ENABLED:
+    # Inside RequestIdMiddleware so profiles carry the request id
+    app.add_middleware(QueryProfilerMiddleware)
+    instrument_profiler(engine)
+app.add_middleware(RequestIdMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_queries(engine)
 
 # Include routers
 app.include_router(auth.router)
@@ -26,6 +67,7 @@ app.include_router(boards.router)
 app.include_router(deals.router)
 app.include_router(memos.router)
 app.include_router(interactions.router)
+app.include_router(search.router)
 
 
 @app.get("/")
@@ -42,6 +84,51 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/pool", dependencies=[Depends(get_admin_user)])
+def pool_health():
+    """Connection pool usage and checkout wait times since startup"""
+    return {"mode": settings.DB_POOL_MODE, **pool_metrics.snapshot(engine.pool)}
+
+
+metrics_credentials = HTTPBearer(auto_error=False)
+
+
+def authorize_metrics(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(metrics_credentials),
+    db: Session = Depends(get_db)
+) -> None:
+    """Scrapers must send METRICS_TOKEN when it is set; otherwise only admins may read metrics"""
+    if settings.METRICS_TOKEN:
+        token = credentials.credentials if credentials else ""
+        if not secrets.compare_digest(token.encode('utf-8'), settings.METRICS_TOKEN.encode('utf-8')):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid metrics token"
+            )
+        return
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    get_admin_user(authenticate_token(credentials.credentials, db))
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(authorize_metrics)])
+    def metrics():
+        """Request, SQL and connection pool metrics in the Prometheus text format"""
+        return PlainTextResponse(render_metrics(engine.pool), media_type="text/plain; version=0.0.4")
+
+
+if settings.QUERY_PROFILER_ENABLED:
+    @app.get("/debug/queries", include_in_schema=False, dependencies=[Depends(get_admin_user)])
+    def debug_queries():
+        """SQL issued by the most recent requests, newest first, with N+1 and slow-query flags"""
+        return query_history()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
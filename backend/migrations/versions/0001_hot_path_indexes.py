@@ -0,0 +1,71 @@
+"""Add composite indexes for hot foreign-key lookups
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The unique indexes below must not discard data, so refuse to build them over
+    # duplicates; checked first, since SQLite keeps indexes created before a failure
+    _require_unique('votes', ('deal_id', 'user_id'))
+    _require_unique('memo_versions', ('memo_id', 'version'))
+
+    # Boards a user belongs to (the primary key only covers board_id lookups)
+    op.create_index('ix_board_members_user_id', 'board_members', ['user_id'])
+
+    # Deals on a board, paged by (created_at, id)
+    op.create_index('ix_deals_board_id_created_at', 'deals', ['board_id', 'created_at', 'id'])
+
+    # Activity log and comments for a deal, newest first
+    op.create_index(
+        'ix_activities_deal_id_created_at',
+        'activities',
+        ['deal_id', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+    op.create_index(
+        'ix_comments_deal_id_created_at',
+        'comments',
+        ['deal_id', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+
+    # One vote per user per deal
+    op.create_index('ix_votes_deal_id_user_id', 'votes', ['deal_id', 'user_id'], unique=True)
+
+    # Memo version lookups by (memo_id, version)
+    op.create_index('ix_memo_versions_memo_id_version', 'memo_versions', ['memo_id', 'version'], unique=True)
+
+
+def _require_unique(table: str, columns: tuple) -> None:
+    """Fail the upgrade if any combination of columns appears on more than one row"""
+    key = ", ".join(columns)
+    duplicates = op.get_bind().execute(sa.text(
+        f"SELECT COUNT(*) FROM (SELECT {key} FROM {table} GROUP BY {key} HAVING COUNT(*) > 1) AS duplicates"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} ({key}) combinations appear more than once in {table}; "
+            f"remove the duplicate rows before upgrading"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_memo_versions_memo_id_version', table_name='memo_versions')
+    op.drop_index('ix_votes_deal_id_user_id', table_name='votes')
+    op.drop_index('ix_comments_deal_id_created_at', table_name='comments')
+    op.drop_index('ix_activities_deal_id_created_at', table_name='activities')
+    op.drop_index('ix_deals_board_id_created_at', table_name='deals')
+    op.drop_index('ix_board_members_user_id', table_name='board_members')
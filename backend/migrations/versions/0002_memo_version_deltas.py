@@ -0,0 +1,36 @@
+"""Store IC memo versions as periodic snapshots plus section deltas
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows are full copies, so they all become snapshots
+    op.add_column('memo_versions', sa.Column('is_snapshot', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.add_column('memo_versions', sa.Column('delta', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # Delta rows cannot be expanded in SQL, so refuse rather than lose their text
+    delta_rows = op.get_bind().execute(
+        sa.text("SELECT COUNT(*) FROM memo_versions WHERE NOT is_snapshot")
+    ).scalar()
+    if delta_rows:
+        raise RuntimeError(f"{delta_rows} memo versions are stored as deltas; expand them before downgrading")
+    
+    op.drop_column('memo_versions', 'delta')
+    op.drop_column('memo_versions', 'is_snapshot')
@@ -0,0 +1,88 @@
+"""Record author and changed sections on IC memo versions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.memo_store import MEMO_SECTIONS, apply_section_diff
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Batch mode so SQLite can add the foreign key by rebuilding the table
+    with op.batch_alter_table('memo_versions') as batch_op:
+        batch_op.add_column(sa.Column('author_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('changed_sections', sa.JSON(), nullable=True))
+        batch_op.create_foreign_key(
+            'memo_versions_author_id_fkey', 'users', ['author_id'], ['id'], ondelete='SET NULL'
+        )
+
+    # Authors come from the "memo_updated" activity logged for each version
+    op.execute(
+        "UPDATE memo_versions SET author_id = ("
+        "SELECT a.user_id FROM activities a JOIN ic_memos m ON m.deal_id = a.deal_id "
+        "WHERE m.id = memo_versions.memo_id AND a.action = 'memo_updated' "
+        "AND a.description LIKE '%(version ' || memo_versions.version || ')' "
+        "ORDER BY a.id DESC LIMIT 1)"
+    )
+
+    # Changed sections come from comparing each version with the one before it
+    memo_versions = sa.table(
+        'memo_versions',
+        sa.column('id', sa.Integer),
+        sa.column('memo_id', sa.Integer),
+        sa.column('version', sa.Integer),
+        sa.column('is_snapshot', sa.Boolean),
+        sa.column('delta', sa.JSON),
+        sa.column('changed_sections', sa.JSON),
+        *[sa.column(section, sa.Text) for section in MEMO_SECTIONS]
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(memo_versions).order_by(memo_versions.c.memo_id, memo_versions.c.version)
+    )
+
+    updates = []
+    memo_id = None
+    previous = None
+    for row in rows:
+        if row.memo_id != memo_id:
+            memo_id = row.memo_id
+            previous = {section: "" for section in MEMO_SECTIONS}
+        if row.is_snapshot:
+            sections = {section: getattr(row, section) or "" for section in MEMO_SECTIONS}
+        else:
+            sections = {
+                section: apply_section_diff(previous[section], row.delta[section])
+                if section in row.delta else previous[section]
+                for section in MEMO_SECTIONS
+            }
+        changed = [section for section in MEMO_SECTIONS if sections[section] != previous[section]]
+        updates.append({'row_id': row.id, 'changed': changed})
+        previous = sections
+
+    if updates:
+        conn.execute(
+            memo_versions.update()
+            .where(memo_versions.c.id == sa.bindparam('row_id'))
+            .values(changed_sections=sa.bindparam('changed')),
+            updates
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('memo_versions') as batch_op:
+        batch_op.drop_constraint('memo_versions_author_id_fkey', type_='foreignkey')
+        batch_op.drop_column('changed_sections')
+        batch_op.drop_column('author_id')
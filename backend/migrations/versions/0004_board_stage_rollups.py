@@ -0,0 +1,61 @@
+"""Add per-board, per-stage deal rollups for pipeline analytics
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STAGES = ('SOURCED', 'SCREEN', 'DILIGENCE', 'IC', 'INVESTED', 'PASSED')
+
+
+def upgrade() -> None:
+    rollups = op.create_table(
+        'board_stage_rollups',
+        sa.Column('board_id', sa.Integer(), sa.ForeignKey('boards.id', ondelete='CASCADE'), primary_key=True),
+        # Reuse the enum type created for deals.stage
+        sa.Column('stage', postgresql.ENUM(*STAGES, name='dealstage', create_type=False), primary_key=True),
+        sa.Column('deal_count', sa.Integer(), nullable=False),
+        sa.Column('check_size_total', sa.Numeric(18, 2), nullable=False),
+        sa.Column('check_size_count', sa.Integer(), nullable=False),
+    )
+
+    # One row per board and stage, zero where a stage has no deals yet
+    bind = op.get_bind()
+    totals = {
+        (board_id, stage): (deal_count, check_size_total, check_size_count)
+        for board_id, stage, deal_count, check_size_total, check_size_count in bind.execute(sa.text(
+            "SELECT board_id, stage, COUNT(*), COALESCE(SUM(check_size), 0), COUNT(check_size) "
+            "FROM deals GROUP BY board_id, stage"
+        ))
+    }
+    board_ids = [row[0] for row in bind.execute(sa.text("SELECT id FROM boards"))]
+    rows = []
+    for board_id in board_ids:
+        for stage in STAGES:
+            deal_count, check_size_total, check_size_count = totals.get((board_id, stage), (0, 0, 0))
+            rows.append({
+                'board_id': board_id,
+                'stage': stage,
+                'deal_count': deal_count,
+                'check_size_total': check_size_total,
+                'check_size_count': check_size_count,
+            })
+    if rows:
+        op.bulk_insert(rollups, rows)
+
+
+def downgrade() -> None:
+    op.drop_table('board_stage_rollups')
@@ -0,0 +1,118 @@
+"""Add deal_stage_transitions and backfill it from deals and stage_change activities
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from app.timeline import parse_stage_change
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STAGES = ('SOURCED', 'SCREEN', 'DILIGENCE', 'IC', 'INVESTED', 'PASSED')
+
+# Deals processed per backfill batch
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    # Reuse the enum type created for deals.stage
+    stage_type = postgresql.ENUM(*STAGES, name='dealstage', create_type=False)
+    transitions = op.create_table(
+        'deal_stage_transitions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('deal_id', sa.Integer(), sa.ForeignKey('deals.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('board_id', sa.Integer(), sa.ForeignKey('boards.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('from_stage', stage_type, nullable=True),
+        sa.Column('to_stage', stage_type, nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index('ix_deal_stage_transitions_deal_id_created_at', 'deal_stage_transitions', ['deal_id', 'created_at'])
+    op.create_index('ix_deal_stage_transitions_board_id_created_at', 'deal_stage_transitions', ['board_id', 'created_at', 'id'])
+    op.create_index(
+        'ix_deal_stage_transitions_board_id_to_stage_created_at',
+        'deal_stage_transitions',
+        ['board_id', 'to_stage', 'created_at']
+    )
+
+    deals = sa.table(
+        'deals',
+        sa.column('id', sa.Integer),
+        sa.column('board_id', sa.Integer),
+        sa.column('owner_id', sa.Integer),
+        sa.column('stage', sa.String),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+    activities = sa.table(
+        'activities',
+        sa.column('id', sa.Integer),
+        sa.column('deal_id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('action', sa.String),
+        sa.column('description', sa.Text),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+
+    # Walk deals in id order, a batch at a time, replaying each deal's stage_change activities
+    conn = op.get_bind()
+    last_id = None
+    while True:
+        query = sa.select(deals).order_by(deals.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(deals.c.id > last_id)
+        deal_rows = conn.execute(query).all()
+        if not deal_rows:
+            break
+        last_id = deal_rows[-1].id
+
+        changes = {}
+        for row in conn.execute(
+            sa.select(activities.c.deal_id, activities.c.user_id, activities.c.description, activities.c.created_at)
+            .where(activities.c.deal_id.in_([deal.id for deal in deal_rows]), activities.c.action == 'stage_change')
+            .order_by(activities.c.deal_id, activities.c.created_at, activities.c.id)
+        ):
+            parsed = parse_stage_change(row.description)
+            if parsed:
+                changes.setdefault(row.deal_id, []).append((parsed, row.user_id, row.created_at))
+
+        rows = []
+        for deal in deal_rows:
+            deal_changes = changes.get(deal.id, [])
+            # The stage a deal was created in is the first change's source, or its current stage
+            initial_stage = deal_changes[0][0][0].name if deal_changes else deal.stage
+            rows.append({
+                'deal_id': deal.id,
+                'board_id': deal.board_id,
+                'from_stage': None,
+                'to_stage': initial_stage,
+                'user_id': deal.owner_id,
+                'created_at': deal.created_at,
+            })
+            for (from_stage, to_stage), user_id, created_at in deal_changes:
+                rows.append({
+                    'deal_id': deal.id,
+                    'board_id': deal.board_id,
+                    'from_stage': from_stage.name,
+                    'to_stage': to_stage.name,
+                    'user_id': user_id,
+                    'created_at': created_at,
+                })
+        op.bulk_insert(transitions, rows)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deal_stage_transitions_board_id_to_stage_created_at', table_name='deal_stage_transitions')
+    op.drop_index('ix_deal_stage_transitions_board_id_created_at', table_name='deal_stage_transitions')
+    op.drop_index('ix_deal_stage_transitions_deal_id_created_at', table_name='deal_stage_transitions')
+    op.drop_table('deal_stage_transitions')
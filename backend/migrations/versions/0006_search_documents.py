@@ -0,0 +1,127 @@
+"""Add search_documents and backfill it from deals, comments and current IC memos
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.memo_store import MEMO_SECTIONS, materialize_versions
+from app.search import memo_search_body
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Memos processed per backfill batch
+BATCH_SIZE = 500
+
+SEARCH_VECTOR = (
+    "to_tsvector('english'::regconfig, coalesce(title, '') || ' ' || coalesce(body, ''))"
+)
+
+
+def upgrade() -> None:
+    documents = op.create_table(
+        'search_documents',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('source_id', sa.Integer(), nullable=False),
+        sa.Column('deal_id', sa.Integer(), sa.ForeignKey('deals.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('board_id', sa.Integer(), sa.ForeignKey('boards.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint('kind', 'source_id', name='uq_search_documents_kind_source_id'),
+    )
+    op.create_index('ix_search_documents_board_id', 'search_documents', ['board_id'])
+
+    # Deals and comments copy straight across
+    op.execute(
+        "INSERT INTO search_documents (kind, source_id, deal_id, board_id, title, body) "
+        "SELECT 'deal', id, id, board_id, name, company_url FROM deals"
+    )
+    op.execute(
+        "INSERT INTO search_documents (kind, source_id, deal_id, board_id, title, body) "
+        "SELECT 'comment', comments.id, comments.deal_id, deals.board_id, NULL, comments.content "
+        "FROM comments JOIN deals ON deals.id = comments.deal_id"
+    )
+
+    # Memos are replayed from their latest snapshot to the current version
+    memos = sa.table(
+        'ic_memos',
+        sa.column('id', sa.Integer),
+        sa.column('deal_id', sa.Integer),
+        sa.column('current_version', sa.Integer),
+    )
+    deals = sa.table('deals', sa.column('id', sa.Integer), sa.column('board_id', sa.Integer))
+    versions = sa.table(
+        'memo_versions',
+        sa.column('id', sa.Integer),
+        sa.column('memo_id', sa.Integer),
+        sa.column('version', sa.Integer),
+        sa.column('is_snapshot', sa.Boolean),
+        sa.column('delta', sa.JSON),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+        *(sa.column(section, sa.Text) for section in MEMO_SECTIONS),
+    )
+
+    conn = op.get_bind()
+    last_id = None
+    while True:
+        query = sa.select(memos.c.id, memos.c.deal_id, memos.c.current_version, deals.c.board_id).join(
+            deals, deals.c.id == memos.c.deal_id
+        ).order_by(memos.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(memos.c.id > last_id)
+        memo_rows = conn.execute(query).all()
+        if not memo_rows:
+            break
+        last_id = memo_rows[-1].id
+
+        current = {memo.id: memo.current_version for memo in memo_rows}
+        bodies = {}
+        rows = conn.execute(
+            sa.select(versions).where(versions.c.memo_id.in_(list(current))).order_by(versions.c.memo_id, versions.c.version)
+        )
+        for memo_id, memo_versions in groupby(rows, key=lambda row: row.memo_id):
+            memo_versions = [row for row in memo_versions if row.version <= current[memo_id]]
+            snapshots = [index for index, row in enumerate(memo_versions) if row.is_snapshot]
+            if not snapshots or memo_versions[-1].version != current[memo_id]:
+                continue
+            bodies[memo_id] = memo_search_body(materialize_versions(memo_versions[snapshots[-1]:])[-1])
+
+        op.bulk_insert(documents, [
+            {
+                'kind': 'memo',
+                'source_id': memo.id,
+                'deal_id': memo.deal_id,
+                'board_id': memo.board_id,
+                'title': None,
+                'body': bodies[memo.id],
+            }
+            for memo in memo_rows if bodies.get(memo.id)
+        ])
+
+    # Postgres serves search from a GIN index over the same expression app.models.search_vector builds
+    if conn.dialect.name == 'postgresql':
+        op.create_index(
+            'ix_search_documents_search_vector',
+            'search_documents',
+            [sa.text(SEARCH_VECTOR)],
+            postgresql_using='gin'
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_search_documents_search_vector', table_name='search_documents')
+    op.drop_index('ix_search_documents_board_id', table_name='search_documents')
+    op.drop_table('search_documents')
@@ -0,0 +1,56 @@
+"""Widen board and deal ids to BIGINT for time-ordered ids and add id_workers
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> columns holding a board or deal id. Existing 8-digit ids are kept as they
+# are; new snowflake ids start above 10^14, so the two ranges never overlap.
+ID_COLUMNS = {
+    'boards': ['id'],
+    'deals': ['id', 'board_id'],
+    'board_members': ['board_id'],
+    'board_stage_rollups': ['board_id'],
+    'deal_stage_transitions': ['deal_id', 'board_id'],
+    'activities': ['deal_id'],
+    'ic_memos': ['deal_id'],
+    'comments': ['deal_id'],
+    'votes': ['deal_id'],
+    'search_documents': ['source_id', 'deal_id', 'board_id'],
+}
+
+
+def _alter_id_columns(type_) -> None:
+    # Batch mode rebuilds the table on SQLite, which cannot alter column types
+    for table, columns in ID_COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(column, type_=type_)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'id_workers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('registered_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    _alter_id_columns(sa.BigInteger())
+
+
+def downgrade() -> None:
+    # Fails if any snowflake ids have been issued, as they do not fit in INTEGER
+    _alter_id_columns(sa.Integer())
+    op.drop_table('id_workers')
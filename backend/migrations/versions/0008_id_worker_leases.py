@@ -0,0 +1,39 @@
+"""Turn id_workers into expiring worker id leases
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Registrations from the old scheme are not leases, so the table starts empty
+    op.drop_table('id_workers')
+    op.create_table(
+        'id_workers',
+        sa.Column('id', sa.Integer(), autoincrement=False, primary_key=True),
+        sa.Column('lease_token', sa.String(length=32), nullable=False),
+        sa.Column('registered_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('id_workers')
+    op.create_table(
+        'id_workers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('registered_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
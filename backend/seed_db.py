@@ -0,0 +1,433 @@
+"""
+Create the schema and seed demo users, boards, deals and their history.
+
+With no options this gives a fresh install the three demo accounts and a small
+demo board. The size options generate realistic volumes for load testing:
+
+    python seed_db.py --boards 10 --deals 1000 --comments 5 --votes 2 --memo-versions 3
+
+seeds 10 boards x 1000 deals, each with 5 comments, 2 votes and a 3-version IC
+memo, plus the stage transitions and activities that history implies. Rows are
+bulk inserted per board in multi-row INSERTs. The same --seed always produces the
+same names, text and shapes of history (ids and timestamps differ run to run).
+
+A database without the users table is created from the models and stamped with
+the current Alembic revision; --reset drops every table first. Runs against
+DATABASE_URL, Postgres or SQLite.
+"""
+import argparse
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.orm import Session
+from app.auth import get_password_hash
+from app.analytics import recompute_rollups
+from app.constants import DEAL_COLORS, DEFAULT_BOARD_NAME
+from app.database import Base, SessionLocal, engine
+from app.ids import generate_id
+from app.memo_store import EMPTY_SECTIONS, MEMO_SECTIONS, build_memo_version
+from app.models import (
+    Activity,
+    Board,
+    Comment,
+    Deal,
+    DealStage,
+    DealStatus,
+    ICMemo,
+    User,
+    UserRole,
+    Vote,
+    board_members
+)
+from app.search import index_new_documents, memo_search_body
+from app.timeline import record_transitions
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEMO_USERS = (
+    ("admin@investment.com", "admin123", "Admin User", UserRole.ADMIN),
+    ("analyst@investment.com", "analyst123", "Analyst User", UserRole.ANALYST),
+    ("partner@investment.com", "partner123", "Partner User", UserRole.PARTNER),
+)
+
+# Generated users share one password so only one bcrypt hash is computed
+SEED_USER_PASSWORD = "password123"
+SEED_USER_ROLES = (UserRole.ANALYST, UserRole.PARTNER, UserRole.ADMIN)
+
+SEED_BATCH_SIZE = 500  # Deals per round of multi-row INSERTs
+SEED_HISTORY_DAYS = 180  # Deals are created across this many days before now
+
+PIPELINE = (DealStage.SOURCED, DealStage.SCREEN, DealStage.DILIGENCE, DealStage.IC, DealStage.INVESTED)
+STAGE_WEIGHTS = {
+    DealStage.SOURCED: 30,
+    DealStage.SCREEN: 25,
+    DealStage.DILIGENCE: 15,
+    DealStage.IC: 10,
+    DealStage.INVESTED: 8,
+    DealStage.PASSED: 12,
+}
+ROUNDS = ("Pre-seed", "Seed", "Series A", "Series B", "Series C", None)
+
+_NAME_PARTS = (
+    ("Acme", "Blue", "Bright", "Cedar", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Iris",
+     "Juniper", "Kite", "Lumen", "Maple", "Nova", "Orbit", "Pine", "Quartz", "River", "Summit"),
+    ("Robotics", "Health", "Labs", "Analytics", "Energy", "Logistics", "Bio", "Security", "Finance",
+     "Foods", "Mobility", "Cloud", "Materials", "Learning", "Networks", "Systems", "Data", "Works"),
+)
+_SENTENCES = (
+    "Strong founding team with prior exits in the space.",
+    "Revenue grew {n}% quarter over quarter.",
+    "Customer concentration is a concern: the top account is {n}% of ARR.",
+    "Net revenue retention is around {n}%.",
+    "The market is crowded but the wedge into mid-market looks defensible.",
+    "Burn multiple is {n}x; runway is roughly {n} months.",
+    "Need reference calls with at least three customers before IC.",
+    "Pricing power is unproven outside the pilot cohort.",
+    "Regulatory exposure looks manageable with the current compliance plan.",
+    "Gross margin of {n}% should improve with scale.",
+    "Competitive pressure from incumbents bundling a similar feature.",
+    "Hiring plan is aggressive relative to the raise.",
+)
+
+
+def seed_user_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+
+def seed_user_role(index: int) -> UserRole:
+    return SEED_USER_ROLES[index % len(SEED_USER_ROLES)]
+
+
+def _sentence(rng: random.Random) -> str:
+    return rng.choice(_SENTENCES).format(n=rng.randint(2, 95))
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return "\n".join(_sentence(rng) for _ in range(sentences))
+
+
+def create_schema(reset: bool) -> None:
+    """Create the tables if needed, stamping a new database as fully migrated"""
+    if reset:
+        Base.metadata.drop_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+    fresh = not inspect(engine).has_table(User.__tablename__)
+    Base.metadata.create_all(engine)
+    if fresh:
+        # Every index on the models already exists, so there is nothing to migrate. Stamp
+        # without running migrations/env.py, which would reconfigure logging.
+        config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+        scripts = ScriptDirectory.from_config(config)
+        with engine.begin() as conn:
+            MigrationContext.configure(conn).stamp(scripts, "head")
+
+
+def seed_users(db: Session, extra_users: int) -> list[tuple[int, str, UserRole]]:
+    """Demo users plus extra_users generated ones, as (id, full name, role); existing emails are kept"""
+    wanted = [(email, password, full_name, role) for email, password, full_name, role in DEMO_USERS]
+    wanted += [
+        (seed_user_email(index), SEED_USER_PASSWORD, f"Seed User {index}", seed_user_role(index))
+        for index in range(extra_users)
+    ]
+    existing = dict(db.execute(select(User.email, User.id).where(User.email.in_([row[0] for row in wanted]))).all())
+
+    hashes = {}
+    missing = []
+    for email, password, full_name, role in wanted:
+        if email in existing:
+            continue
+        if password not in hashes:
+            hashes[password] = asyncio.run(get_password_hash(password))
+        missing.append({'email': email, 'hashed_password': hashes[password], 'full_name': full_name, 'role': role})
+    for start in range(0, len(missing), SEED_BATCH_SIZE):
+        rows = db.execute(
+            insert(User).returning(User.email, User.id, sort_by_parameter_order=True),
+            missing[start:start + SEED_BATCH_SIZE]
+        )
+        existing.update(rows.all())
+    db.commit()
+
+    return [(existing[email], full_name, role) for email, _, full_name, role in wanted]
+
+
+def _stage_path(rng: random.Random, stage: DealStage) -> list[DealStage]:
+    """The stages a deal passed through to reach its current one"""
+    if stage == DealStage.PASSED:
+        return list(PIPELINE[:rng.randint(1, 4)]) + [DealStage.PASSED]
+    return list(PIPELINE[:PIPELINE.index(stage) + 1])
+
+
+def _seed_deals(
+    db: Session,
+    rng: random.Random,
+    board_id: int,
+    members: list[tuple[int, str, UserRole]],
+    count: int,
+    comments: int,
+    votes: int,
+    memo_versions: int,
+    now: datetime
+) -> None:
+    owners = [member for member in members if member[2] in (UserRole.ADMIN, UserRole.ANALYST)]
+    voters = [member for member in members if member[2] in (UserRole.ADMIN, UserRole.PARTNER)]
+    stages = list(STAGE_WEIGHTS)
+    weights = list(STAGE_WEIGHTS.values())
+
+    deals, activities, transitions, documents = [], [], [], []
+    comment_rows, vote_rows = [], []
+    memos = []  # (deal_id, versions as [(author, sections, created_at)])
+    for _ in range(count):
+        deal_id = generate_id()
+        owner_id, owner_name, _ = rng.choice(owners)
+        stage = rng.choices(stages, weights)[0]
+        name = f"{rng.choice(_NAME_PARTS[0])} {rng.choice(_NAME_PARTS[1])} {rng.randint(1, 9999)}"
+        created_at = now - timedelta(days=rng.uniform(1, SEED_HISTORY_DAYS))
+        check_size = Decimal(rng.randrange(250, 20000) * 1000) if rng.random() < 0.7 else None
+        status = {DealStage.INVESTED: DealStatus.APPROVED, DealStage.PASSED: DealStatus.DECLINED}.get(stage, DealStatus.ACTIVE)
+
+        # Stage history, each step some days after the last and before now
+        changed_at = created_at
+        previous = None
+        for step in _stage_path(rng, stage):
+            if previous is not None:
+                changed_at += (now - changed_at) * rng.uniform(0.05, 0.5)
+                activities.append({
+                    'deal_id': deal_id,
+                    'user_id': owner_id,
+                    'action': "stage_change",
+                    'description': f"{owner_name} moved '{name}' from {previous.value} to {step.value}",
+                    'created_at': changed_at
+                })
+            transitions.append({
+                'deal_id': deal_id,
+                'board_id': board_id,
+                'from_stage': previous,
+                'to_stage': step,
+                'user_id': owner_id,
+                'created_at': changed_at
+            })
+            previous = step
+
+        deals.append({
+            'id': deal_id,
+            'name': name,
+            'company_url': f"https://{name.lower().replace(' ', '')}.example.com",
+            'owner_id': owner_id,
+            'board_id': board_id,
+            'stage': stage,
+            'round': rng.choice(ROUNDS),
+            'check_size': check_size,
+            'status': status,
+            'color': DEAL_COLORS[stage.value],
+            'created_at': created_at,
+            'updated_at': changed_at
+        })
+        activities.append({
+            'deal_id': deal_id,
+            'user_id': owner_id,
+            'action': "created",
+            'description': f"{owner_name} created deal '{name}'",
+            'created_at': created_at
+        })
+        documents.append({
+            'kind': "deal",
+            'source_id': deal_id,
+            'deal_id': deal_id,
+            'board_id': board_id,
+            'title': name,
+            'body': deals[-1]['company_url']
+        })
+
+        for _ in range(comments):
+            author_id, author_name, _ = rng.choice(members)
+            commented_at = created_at + (now - created_at) * rng.random()
+            comment_rows.append({
+                'deal_id': deal_id,
+                'user_id': author_id,
+                'content': _paragraph(rng, rng.randint(1, 3)),
+                'created_at': commented_at,
+                'updated_at': commented_at
+            })
+            activities.append({
+                'deal_id': deal_id,
+                'user_id': author_id,
+                'action': "commented",
+                'description': f"{author_name} commented on '{name}'",
+                'created_at': commented_at
+            })
+
+        for voter_id, voter_name, _ in rng.sample(voters, min(votes, len(voters))):
+            choice = rng.choice(("approve", "decline"))
+            voted_at = created_at + (now - created_at) * rng.random()
+            vote_rows.append({
+                'deal_id': deal_id,
+                'user_id': voter_id,
+                'vote': choice,
+                'comment': _sentence(rng) if rng.random() < 0.5 else None,
+                'created_at': voted_at
+            })
+            activities.append({
+                'deal_id': deal_id,
+                'user_id': voter_id,
+                'action': "voted",
+                'description': f"{voter_name} voted to {choice} '{name}'",
+                'created_at': voted_at
+            })
+
+        if memo_versions:
+            sections = dict(EMPTY_SECTIONS)
+            versions = []
+            edited_at = created_at
+            for number in range(1, memo_versions + 1):
+                author_id, author_name, _ = rng.choice(owners)
+                edited_at += (now - edited_at) * rng.uniform(0.05, 0.3)
+                # Each edit appends to one or two sections, as analysts fill the memo in
+                for section in rng.sample(MEMO_SECTIONS, rng.randint(1, 2)):
+                    sections[section] = "\n".join(filter(None, (sections[section], _sentence(rng))))
+                versions.append((author_id, dict(sections), edited_at))
+                activities.append({
+                    'deal_id': deal_id,
+                    'user_id': author_id,
+                    'action': "memo_updated",
+                    'description': f"{author_name} updated IC memo (version {number})",
+                    'created_at': edited_at
+                })
+            memos.append((deal_id, versions))
+
+    db.execute(insert(Deal), deals)
+    db.execute(insert(Activity), activities)
+    record_transitions(db, transitions)
+
+    if comment_rows:
+        comment_ids = db.scalars(insert(Comment).returning(Comment.id, sort_by_parameter_order=True), comment_rows).all()
+        documents += [
+            {
+                'kind': "comment",
+                'source_id': comment_id,
+                'deal_id': row['deal_id'],
+                'board_id': board_id,
+                'title': None,
+                'body': row['content']
+            }
+            for comment_id, row in zip(comment_ids, comment_rows)
+        ]
+    if vote_rows:
+        db.execute(insert(Vote), vote_rows)
+
+    if memos:
+        memo_ids = db.scalars(insert(ICMemo).returning(ICMemo.id, sort_by_parameter_order=True), [
+            {'deal_id': deal_id, 'current_version': len(versions), 'created_at': versions[0][2], 'updated_at': versions[-1][2]}
+            for deal_id, versions in memos
+        ]).all()
+        for memo_id, (deal_id, versions) in zip(memo_ids, memos):
+            previous = None
+            for number, (author_id, sections, edited_at) in enumerate(versions, start=1):
+                version = build_memo_version(memo_id, number, previous, sections, author_id=author_id)
+                version.created_at = edited_at
+                db.add(version)
+                previous = sections
+            documents.append({
+                'kind': "memo",
+                'source_id': memo_id,
+                'deal_id': deal_id,
+                'board_id': board_id,
+                'title': None,
+                'body': memo_search_body(versions[-1][1])
+            })
+        db.flush()
+
+    index_new_documents(db, documents)
+
+
+def seed_board(
+    db: Session,
+    rng: random.Random,
+    name: str,
+    members: list[tuple[int, str, UserRole]],
+    deals: int,
+    comments: int,
+    votes: int,
+    memo_versions: int,
+    is_default: bool = False
+) -> int:
+    """Create a board with every given user as a member and populate it; returns the board id"""
+    board_id = generate_id()
+    now = datetime.now(timezone.utc)
+    creator = next(member for member in members if member[2] == UserRole.ADMIN)
+    db.execute(insert(Board).values(
+        id=board_id,
+        name=name,
+        description=f"Seeded board with {deals} deals",
+        created_by=creator[0],
+        is_default=is_default
+    ))
+    db.execute(board_members.insert(), [
+        {'board_id': board_id, 'user_id': user_id, 'role': role}
+        for user_id, _, role in members
+    ])
+
+    for start in range(0, deals, SEED_BATCH_SIZE):
+        _seed_deals(db, rng, board_id, members, min(SEED_BATCH_SIZE, deals - start), comments, votes, memo_versions, now)
+    recompute_rollups(db, board_id)
+    db.commit()
+    return board_id
+
+
+def seed(
+    boards: int = 1,
+    deals: int = 12,
+    comments: int = 2,
+    votes: int = 1,
+    memo_versions: int = 2,
+    users: int = 0,
+    seed_value: int = 0,
+    reset: bool = False
+) -> list[int]:
+    """Create the schema and seed it; returns the new board ids"""
+    create_schema(reset)
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        members = seed_users(db, users)
+        return [
+            seed_board(
+                db, rng, DEFAULT_BOARD_NAME if index == 0 else f"Board {index + 1}", members,
+                deals, comments, votes, memo_versions, is_default=index == 0
+            )
+            for index in range(boards)
+        ]
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boards", type=int, default=1)
+    parser.add_argument("--deals", type=int, default=12, help="Deals per board")
+    parser.add_argument("--comments", type=int, default=2, help="Comments per deal")
+    parser.add_argument("--votes", type=int, default=1, help="Votes per deal, up to the number of admins and partners")
+    parser.add_argument("--memo-versions", type=int, default=2, help="IC memo versions per deal (0 for no memo)")
+    parser.add_argument("--users", type=int, default=0, help=f"Generated users (password {SEED_USER_PASSWORD}) added to every board")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for generated content")
+    parser.add_argument("--reset", action="store_true", help="Drop every table first")
+    args = parser.parse_args()
+
+    board_ids = seed(
+        args.boards, args.deals, args.comments, args.votes, args.memo_versions, args.users, args.seed, args.reset
+    )
+    print(f"Seeded {len(board_ids)} boards x {args.deals} deals")
+    for email, password, _, role in DEMO_USERS:
+        print(f"  {role.value:<8} {email} / {password}")
+
+
+if __name__ == "__main__":
+    main()
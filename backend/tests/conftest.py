@@ -0,0 +1,110 @@
+"""
+Shared fixtures. Tests run against a throwaway SQLite database created from the
+models; each test makes its own users and boards, so they never share rows.
+"""
+import itertools
+import os
+import tempfile
+
+# Settings are read once, on first import of the app, so configure them before that
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest_plugins = ["app.pytest_plugin", "pytester"]
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.database import Base, engine
+    import app.models  # noqa: F401 - registers every table on Base.metadata
+    from main import app
+
+    Base.metadata.create_all(engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(client):
+    """Sign up a new user; returns their id and auth headers"""
+    def make(full_name: str = "Test User") -> dict:
+        response = client.post("/auth/signup", json={
+            'email': f"user{next(_emails)}@test.example.com",
+            'password': "secret123",
+            'full_name': full_name
+        })
+        assert response.status_code == 201, response.text
+        body = response.json()
+        return {'id': body['user']['id'], 'headers': {'Authorization': f"Bearer {body['access_token']}"}}
+    return make
+
+
+@pytest.fixture
+def make_board(client):
+    """Create a board owned (as board admin) by owner, adding members as {user: role}"""
+    def make(owner: dict, members: dict = None, name: str = "Test Board") -> int:
+        response = client.post("/boards/", json={'name': name}, headers=owner['headers'])
+        assert response.status_code == 200, response.text
+        board_id = response.json()['id']
+        for member, role in (members or {}).items():
+            response = client.post(
+                f"/boards/{board_id}/members/{member}", params={'role': role}, headers=owner['headers']
+            )
+            assert response.status_code == 200, response.text
+        return board_id
+    return make
+
+
+@pytest.fixture
+def make_deals(client):
+    """Create deals on a board through the API; returns their ids in creation order"""
+    def make(owner: dict, board_id: int, count: int, **fields) -> list[int]:
+        deal_ids = []
+        for index in range(count):
+            response = client.post(
+                "/deals", json={'name': f"Deal {index}", 'board_id': board_id, **fields}, headers=owner['headers']
+            )
+            assert response.status_code == 201, response.text
+            deal_ids.append(response.json()['id'])
+        return deal_ids
+    return make
+
+
+@pytest.fixture
+def populate_board(client, make_user, make_board):
+    """
+    A board with `size` members who each own a deal, and comment on, vote on and write a
+    memo for both it and the board's first deal, so every row has a distinct user to load
+    """
+    def build(size: int) -> dict:
+        owner = make_user("Owner")
+        members = [make_user(f"Member {index}") for index in range(size)]
+        board_id = make_board(owner, {member['id']: "ADMIN" for member in members})
+        deal_ids = [
+            client.post("/deals", json={'name': f"Deal {index}", 'board_id': board_id}, headers=member['headers']).json()['id']
+            for index, member in enumerate(members)
+        ]
+        for index, member in enumerate(members):
+            for deal_id in dict.fromkeys((deal_ids[0], deal_ids[index])):
+                client.post(f"/deals/{deal_id}/comments", json={'content': f"Comment {index}"}, headers=member['headers'])
+                client.post(f"/deals/{deal_id}/votes", json={'vote': "approve"}, headers=member['headers'])
+                client.put(f"/memos/deal/{deal_id}", json={'summary': f"Version {index}"}, headers=member['headers'])
+        return {'owner': owner, 'board_id': board_id, 'deal_id': deal_ids[0]}
+    return build
+
+
+@pytest.fixture
+def count_queries(client, query_counter):
+    """GET a path formatted from a populated board as its owner; returns the SQL statements issued"""
+    def count(board: dict, path: str, **headers) -> int:
+        before = query_counter.count
+        response = client.get(path.format(**board), headers={**board['owner']['headers'], **headers})
+        assert response.status_code in (200, 304), response.text
+        return query_counter.count - before
+    return count
@@ -0,0 +1,36 @@
+"""Board analytics stay current as deals move"""
+from sqlalchemy import delete
+from app.models import BoardStageRollup
+
+
+def _stages(client, owner: dict, board_id: int) -> dict:
+    response = client.get(f"/boards/{board_id}/analytics", headers=owner['headers'])
+    assert response.status_code == 200, response.text
+    return {stage['stage']: stage for stage in response.json()['stages']}
+
+
+def test_stage_change_refreshes_cached_durations(client, make_user, make_board, make_deals):
+    owner = make_user("Owner")
+    board_id = make_board(owner)
+    deal_id, other_id = make_deals(owner, board_id, 2)
+    assert _stages(client, owner, board_id)['Sourced']['median_days_in_stage'] is None
+
+    client.put(f"/deals/{deal_id}", json={'stage': "Screen"}, headers=owner['headers'])
+    assert _stages(client, owner, board_id)['Sourced']['median_days_in_stage'] is not None
+
+    client.patch(f"/boards/{board_id}/deals:move", json={'moves': [{'deal_id': deal_id, 'stage': "IC"}]}, headers=owner['headers'])
+    assert _stages(client, owner, board_id)['Screen']['median_days_in_stage'] is not None
+
+
+def test_missing_rollups_are_rebuilt_on_the_next_change(client, make_user, make_board, make_deals):
+    from app.database import engine
+    owner = make_user("Owner")
+    board_id = make_board(owner)
+    deal_id, _ = make_deals(owner, board_id, 2)
+    with engine.begin() as conn:
+        conn.execute(delete(BoardStageRollup).where(BoardStageRollup.board_id == board_id))
+
+    response = client.put(f"/deals/{deal_id}", json={'stage': "Screen"}, headers=owner['headers'])
+    assert response.status_code == 200, response.text
+    stages = _stages(client, owner, board_id)
+    assert (stages['Sourced']['deal_count'], stages['Screen']['deal_count']) == (1, 1)
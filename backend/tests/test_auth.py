@@ -0,0 +1,48 @@
+"""Principals embedded in access tokens stop being trusted after their max age"""
+import pytest
+from sqlalchemy import delete, update
+from app import auth
+from app.models import User, UserRole
+
+
+@pytest.fixture
+def embedded_token(client, make_user, monkeypatch):
+    """An access token carrying the user's profile, and a way to change the user behind this process's back"""
+    from app.database import SessionLocal, engine
+    monkeypatch.setattr(auth.settings, "JWT_EMBED_PRINCIPAL", True)
+    user_id = make_user()['id']
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        user.role = UserRole.ADMIN
+        db.commit()
+        token = auth.create_access_token({"sub": str(user_id), **auth.principal_claims(user)})
+
+    def change(statement) -> None:
+        # As another worker would: the database changes, this process's caches do not
+        with engine.begin() as conn:
+            conn.execute(statement.where(User.id == user_id))
+        auth._principal_cache.clear()
+
+    return {'headers': {'Authorization': f"Bearer {token}"}, 'change': change}
+
+
+def test_fresh_embedded_principal_skips_the_lookup(client, embedded_token, query_counter):
+    before = query_counter.count
+    assert client.get("/auth/me", headers=embedded_token['headers']).status_code == 200
+    assert query_counter.count == before
+
+
+def test_demotion_applies_after_max_age(client, embedded_token, monkeypatch):
+    embedded_token['change'](update(User).values(role=UserRole.ANALYST))
+    # Still within the window, so the embedded ADMIN role stands
+    assert client.get("/auth/users", headers=embedded_token['headers']).status_code == 200
+
+    monkeypatch.setattr(auth.settings, "JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS", 0)
+    auth._principal_cache.clear()
+    assert client.get("/auth/users", headers=embedded_token['headers']).status_code == 403
+
+
+def test_deleted_user_rejected_after_max_age(client, embedded_token, monkeypatch):
+    monkeypatch.setattr(auth.settings, "JWT_EMBED_PRINCIPAL_MAX_AGE_SECONDS", 0)
+    embedded_token['change'](delete(User))
+    assert client.get("/auth/me", headers=embedded_token['headers']).status_code == 401
@@ -0,0 +1,39 @@
+"""The change feed only opens with a stream token issued for that board"""
+import pytest
+from fastapi import HTTPException
+from app.auth import create_stream_token, verify_stream_token
+
+
+def test_stream_token_requires_board_access(client, make_user, make_board):
+    owner, outsider = make_user("Owner"), make_user("Outsider")
+    board_id = make_board(owner)
+
+    response = client.post(f"/boards/{board_id}/events/token", headers=owner['headers'])
+    assert response.status_code == 200, response.text
+    verify_stream_token(response.json()['token'], board_id)
+
+    assert client.post(f"/boards/{board_id}/events/token", headers=outsider['headers']).status_code == 403
+
+
+def test_stream_rejects_other_tokens(client, make_user, make_board):
+    owner = make_user("Owner")
+    board_id, other_board_id = make_board(owner), make_board(owner)
+    access_token = owner['headers']['Authorization'].split()[1]
+    other_board_token = create_stream_token(owner['id'], other_board_id)
+
+    for token in (access_token, other_board_token, "garbage"):
+        assert client.get(f"/boards/{board_id}/events", params={'token': token}).status_code == 401
+    assert client.get(f"/boards/{board_id}/events").status_code == 422
+
+
+def test_stream_token_is_not_an_access_token(client, make_user, make_board):
+    owner = make_user("Owner")
+    token = create_stream_token(owner['id'], make_board(owner))
+    assert client.get("/auth/me", headers={'Authorization': f"Bearer {token}"}).status_code == 401
+
+
+def test_stream_token_expires(monkeypatch):
+    from app import auth
+    monkeypatch.setattr(auth.settings, "EVENT_STREAM_TOKEN_SECONDS", -1)
+    with pytest.raises(HTTPException):
+        verify_stream_token(create_stream_token(1, 1), 1)
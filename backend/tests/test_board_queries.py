@@ -0,0 +1,24 @@
+"""Board snapshot serialization and revalidation; query counts per endpoint are in test_query_counts"""
+
+
+def test_snapshot_revalidation_skips_serialization(client, populate_board, count_queries):
+    board = populate_board(5)
+    path = "/boards/{board_id}/snapshot"
+    count_queries(board, path)
+    full = count_queries(board, path)
+    etag = client.get(path.format(**board), headers=board['owner']['headers']).headers['ETag']
+
+    revalidated = count_queries(board, path, **{'If-None-Match': etag})
+    assert revalidated < full
+
+
+def test_snapshot_counts_every_deal(client, populate_board):
+    board = populate_board(15)
+    response = client.get(f"/boards/{board['board_id']}/snapshot", headers=board['owner']['headers'])
+    assert response.status_code == 200, response.text
+    deals = [deal for stage in response.json()['deals_by_stage'].values() for deal in stage]
+    assert len(deals) == 15
+    assert all(deal['comment_count'] >= 1 and deal['memo_version'] for deal in deals)
+    first = next(deal for deal in deals if deal['id'] == board['deal_id'])
+    assert first['comment_count'] == 15
+    assert first['vote_tally']['approve'] == 15
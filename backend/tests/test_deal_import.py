@@ -0,0 +1,50 @@
+"""Bulk deal import reports bad rows instead of failing the request"""
+import pytest
+
+
+@pytest.fixture
+def board(make_user, make_board):
+    owner = make_user("Owner")
+    return {'headers': owner['headers'], 'board_id': make_board(owner)}
+
+
+def _import(client, board: dict, body: bytes, content_type: str):
+    return client.post(
+        f"/boards/{board['board_id']}/deals:bulk",
+        content=body,
+        headers={**board['headers'], 'Content-Type': content_type}
+    )
+
+
+def test_imports_valid_rows(client, board):
+    body = "name,stage,check_size\nAcme,Screen,1500000.50\nGlobex,,\n".encode("utf-8-sig")
+    response = _import(client, board, body, "text/csv")
+    assert response.status_code == 201, response.text
+    assert response.json() == {'imported': 2, 'errors': []}
+
+
+@pytest.mark.parametrize("content_type,body", [
+    ("text/csv", b"name,round\nAcme,Seed\nBad \xff name,Seed\n"),
+    ("application/x-ndjson", b'{"name": "Acme"}\n{"name": "Bad \xff name"}\n'),
+])
+def test_invalid_utf8_is_a_row_error(client, board, content_type, body):
+    response = _import(client, board, body, content_type)
+    assert response.status_code == 422, response.text
+    assert response.json()['errors'] == [{'row': 2, 'message': "Row is not valid UTF-8"}]
+
+
+@pytest.mark.parametrize("check_size", ["1e400", "inf", "NaN", "12345678901234", "0.125"])
+def test_out_of_range_check_size_is_a_row_error(client, board, check_size):
+    response = _import(client, board, f"name,check_size\nAcme,{check_size}\n".encode(), "text/csv")
+    assert response.status_code == 422, response.text
+    assert [error['row'] for error in response.json()['errors']] == [1]
+    assert client.get(f"/boards/{board['board_id']}/analytics", headers=board['headers']).status_code == 200
+
+
+def test_malformed_csv_is_a_row_error(client, board):
+    body = f"name,round\nAcme,Seed\nHuge,{'x' * 200_000}\nGlobex,Seed\n".encode()
+    response = _import(client, board, body, "text/csv")
+    assert response.status_code == 422, response.text
+    errors = response.json()['errors']
+    assert [error['row'] for error in errors] == [2]
+    assert errors[0]['message'].startswith("Malformed CSV: field larger than field limit")
@@ -0,0 +1,15 @@
+"""A deal's stage timeline is only visible to members of its board"""
+
+
+def test_timeline_requires_board_access(client, make_user, make_board, make_deals):
+    owner, member, outsider = make_user("Owner"), make_user("Member"), make_user("Outsider")
+    board_id = make_board(owner, {member['id']: "PARTNER"})
+    deal_id, = make_deals(owner, board_id, 1)
+
+    for user in (owner, member):
+        response = client.get(f"/deals/{deal_id}/timeline", headers=user['headers'])
+        assert response.status_code == 200, response.text
+        assert [entry['deal_id'] for entry in response.json()] == [deal_id]
+
+    response = client.get(f"/deals/{deal_id}/timeline", headers=outsider['headers'])
+    assert response.status_code == 403
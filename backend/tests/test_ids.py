@@ -0,0 +1,68 @@
+"""Snowflake worker id leases in id_workers"""
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import delete, insert, select
+from app import ids
+from app.models import IdWorker
+
+
+@pytest.fixture
+def leases(client):
+    """Claims worker ids under test tokens, and drops them all afterwards"""
+    from app.database import engine
+    tokens = []
+
+    def claim() -> int:
+        tokens.append(f"test{len(tokens):028d}")
+        return ids._claim_worker_id(tokens[-1])
+
+    yield claim
+    with engine.begin() as conn:
+        conn.execute(delete(IdWorker).where(IdWorker.lease_token.like("test%")))
+
+
+def _leased() -> set[int]:
+    from app.database import engine
+    with engine.connect() as conn:
+        return set(conn.execute(select(IdWorker.id)).scalars())
+
+
+def test_app_holds_a_lease(client):
+    assert ids.get_id_generator().worker_id in _leased()
+
+
+def test_claims_lowest_free_id(leases):
+    first = leases()
+    second = leases()
+    assert second > first
+    ids._release_lease(first, "test" + "0" * 28)
+    assert leases() == first
+
+
+def test_expired_lease_is_reclaimed(leases):
+    from app.database import engine
+    worker_id = leases()
+    stale = datetime.now(timezone.utc) - timedelta(seconds=ids.settings.ID_WORKER_LEASE_SECONDS + 1)
+    with engine.begin() as conn:
+        conn.execute(IdWorker.__table__.update().where(IdWorker.id == worker_id).values(heartbeat_at=stale))
+    assert leases() == worker_id
+    # The heartbeat of the process that went quiet now finds its lease gone
+    assert not ids._renew_lease(worker_id, "test" + "0" * 28)
+    assert ids._renew_lease(worker_id, "test" + "0" * 27 + "1")
+
+
+def test_fails_when_every_id_is_leased(leases):
+    for _ in range(ids.MAX_WORKER_ID + 1 - len(_leased())):
+        leases()
+    with pytest.raises(RuntimeError, match="leased"):
+        leases()
+
+
+def test_release_frees_the_id(client):
+    generator = ids.SnowflakeIdGenerator()
+    generator.reserve()
+    worker_id = generator.worker_id
+    assert worker_id in _leased()
+    assert generator() >> ids.SEQUENCE_BITS & ids.MAX_WORKER_ID == worker_id
+    generator.release()
+    assert worker_id not in _leased()
@@ -0,0 +1,72 @@
+"""The hot lookups use the composite indexes from migration 0001, checked with EXPLAIN QUERY PLAN on seeded data"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models import Activity, Comment, Deal, DealStageTransition, ICMemo, MemoVersion, Vote
+from app.pagination import keyset
+from app.queries import query_for
+from app.schemas import ActivityResponse, CommentResponse, DealResponse, VoteResponse
+
+
+@pytest.fixture(scope="module")
+def db(client):
+    from app.database import SessionLocal, engine
+    from seed_db import seed
+
+    board_id = seed(boards=1, deals=200, comments=3, votes=2, memo_versions=3, users=6, seed_value=3)[0]
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    session = SessionLocal()
+    session.info['board_id'] = board_id
+    session.info['deal_id'] = session.query(Deal.id).filter(Deal.board_id == board_id).limit(1).scalar()
+    yield session
+    session.close()
+
+
+def query_plan(db: Session, query) -> list[str]:
+    statement = query.statement.compile(db.get_bind(), compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+
+
+def assert_uses_index(plan: list[str], table: str, index: str) -> None:
+    steps = [step for step in plan if f" {table} " in f" {step} "]
+    assert steps, plan
+    assert any(f"INDEX {index} " in step for step in steps), plan
+    assert not any(step.startswith(f"SCAN {table}") for step in steps), plan
+
+
+def test_deal_list_by_board(db):
+    query = keyset(query_for(db, DealResponse).filter(Deal.board_id == db.info['board_id']), Deal, None)
+    assert_uses_index(query_plan(db, query), "deals", "ix_deals_board_id_created_at")
+
+
+@pytest.mark.parametrize("model,schema,index", (
+    (Activity, ActivityResponse, "ix_activities_deal_id_created_at"),
+    (Comment, CommentResponse, "ix_comments_deal_id_created_at"),
+))
+def test_deal_feed_pages(db, model, schema, index):
+    query = keyset(query_for(db, schema).filter(model.deal_id == db.info['deal_id']), model, None)
+    assert_uses_index(query_plan(db, query), model.__tablename__, index)
+
+
+def test_vote_lookup_by_deal_and_user(db):
+    query = db.query(Vote).filter(Vote.deal_id == db.info['deal_id'], Vote.user_id == 1)
+    assert_uses_index(query_plan(db, query), "votes", "ix_votes_deal_id_user_id")
+
+
+def test_votes_for_deal(db):
+    query = keyset(query_for(db, VoteResponse).filter(Vote.deal_id == db.info['deal_id']), Vote, None)
+    assert_uses_index(query_plan(db, query), "votes", "ix_votes_deal_id_user_id")
+
+
+def test_memo_version_lookup(db):
+    memo_id = db.query(ICMemo.id).filter(ICMemo.deal_id == db.info['deal_id']).scalar()
+    query = db.query(MemoVersion).filter(MemoVersion.memo_id == memo_id, MemoVersion.version == 2)
+    assert_uses_index(query_plan(db, query), "memo_versions", "ix_memo_versions_memo_id_version")
+
+
+def test_deal_timeline(db):
+    query = db.query(DealStageTransition).filter(
+        DealStageTransition.deal_id == db.info['deal_id']
+    ).order_by(DealStageTransition.created_at)
+    assert_uses_index(query_plan(db, query), "deal_stage_transitions", "ix_deal_stage_transitions_deal_id_created_at")
@@ -0,0 +1,17 @@
+"""A memo diff is only visible to members of the deal's board"""
+
+
+def test_memo_diff_requires_board_access(client, make_user, make_board, make_deals):
+    owner, member, outsider = make_user("Owner"), make_user("Member"), make_user("Outsider")
+    board_id = make_board(owner, {member['id']: "PARTNER"})
+    deal_id, = make_deals(owner, board_id, 1)
+    for summary in ("First draft", "Second draft"):
+        client.put(f"/memos/deal/{deal_id}", json={'summary': summary}, headers=owner['headers'])
+
+    path = f"/memos/deal/{deal_id}/diff"
+    for user in (owner, member):
+        response = client.get(path, params={'from': 1, 'to': 2}, headers=user['headers'])
+        assert response.status_code == 200, response.text
+
+    response = client.get(path, params={'from': 1, 'to': 2}, headers=outsider['headers'])
+    assert response.status_code == 403
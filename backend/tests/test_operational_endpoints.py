@@ -0,0 +1,39 @@
+"""Pool health and metrics are only served to admins or, for metrics, the scrape token"""
+import pytest
+from app.models import User, UserRole
+
+import main
+
+
+@pytest.fixture
+def make_admin(make_user):
+    """Sign up a user and promote them to admin"""
+    def make() -> dict:
+        from app.database import SessionLocal
+        user = make_user("Admin")
+        with SessionLocal() as db:
+            db.get(User, user['id']).role = UserRole.ADMIN
+            db.commit()
+        return user
+    return make
+
+
+def test_pool_health_requires_admin(client, make_user, make_admin):
+    assert client.get("/health/pool").status_code == 403
+    assert client.get("/health/pool", headers=make_user()['headers']).status_code == 403
+    assert client.get("/health/pool", headers=make_admin()['headers']).status_code == 200
+
+
+
+def test_metrics_requires_admin_without_token(client, make_user, make_admin):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=make_user()['headers']).status_code == 403
+    assert client.get("/metrics", headers=make_admin()['headers']).status_code == 200
+
+
+def test_metrics_token_replaces_admin_check(client, make_admin, monkeypatch):
+    monkeypatch.setattr(main.settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics", headers={'Authorization': "Bearer scrape-secret"}).status_code == 200
+    assert client.get("/metrics", headers={'Authorization': "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers=make_admin()['headers']).status_code == 401
+    assert client.get("/metrics").status_code == 401
@@ -0,0 +1,47 @@
+"""Following X-Next-Cursor visits every row exactly once, in order"""
+import pytest
+
+PAGE_SIZE = 2
+
+
+def walk(client, path: str, headers: dict, **params) -> list[dict]:
+    rows = []
+    params = {**params, 'limit': PAGE_SIZE}
+    # Rows created within one request share a timestamp, so cursors must tiebreak on id
+    for _ in range(50):
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        rows += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+        params['cursor'] = cursor
+    pytest.fail(f"{path} did not reach the last page")
+
+
+@pytest.fixture
+def board(client, make_user, make_board):
+    owner = make_user("Owner")
+    board_id = make_board(owner)
+    deal_ids = [
+        client.post("/deals", json={'name': f"Deal {index}", 'board_id': board_id}, headers=owner['headers']).json()['id']
+        for index in range(7)
+    ]
+    for index in range(7):
+        client.post(f"/deals/{deal_ids[0]}/comments", json={'content': f"Comment {index}"}, headers=owner['headers'])
+    return {'headers': owner['headers'], 'board_id': board_id, 'deal_ids': deal_ids}
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at", "updated_at", "-updated_at"])
+def test_deal_pages(client, board, sort):
+    deals = walk(client, "/deals", board['headers'], board_id=board['board_id'], sort=sort)
+    ids = [deal['id'] for deal in deals]
+    assert sorted(ids) == sorted(board['deal_ids'])
+    key = sort.lstrip("-")
+    positions = [(deal[key], deal['id']) for deal in deals]
+    assert positions == sorted(positions, reverse=sort.startswith("-"))
+
+
+def test_comment_pages(client, board):
+    comments = walk(client, f"/deals/{board['deal_ids'][0]}/comments", board['headers'])
+    assert [comment['content'] for comment in comments] == [f"Comment {index}" for index in reversed(range(7))]
@@ -0,0 +1,26 @@
+"""Password hashing is capped at PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE jobs"""
+import threading
+import pytest
+from app import auth
+
+
+@pytest.fixture
+def login(client, make_user):
+    user = make_user()
+    email = client.get("/auth/me", headers=user['headers']).json()['email']
+    return lambda: client.post("/auth/login", json={'email': email, 'password': "secret123"})
+
+
+def test_saturated_pool_rejects_with_429(login, monkeypatch):
+    monkeypatch.setattr(auth, "_password_slots", threading.BoundedSemaphore(1))
+    auth._password_slots.acquire()
+    response = login()
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == "1"
+
+
+def test_login_frees_its_slot(login, monkeypatch):
+    monkeypatch.setattr(auth, "_password_slots", threading.BoundedSemaphore(1))
+    for _ in range(3):
+        assert login().status_code == 200
+
@@ -0,0 +1,77 @@
+"""The query budget plugin, run in a separate pytest process against inline test modules"""
+import os
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET_TESTS = """
+import pytest
+from sqlalchemy import text
+from app.database import engine
+
+
+def run(statements):
+    with engine.connect() as conn:
+        for number in range(statements):
+            conn.execute(text(f"SELECT {number}"))
+
+
+@pytest.mark.query_budget(2)
+def test_within_budget():
+    run(2)
+
+
+@pytest.mark.query_budget(2)
+def test_over_budget():
+    run(3)
+
+
+def test_unmarked():
+    run(10)
+
+
+def test_counter(query_counter):
+    run(3)
+    assert query_counter.count == 3
+"""
+
+
+@pytest.fixture(autouse=True)
+def importable_app(monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", BACKEND_DIR)
+
+
+def test_marker_fails_only_tests_over_budget(pytester):
+    pytester.makepyfile(BUDGET_TESTS)
+    result = pytester.runpytest_subprocess("-p", "app.pytest_plugin")
+    result.assert_outcomes(passed=3, failed=1)
+    # Reported as the test's own failure, not as a plugin error during teardown
+    assert "PluggyTeardownRaisedWarning" not in result.stdout.str()
+    result.stdout.fnmatch_lines(["*test_over_budget issued 3 SQL statements, over its budget of 2*"])
+
+
+def test_default_budget_applies_to_unmarked_tests(pytester):
+    pytester.makepyfile(BUDGET_TESTS)
+    result = pytester.runpytest_subprocess("-p", "app.pytest_plugin", "--query-budget=5")
+    result.assert_outcomes(passed=2, failed=2)
+    result.stdout.fnmatch_lines(["*test_unmarked issued 10 SQL statements, over its budget of 5*"])
+
+
+def test_fail_on_n_plus_one(pytester):
+    pytester.makepyfile(BUDGET_TESTS)
+    result = pytester.runpytest_subprocess("-p", "app.pytest_plugin", "--fail-on-n-plus-one", "-k", "unmarked")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*repeated statements (likely N+1)*", "*10x SELECT ?*"])
+
+
+def test_failing_test_reports_its_own_error(pytester):
+    pytester.makepyfile("""
+import pytest
+
+@pytest.mark.query_budget(0)
+def test_fails():
+    assert 1 == 2
+""")
+    result = pytester.runpytest_subprocess("-p", "app.pytest_plugin")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*assert 1 == 2*"])
@@ -0,0 +1,46 @@
+"""List, board and snapshot endpoints issue a fixed number of SQL statements however many rows they return"""
+import pytest
+
+# Auth, permission lookups and the page itself; the same at 1 row or 100
+MAX_LIST_QUERIES = 4
+# Also the ETag round trip and the snapshot's aggregate queries
+MAX_BOARD_QUERIES = 7
+
+# path -> most statements it may issue
+QUERY_BUDGETS = {
+    "/boards/": MAX_LIST_QUERIES,
+    "/deals": MAX_LIST_QUERIES,
+    "/deals?board_id={board_id}": MAX_LIST_QUERIES,
+    "/deals/{deal_id}/activities": MAX_LIST_QUERIES,
+    "/deals/{deal_id}/comments": MAX_LIST_QUERIES,
+    "/deals/{deal_id}/votes": MAX_LIST_QUERIES,
+    "/memos/deal/{deal_id}/versions": MAX_LIST_QUERIES,
+    "/boards/{board_id}": MAX_BOARD_QUERIES,
+    "/boards/{board_id}/snapshot": MAX_BOARD_QUERIES,
+}
+
+
+@pytest.mark.parametrize("path", QUERY_BUDGETS)
+def test_query_count_is_independent_of_rows(populate_board, count_queries, path):
+    small, large = populate_board(2), populate_board(15)
+    # Warm the per-user caches so both runs take the same path
+    count_queries(small, path)
+    count_queries(large, path)
+
+    small_count = count_queries(small, path)
+    large_count = count_queries(large, path)
+    assert large_count == small_count
+    assert large_count <= QUERY_BUDGETS[path]
+
+
+@pytest.fixture
+def large_board(populate_board):
+    return populate_board(15)
+
+
+@pytest.mark.parametrize("path", [
+    pytest.param(path, marks=pytest.mark.query_budget(budget)) for path, budget in QUERY_BUDGETS.items()
+])
+def test_within_query_budget(client, large_board, path):
+    response = client.get(path.format(**large_board), headers=large_board['owner']['headers'])
+    assert response.status_code == 200, response.text
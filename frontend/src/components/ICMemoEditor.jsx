@@ -29,8 +29,8 @@ export default function ICMemoEditor({ dealId, canEdit }) {
       return response.data
     },
     onSuccess: (data) => {
-      if (data.versions && data.versions.length > 0) {
-        const latest = data.versions[0]
+      if (data.current) {
+        const latest = data.current
         setFormData({
           summary: latest.summary,
           market: latest.market,
@@ -60,15 +60,17 @@ export default function ICMemoEditor({ dealId, canEdit }) {
     updateMemoMutation.mutate(formData)
   }
 
-  const handleViewVersion = (version) => {
-    setViewingVersion(version)
+  const handleViewVersion = async (version) => {
+    // The history only lists summaries; fetch the full text of the chosen version
+    const response = await memosAPI.getVersion(dealId, version.version)
+    setViewingVersion(response.data)
     setShowVersions(false)
   }
 
   const handleBackToCurrent = () => {
     setViewingVersion(null)
-    if (memo?.versions?.[0]) {
-      const latest = memo.versions[0]
+    if (memo?.current) {
+      const latest = memo.current
       setFormData({
         summary: latest.summary,
         market: latest.market,
@@ -84,7 +86,7 @@ export default function ICMemoEditor({ dealId, canEdit }) {
     return <div className="text-slate-400">Loading memo...</div>
   }
 
-  const currentVersion = viewingVersion || memo?.versions?.[0]
+  const currentVersion = viewingVersion || memo?.current
   const displayData = viewingVersion || formData
 
   return (
@@ -158,7 +160,7 @@ export default function ICMemoEditor({ dealId, canEdit }) {
           <div className="space-y-2 max-h-64 overflow-y-auto">
             {memo?.versions?.map((version) => (
               <div
-                key={version.id}
+                key={version.version}
                 className="flex justify-between items-center p-3 bg-slate-800 rounded-lg hover:bg-slate-700 transition cursor-pointer"
                 onClick={() => handleViewVersion(version)}
               >
@@ -166,7 +168,15 @@ export default function ICMemoEditor({ dealId, canEdit }) {
                   <div className="font-medium text-white">Version {version.version}</div>
                   <div className="text-xs text-slate-400">
                     {formatDateTime(version.created_at)}
+                    {version.author_name && ` • ${version.author_name}`}
                   </div>
+                  {version.changed_sections?.length > 0 && (
+                    <div className="text-xs text-slate-500 mt-1">
+                      Changed: {version.changed_sections
+                        .map((key) => SECTIONS.find((section) => section.key === key)?.label || key)
+                        .join(', ')}
+                    </div>
+                  )}
                 </div>
                 <Eye size={18} className="text-slate-400" />
               </div>
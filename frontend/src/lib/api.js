@@ -34,6 +34,19 @@ api.interceptors.response.use(
   }
 )
 
+// Follow keyset pagination cursors until every page has been fetched
+const getAllPages = async (url, params = {}) => {
+  const items = []
+  let cursor = null
+  let response
+  do {
+    response = await api.get(url, { params: cursor ? { ...params, cursor } : params })
+    items.push(...response.data)
+    cursor = response.headers['x-next-cursor']
+  } while (cursor)
+  return { ...response, data: items }
+}
+
 // Auth API
 export const authAPI = {
   login: (email, password) => api.post('/auth/login', { email, password }),
@@ -58,19 +71,37 @@ export const boardsAPI = {
     return api.post(`/boards/${boardId}/members/${userId}`, null, { params })
   },
   removeMember: (boardId, userId) => api.delete(`/boards/${boardId}/members/${userId}`),
+  getTimeline: (boardId, params = {}) => api.get(`/boards/${boardId}/timeline`, { params }),
+  getFunnel: (boardId, params = {}) => api.get(`/boards/${boardId}/funnel`, { params }),
+  getAnalytics: (boardId) => api.get(boardId ? `/boards/${boardId}/analytics` : '/boards/analytics'),
+  moveDeals: (boardId, moves) => api.patch(`/boards/${boardId}/deals:move`, { moves }),
+  importDeals: (boardId, file) =>
+    api.post(`/boards/${boardId}/deals:bulk`, file, {
+      headers: { 'Content-Type': file.name?.endsWith('.csv') ? 'text/csv' : 'application/x-ndjson' },
+    }),
+  exportDeals: (boardId, format = 'csv') =>
+    api.get(`/boards/${boardId}/deals:export`, { params: { format }, responseType: 'blob' }),
+  // EventSource can't send headers, so the change feed takes a short-lived, board-scoped
+  // token as a query param instead of the access token
+  openEvents: async (boardId) => {
+    const { data } = await api.post(`/boards/${boardId}/events/token`)
+    return new EventSource(`${API_URL}/boards/${boardId}/events?token=${encodeURIComponent(data.token)}`)
+  },
 }
 
 // Deals API
 export const dealsAPI = {
-  getAll: (boardId) => api.get('/deals', { params: boardId ? { board_id: boardId } : {} }),
+  // params: stage, status, owner_id, round, min/max_check_size, created/updated_after/before, sort, fields
+  getAll: (boardId, params = {}) => getAllPages('/deals', boardId ? { ...params, board_id: boardId } : params),
   getOne: (id) => api.get(`/deals/${id}`),
   create: (data) => api.post('/deals', data),
   update: (id, data) => api.put(`/deals/${id}`, data),
   delete: (id) => api.delete(`/deals/${id}`),
-  getActivities: (id) => api.get(`/deals/${id}/activities`),
-  getComments: (id) => api.get(`/deals/${id}/comments`),
+  getActivities: (id) => getAllPages(`/deals/${id}/activities`),
+  getTimeline: (id) => api.get(`/deals/${id}/timeline`),
+  getComments: (id) => getAllPages(`/deals/${id}/comments`),
   addComment: (id, content) => api.post(`/deals/${id}/comments`, { content }),
-  getVotes: (id) => api.get(`/deals/${id}/votes`),
+  getVotes: (id) => getAllPages(`/deals/${id}/votes`),
   vote: (id, vote, comment) => api.post(`/deals/${id}/votes`, { vote, comment }),
 }
 
@@ -80,4 +111,10 @@ export const memosAPI = {
   updateMemo: (dealId, data) => api.put(`/memos/deal/${dealId}`, data),
   getVersions: (dealId) => api.get(`/memos/deal/${dealId}/versions`),
   getVersion: (dealId, version) => api.get(`/memos/deal/${dealId}/version/${version}`),
+  getDiff: (dealId, from, to) => api.get(`/memos/deal/${dealId}/diff`, { params: { from, to } }),
+}
+
+// Search API
+export const searchAPI = {
+  search: (q, params = {}) => api.get('/search', { params: { q, ...params } }),
 }
@@ -5,6 +5,9 @@
 // Deal stages - used for kanban columns
 export const DEAL_STAGES = ['Sourced', 'Screen', 'Diligence', 'IC', 'Invested', 'Passed']
 
+// How long to collect kanban drops before sending them as one batch move
+export const MOVE_BATCH_DELAY_MS = 400
+
 // Deal stage colors
 export const STAGE_COLORS = {
   'Sourced': '#10B981',      // Green
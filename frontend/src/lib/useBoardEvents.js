@@ -0,0 +1,106 @@
+import { useEffect } from 'react'
+import { useQueryClient } from '@tanstack/react-query'
+import { boardsAPI } from './api'
+
+const RECONNECT_MS = 5000
+
+// Route params are strings while event payloads carry numbers, so match keys loosely
+const matchesKey = (name, id) => (query) =>
+  query.queryKey[0] === name && String(query.queryKey[1]) === String(id)
+
+// Keep cached board data in sync with the server's change feed
+export function useBoardEvents(boardId) {
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    if (!boardId) return undefined
+
+    let source
+    let retry
+    let closed = false
+    const invalidate = (name, id) => queryClient.invalidateQueries({ predicate: matchesKey(name, id) })
+    const refreshDeal = ({ deal_id }) => {
+      invalidate('deal', deal_id)
+      invalidate('activities', deal_id)
+      invalidate('activities', boardId)
+    }
+
+    const handlers = {
+      'deal.created': () => {
+        invalidate('deals', boardId)
+        invalidate('activities', boardId)
+      },
+      'deal.updated': (event) => {
+        invalidate('deals', boardId)
+        refreshDeal(event)
+      },
+      'deal.moved': (event) => {
+        // Patch the card in place instead of refetching the whole board
+        queryClient.setQueriesData({ predicate: matchesKey('deals', boardId) }, (old) =>
+          old?.map((deal) => (deal.id === event.deal_id ? { ...deal, stage: event.to_stage } : deal))
+        )
+        refreshDeal(event)
+      },
+      'deals.moved': ({ moves }) => {
+        const byId = new Map(moves.map((move) => [move.deal_id, move]))
+        queryClient.setQueriesData({ predicate: matchesKey('deals', boardId) }, (old) =>
+          old?.map((deal) => (byId.has(deal.id) ? { ...deal, ...byId.get(deal.id) } : deal))
+        )
+        moves.forEach(refreshDeal)
+      },
+      'deals.imported': () => {
+        invalidate('deals', boardId)
+        invalidate('activities', boardId)
+      },
+      'deal.deleted': ({ deal_id }) => {
+        queryClient.setQueriesData({ predicate: matchesKey('deals', boardId) }, (old) =>
+          old?.filter((deal) => deal.id !== deal_id)
+        )
+      },
+      'comment.added': (event) => {
+        invalidate('comments', event.deal_id)
+        refreshDeal(event)
+      },
+      'vote.cast': (event) => {
+        invalidate('votes', event.deal_id)
+        refreshDeal(event)
+      },
+      'memo.version': (event) => {
+        invalidate('memo', event.deal_id)
+        refreshDeal(event)
+      },
+      // Sent when this client fell behind and events were dropped
+      resync: () => queryClient.invalidateQueries(),
+    }
+
+    const connect = async () => {
+      try {
+        source = await boardsAPI.openEvents(boardId)
+      } catch {
+        retry = setTimeout(connect, RECONNECT_MS)
+        return
+      }
+      if (closed) {
+        source.close()
+        return
+      }
+      Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, (message) => handler(JSON.parse(message.data)))
+      })
+      // The browser reconnects with the same URL, which fails once the stream token has
+      // expired; when it gives up, fetch a new token
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          retry = setTimeout(connect, RECONNECT_MS)
+        }
+      }
+    }
+    connect()
+
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      source?.close()
+    }
+  }, [boardId, queryClient])
+}
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import {
@@ -13,7 +13,8 @@ import { Plus, Activity, Users, FolderKanban, Menu } from 'lucide-react'
 import { dealsAPI, boardsAPI } from '../lib/api'
 import { useAuthStore } from '../stores/authStore'
 import { useBoardStore } from '../stores/boardStore'
-import { DEAL_STAGES } from '../lib/constants'
+import { useBoardEvents } from '../lib/useBoardEvents'
+import { DEAL_STAGES, MOVE_BATCH_DELAY_MS } from '../lib/constants'
 import KanbanColumn from '../components/KanbanColumn'
 import DealCard from '../components/DealCard'
 import CreateDealModal from '../components/CreateDealModal'
@@ -31,6 +32,7 @@ export default function Dashboard() {
   const [isActivityLogOpen, setIsActivityLogOpen] = useState(false)
   const [isSidebarOpen, setIsSidebarOpen] = useState(true)
   const currentBoardId = boardId ? Number(boardId) : null
+  useBoardEvents(currentBoardId)
 
   // Drag and drop sensors
   const sensors = useSensors(
@@ -126,38 +128,33 @@ export default function Dashboard() {
     enabled: deals.length > 0 && !!currentBoardId,
   })
 
-  // Update deal mutation with optimistic update
-  const updateDealMutation = useMutation({
-    mutationFn: ({ id, data }) => dealsAPI.update(id, data),
-    onMutate: async ({ id, data }) => {
-      // Cancel outgoing refetches
-      await queryClient.cancelQueries(['deals', currentBoardId])
-
-      // Snapshot previous value
-      const previousDeals = queryClient.getQueryData(['deals', currentBoardId])
-
-      // Optimistically update to the new value
-      queryClient.setQueryData(['deals', currentBoardId], (old) =>
-        old?.map((deal) =>
-          deal.id === id ? { ...deal, ...data } : deal
-        )
-      )
+  // Batched stage moves: drops made in quick succession are sent as one request
+  const pendingMoves = useRef(new Map())
+  const moveTimer = useRef(null)
 
-      // Return context with snapshot
-      return { previousDeals }
-    },
-    onError: (err, variables, context) => {
-      // Rollback on error
-      if (context?.previousDeals) {
-        queryClient.setQueryData(['deals', currentBoardId], context.previousDeals)
-      }
-    },
-    onSettled: () => {
-      // Refetch to ensure consistency
-      queryClient.invalidateQueries(['deals', currentBoardId])
+  const moveDealsMutation = useMutation({
+    mutationFn: ({ boardId, moves }) => boardsAPI.moveDeals(boardId, moves),
+    onSettled: (data, error, { boardId }) => {
+      // Refetch to ensure consistency (and roll back optimistic moves on error)
+      queryClient.invalidateQueries(['deals', boardId])
     },
   })
 
+  const queueDealMove = (dealId, stage) => {
+    // Optimistically move the card right away
+    queryClient.setQueryData(['deals', currentBoardId], (old) =>
+      old?.map((deal) => (deal.id === dealId ? { ...deal, stage } : deal))
+    )
+
+    pendingMoves.current.set(dealId, stage)
+    clearTimeout(moveTimer.current)
+    moveTimer.current = setTimeout(() => {
+      const moves = Array.from(pendingMoves.current, ([deal_id, stage]) => ({ deal_id, stage }))
+      pendingMoves.current.clear()
+      moveDealsMutation.mutate({ boardId: currentBoardId, moves })
+    }, MOVE_BATCH_DELAY_MS)
+  }
+
   // Create deal mutation
   const createDealMutation = useMutation({
     mutationFn: (data) => dealsAPI.create({ ...data, board_id: currentBoardId }),
@@ -194,10 +191,7 @@ export default function Dashboard() {
     if (!deal || deal.stage === newStage) return
 
     // Update the deal's stage
-    updateDealMutation.mutate({
-      id: dealId,
-      data: { stage: newStage },
-    })
+    queueDealMove(dealId, newStage)
   }
 
   // Get active deal for drag overlay
@@ -3,6 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { dealsAPI, memosAPI, boardsAPI } from '../lib/api'
 import { useAuthStore } from '../stores/authStore'
+import { useBoardEvents } from '../lib/useBoardEvents'
 import { ArrowLeft, MessageSquare, ThumbsUp, ThumbsDown, FileText, History } from 'lucide-react'
 import { formatCurrency, formatDateTime } from '../lib/utils'
 import ICMemoEditor from '../components/ICMemoEditor'
@@ -15,6 +16,7 @@ export default function DealDetail() {
   const { user } = useAuthStore()
   const queryClient = useQueryClient()
   const [activeTab, setActiveTab] = useState('memo')
+  useBoardEvents(boardId)
 
   // Fetch board details to get user's board role
   const { data: board } = useQuery({